@@ -5,6 +5,14 @@ This MCP server provides tools to manage Home Assistant automations via the REST
 
 __version__ = "0.1.0"
 
-from mcp_ha_extended.server import main
+__all__ = ["main", "run", "__version__"]
 
-__all__ = ["main", "__version__"]
+
+def __getattr__(name: str):
+    # Importing the package (e.g. for ``python -m mcp_ha_extended.server``) must not import the
+    # server module ahead of runpy, which would execute it twice
+    if name in ("main", "run"):
+        from mcp_ha_extended import server
+
+        return getattr(server, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
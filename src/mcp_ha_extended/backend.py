@@ -0,0 +1,83 @@
+"""Routing of Home Assistant REST requests onto equivalent WebSocket API commands.
+
+With the WebSocket backend, requests that have a WebSocket counterpart are sent as commands on
+the one authenticated connection instead of as separate HTTP requests. Everything else
+(automation config writes and listings, history) has no WebSocket command and stays on REST.
+"""
+
+import re
+from typing import Any, Callable, NamedTuple
+
+BACKENDS = ("rest", "websocket")
+
+_SERVICE_RE = re.compile(r"^/services/([a-z0-9_]+)/([a-z0-9_]+)(\?return_response)?$")
+_AUTOMATION_RE = re.compile(r"^/automation/([^/?]+)(/trigger)?$")
+
+
+class WebSocketRoute(NamedTuple):
+    """A WebSocket command standing in for a REST request, and how to shape its result."""
+
+    message: dict[str, Any]
+    adapt: Callable[[Any], Any]
+
+
+def _service_result(result: Any) -> list:
+    # REST answers with the states the call changed; the WebSocket API does not report them
+    return []
+
+
+def _service_response(result: Any) -> dict[str, Any]:
+    return {"changed_states": [], "service_response": (result or {}).get("response")}
+
+
+def _automation_config(result: Any) -> Any:
+    return (result or {}).get("config")
+
+
+def _triggered(result: Any) -> dict[str, Any]:
+    return {"status": "success"}
+
+
+def websocket_route(
+    method: str,
+    endpoint: str,
+    data: dict[str, Any] | None = None,
+    entity_id_of: Callable[[str], str | None] = lambda automation_id: None,
+) -> WebSocketRoute | None:
+    """Return the WebSocket command equivalent to a REST request, or ``None`` if there is none.
+
+    ``entity_id_of`` resolves an automation config ID to its entity ID; the WebSocket commands
+    for reading and triggering an automation address it by entity, so those requests only
+    have a route when the entity ID is known.
+    """
+    if method == "GET" and endpoint == "/states":
+        return WebSocketRoute({"type": "get_states"}, list)
+    if method == "POST" and (match := _SERVICE_RE.match(endpoint)):
+        domain, service, return_response = match.groups()
+        message = {"type": "call_service", "domain": domain, "service": service}
+        if data:
+            message["service_data"] = data
+        if return_response:
+            message["return_response"] = True
+            return WebSocketRoute(message, _service_response)
+        return WebSocketRoute(message, _service_result)
+    match = _AUTOMATION_RE.match(endpoint)
+    if match is None:
+        return None
+    automation_id, trigger = match.groups()
+    entity_id = entity_id_of(automation_id)
+    if entity_id is None:
+        return None
+    if method == "GET" and not trigger:
+        return WebSocketRoute(
+            {"type": "automation/config", "entity_id": entity_id}, _automation_config
+        )
+    if method == "POST" and trigger:
+        message = {
+            "type": "call_service",
+            "domain": "automation",
+            "service": "trigger",
+            "target": {"entity_id": entity_id},
+        }
+        return WebSocketRoute(message, _triggered)
+    return None
@@ -0,0 +1,91 @@
+"""Automation snapshots stored as gzip-compressed JSON Lines.
+
+Each line holds one automation: ``{"id": ..., "hash": ..., "config": {...}}``, where ``hash``
+is the ``canonical_hash`` of ``config``. Files are written line by line to a temporary file
+that replaces the target once complete, and read back line by line, so memory use does not
+grow with the number of automations.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from mcp_ha_extended.parsing import canonical_hash
+
+BACKUP_SUFFIX = ".jsonl.gz"
+
+
+def default_backup_dir() -> str:
+    """Return the add-on's mapped config directory if present, else ``./backups``."""
+    return "/config/backups" if os.path.isdir("/config") else os.path.join(os.getcwd(), "backups")
+
+
+def default_backup_name(now: datetime | None = None) -> str:
+    """Return a timestamped backup file name."""
+    now = now or datetime.now(timezone.utc)
+    return f"automations-{now:%Y%m%d-%H%M%S}{BACKUP_SUFFIX}"
+
+
+def resolve_backup_path(backup_dir: str | Path, filename: str) -> Path:
+    """Resolve a backup file name inside ``backup_dir``, refusing anything that escapes it."""
+    if not filename or "\x00" in filename:
+        raise ValueError("Backup filename must not be empty")
+    if os.path.isabs(filename) or ".." in Path(filename).parts:
+        raise ValueError(f"Backup filename must be relative to the backup directory: {filename}")
+    if not filename.endswith(BACKUP_SUFFIX):
+        filename += BACKUP_SUFFIX
+    base = Path(backup_dir).resolve()
+    path = (base / filename).resolve()
+    if not path.is_relative_to(base):
+        raise ValueError(f"Backup filename must stay inside the backup directory: {filename}")
+    return path
+
+
+def make_record(config: dict[str, Any]) -> dict[str, Any]:
+    """Build the stored line for one automation config."""
+    return {"id": str(config.get("id")), "hash": canonical_hash(config), "config": config}
+
+
+class BackupWriter:
+    """Write records to ``path`` atomically: nothing replaces it unless every line is written."""
+
+    def __init__(self, path: Path, compresslevel: int = 6):
+        self.path = path
+        self.count = 0
+        self._tmp_path = path.with_name(f".{path.name}.tmp")
+        self._compresslevel = compresslevel
+        self._file: gzip.GzipFile | None = None
+
+    def __enter__(self) -> "BackupWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self._tmp_path, "wb", compresslevel=self._compresslevel)
+        return self
+
+    def write(self, config: dict[str, Any]) -> None:
+        """Append one automation config."""
+        line = json.dumps(make_record(config), ensure_ascii=False, separators=(",", ":"))
+        self._file.write(line.encode() + b"\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            self._tmp_path.unlink(missing_ok=True)
+
+
+def read_backup(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the records of a backup file, checking each config against its stored hash."""
+    with gzip.open(path, "rb") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            config = record.get("config")
+            if not isinstance(config, dict) or record.get("hash") != canonical_hash(config):
+                raise ValueError(f"Corrupt backup record on line {line_number} of {path.name}")
+            yield record
@@ -0,0 +1,126 @@
+"""Fitting large tool responses into a size budget.
+
+Whatever is cut is recorded by its path in the response (``automations[3].action[2].sequence``)
+so a client can fetch the rest later.
+"""
+
+import json
+import re
+from typing import Any
+
+# Parts smaller than this are left out entirely rather than cut down further
+MIN_PART = 64
+
+_SEGMENT_RE = re.compile(r"\.?([^.\[\]]+)|\[(\d+)\]")
+
+
+def json_size(value: Any) -> int:
+    """Return the length of a value's compact JSON."""
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def join_path(path: str, key: str | int) -> str:
+    """Extend a path with a mapping key or list index."""
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+def resolve_path(data: Any, path: str) -> Any:
+    """Return the value at a path produced by ``fit``; an empty path is the whole response."""
+    value = data
+    position = 0
+    while position < len(path):
+        match = _SEGMENT_RE.match(path, position)
+        if match is None:
+            raise ValueError(f"Invalid path: {path}")
+        key, index = match.groups()
+        try:
+            value = value[int(index)] if index is not None else value[key]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Path not found: {path}") from None
+        position = match.end()
+    return value
+
+
+class Fitter:
+    """Cuts a JSON-compatible value down to a compact-JSON size budget.
+
+    Lists keep a prefix of their items, strings a prefix of their text and mappings their
+    leading keys; the first item that does not fit whole is cut down recursively when enough
+    room is left. Each cut is recorded in ``elided``.
+    """
+
+    def __init__(self):
+        self.elided: list[dict[str, Any]] = []
+        self._sizes: dict[int, int] = {}
+
+    def size(self, value: Any) -> int:
+        """Return the compact JSON size of a value, remembering it for containers."""
+        if not isinstance(value, (dict, list)):
+            return json_size(value)
+        cached = self._sizes.get(id(value))
+        if cached is None:
+            if isinstance(value, dict):
+                parts = [json_size(str(key)) + 1 + self.size(item) for key, item in value.items()]
+            else:
+                parts = [self.size(item) for item in value]
+            cached = self._sizes[id(value)] = 2 + sum(parts) + max(len(parts) - 1, 0)
+        return cached
+
+    def fit(self, value: Any, budget: int, path: str = "") -> Any:
+        """Return ``value`` cut down so its compact JSON is at most about ``budget`` long."""
+        if self.size(value) <= budget:
+            return value
+        if isinstance(value, str):
+            shown = max(budget - 2, 0)
+            self.elided.append({"path": path, "shown": shown, "total": len(value)})
+            return value[:shown]
+        if isinstance(value, list):
+            return self._fit_list(value, budget, path)
+        if isinstance(value, dict):
+            return self._fit_dict(value, budget, path)
+        return value
+
+    def _fit_list(self, items: list, budget: int, path: str) -> list:
+        kept = []
+        used = 2
+        for index, item in enumerate(items):
+            cost = self.size(item) + (1 if kept else 0)
+            if used + cost <= budget:
+                kept.append(item)
+                used += cost
+                continue
+            room = budget - used - (1 if kept else 0)
+            if room >= MIN_PART and isinstance(item, (dict, list, str)):
+                kept.append(self.fit(item, room, join_path(path, index)))
+            break
+        self.elided.append({"path": path, "shown": len(kept), "total": len(items)})
+        return kept
+
+    def _fit_dict(self, mapping: dict, budget: int, path: str) -> dict:
+        kept = {}
+        used = 2
+        omitted = []
+        for key, item in mapping.items():
+            key_cost = json_size(str(key)) + 1 + (1 if kept else 0)
+            cost = key_cost + self.size(item)
+            if used + cost <= budget:
+                kept[key] = item
+                used += cost
+                continue
+            room = budget - used - key_cost
+            if room >= MIN_PART and isinstance(item, (dict, list, str)):
+                kept[key] = self.fit(item, room, join_path(path, key))
+                used = budget
+            else:
+                omitted.append(key)
+        if omitted:
+            self.elided.append({"path": path, "omitted_keys": omitted})
+        return kept
+
+
+def fit(data: Any, budget: int) -> tuple[Any, list[dict[str, Any]]]:
+    """Cut ``data`` down to about ``budget`` bytes of compact JSON; return it and what was cut."""
+    fitter = Fitter()
+    return fitter.fit(data, budget), fitter.elided
@@ -0,0 +1,105 @@
+"""In-process caching helpers for Home Assistant responses."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# Sentinel returned by TTLCache.get() when a key is absent or expired
+MISSING = object()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a fixed time-to-live.
+
+    A ``ttl`` of ``None`` keeps entries until they are evicted or invalidated, and a
+    ``ttl`` of ``0`` disables caching entirely.
+    """
+
+    def __init__(
+        self,
+        ttl: float | None = 30.0,
+        max_entries: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped on every invalidation so callers can detect writes racing a fetch
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.ttl != 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for ``key`` or ``MISSING``, updating hit/miss counters."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at is None or expires_at > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return MISSING
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the cached value for ``key`` or ``MISSING`` without touching stats or LRU order."""
+        entry = self._entries.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= self._clock()):
+            return MISSING
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+        expires_at = None if self.ttl is None else self._clock() + self.ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop the given keys from the cache."""
+        for key in keys:
+            self._entries.pop(key, None)
+        self.generation += 1
+
+    def clear(self) -> None:
+        """Drop every entry from the cache."""
+        self._entries.clear()
+        self.generation += 1
+
+    def reset_stats(self) -> None:
+        """Reset the hit/miss/eviction counters."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > self._clock())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters describing cache effectiveness."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
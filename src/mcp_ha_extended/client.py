@@ -0,0 +1,76 @@
+"""Shared HTTP client for Home Assistant API calls.
+
+A single pooled ``aiohttp.ClientSession`` is opened on the first request after ``main()``
+enables it, and reused by every ``ha_api_call`` so TCP connections, TLS sessions and DNS lookups
+survive between tool calls. ``aiohttp`` itself is only imported once a session is needed.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# Connection pool tuning
+HA_POOL_LIMIT = int(os.getenv("HA_POOL_LIMIT", "100"))
+HA_POOL_LIMIT_PER_HOST = int(os.getenv("HA_POOL_LIMIT_PER_HOST", "10"))
+HA_KEEPALIVE_TIMEOUT = float(os.getenv("HA_KEEPALIVE_TIMEOUT", "60"))
+HA_DNS_CACHE_TTL = int(os.getenv("HA_DNS_CACHE_TTL", "300"))
+
+_session: aiohttp.ClientSession | None = None
+_open_on_demand = False
+
+
+def create_connector() -> aiohttp.TCPConnector:
+    """Build the pooled TCP connector used by the shared session."""
+    import aiohttp
+
+    return aiohttp.TCPConnector(
+        limit=HA_POOL_LIMIT,
+        limit_per_host=HA_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HA_KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=HA_DNS_CACHE_TTL,
+    )
+
+
+async def open_session() -> aiohttp.ClientSession:
+    """Open the shared session, or return it if it is already open."""
+    import aiohttp
+
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=create_connector())
+    return _session
+
+
+def open_session_on_demand() -> None:
+    """Open the shared session on first use rather than up front, keeping startup light."""
+    global _open_on_demand
+    _open_on_demand = True
+
+
+async def acquire_session() -> aiohttp.ClientSession | None:
+    """Return the shared session, opening it first if on-demand opening is enabled."""
+    session = get_session()
+    if session is None and _open_on_demand:
+        session = await open_session()
+    return session
+
+
+def get_session() -> aiohttp.ClientSession | None:
+    """Return the shared session if one is open."""
+    if _session is None or _session.closed:
+        return None
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared session and release its pooled connections."""
+    global _session, _open_on_demand
+    _open_on_demand = False
+    if _session is not None:
+        await _session.close()
+        _session = None
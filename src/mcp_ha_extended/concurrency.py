@@ -0,0 +1,358 @@
+"""Concurrency primitives used around Home Assistant API calls."""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one underlying call.
+
+    The first caller for a key starts the call; callers arriving while it is in flight await
+    the same result (or exception). Cancelling one caller does not cancel the shared call.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` for ``key``, or join the call already in flight for it."""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def forget(self, *keys: Hashable) -> None:
+        """Stop sharing the calls in flight for ``keys``; later callers start a new call.
+
+        Callers already waiting still get the old call's result.
+        """
+        for key in keys:
+            self._calls.pop(key, None)
+
+    def keys(self) -> list[Hashable]:
+        """Return the keys of the calls in flight."""
+        return list(self._calls)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters describing how many calls were shared."""
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class _KeyState:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLock:
+    """One lock per key, created on demand and dropped once nobody holds or awaits it.
+
+    Holders of the same key run one at a time in arrival order; different keys proceed
+    concurrently. Several keys are acquired in sorted order so overlapping sets cannot deadlock.
+    """
+
+    def __init__(self):
+        self._states: dict[str, _KeyState] = {}
+        self.acquisitions = 0
+        self.contended = 0
+
+    @asynccontextmanager
+    async def lock(self, *keys: str) -> AsyncIterator[None]:
+        """Hold the locks for every given key for the duration of the block."""
+        states: list[tuple[str, _KeyState]] = []
+        acquired: list[_KeyState] = []
+        try:
+            for key in sorted(set(keys)):
+                state = self._states.get(key)
+                if state is None:
+                    state = self._states[key] = _KeyState()
+                state.users += 1
+                states.append((key, state))
+                if state.lock.locked():
+                    self.contended += 1
+                await state.lock.acquire()
+                acquired.append(state)
+            self.acquisitions += 1
+            yield
+        finally:
+            for state in reversed(acquired):
+                state.lock.release()
+            for key, state in states:
+                state.users -= 1
+                if not state.users:
+                    del self._states[key]
+
+    def locked(self, key: str) -> bool:
+        """Whether ``key`` is currently held."""
+        state = self._states.get(key)
+        return state is not None and state.lock.locked()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def stats(self) -> dict[str, Any]:
+        """Return how often locks were taken and how often a caller had to wait."""
+        return {
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "active_keys": len(self),
+        }
+
+
+class ConcurrencyLimit:
+    """Async context manager letting at most ``limit`` holders in at once (``0`` = unlimited).
+
+    Waiters are admitted in arrival order. Unlike ``asyncio.Semaphore`` it is not bound to an
+    event loop, so a module-level instance can be shared by successive loops.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.queued = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def __aenter__(self) -> None:
+        if self.limit > 0 and (self.in_flight >= self.limit or self._waiters):
+            self.queued += 1
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                # A releasing holder hands its slot straight to us, so in_flight is unchanged
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        else:
+            self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers waiting for a slot."""
+        return len(self._waiters)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the limit with current, peak and queued usage."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak,
+            "queued_total": self.queued,
+        }
+
+
+class RateLimiter:
+    """Token bucket admitting ``rate`` requests per second, with bursts of up to ``burst``.
+
+    Callers that find the bucket empty wait in a queue per lane and per client. Lanes share
+    tokens by weighted round-robin (``LANE_WEIGHTS`` reads for every write), so reads are not
+    held up behind bulk writes and a stream of reads cannot shut writes out; within a lane,
+    clients take turns so one busy client cannot starve the others. A ``rate`` of ``0``
+    disables limiting. Like ``ConcurrencyLimit``, it is not bound to one event loop.
+    """
+
+    LANES = ("read", "write")
+    # Tokens each lane may take per round while the other lanes have waiters
+    LANE_WEIGHTS = {"read": 3, "write": 1}
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        # lane -> client -> waiters; clients are served round-robin in insertion order
+        self._queues: dict[str, OrderedDict[Hashable, deque[asyncio.Future]]] = {
+            lane: OrderedDict() for lane in self.LANES
+        }
+        self._credits = dict(self.LANE_WEIGHTS)
+        self._timer: asyncio.TimerHandle | None = None
+        self.admitted = dict.fromkeys(self.LANES, 0)
+        self.queued = dict.fromkeys(self.LANES, 0)
+        self.wait_seconds = dict.fromkeys(self.LANES, 0.0)
+        self.max_wait = dict.fromkeys(self.LANES, 0.0)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are limited at all."""
+        return self.rate > 0
+
+    async def acquire(self, client: Hashable = None, lane: str = "read") -> None:
+        """Wait for a token in ``lane`` on behalf of ``client``."""
+        if not self.enabled:
+            return
+        self._refill()
+        if self._tokens >= 1 and not self.waiting:
+            self._tokens -= 1
+            self.admitted[lane] += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[lane].setdefault(client, deque()).append(waiter)
+        self.queued[lane] += 1
+        started = self._clock()
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted as we were cancelled: hand the token to the next waiter
+                self._tokens += 1
+                self._wake()
+            else:
+                self._discard(lane, client, waiter)
+            raise
+        waited = self._clock() - started
+        self.admitted[lane] += 1
+        self.wait_seconds[lane] += waited
+        self.max_wait[lane] = max(self.max_wait[lane], waited)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wake(self) -> None:
+        """Admit waiters while tokens last, then sleep until the next token is due."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while self._tokens >= 1:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._tokens -= 1
+            waiter.set_result(None)
+        if self.waiting:
+            delay = (1 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _next_waiter(self) -> asyncio.Future | None:
+        for _ in range(2):
+            for lane in self.LANES:
+                if self._credits[lane] <= 0:
+                    continue
+                waiter = self._pop(lane)
+                if waiter is not None:
+                    self._credits[lane] -= 1
+                    return waiter
+            # Every lane with waiters has used its share of this round: start the next one
+            self._credits = dict(self.LANE_WEIGHTS)
+        return None
+
+    def _pop(self, lane: str) -> asyncio.Future | None:
+        queue = self._queues[lane]
+        while queue:
+            client, waiters = next(iter(queue.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                queue.move_to_end(client)
+            else:
+                del queue[client]
+            if not waiter.done():
+                return waiter
+        return None
+
+    def _discard(self, lane: str, client: Hashable, waiter: asyncio.Future) -> None:
+        waiters = self._queues[lane].get(client)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[lane][client]
+
+    def depth(self, lane: str) -> int:
+        """Number of callers waiting in ``lane``."""
+        return sum(len(waiters) for waiters in self._queues[lane].values())
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers waiting in any lane."""
+        return sum(self.depth(lane) for lane in self.LANES)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the rate, available tokens and per-lane queue depth and wait times."""
+        if self.enabled:
+            self._refill()
+        lanes = {}
+        for lane in self.LANES:
+            waited = self.queued[lane] - self.depth(lane)
+            lanes[lane] = {
+                "admitted": self.admitted[lane],
+                "waiting": self.depth(lane),
+                "waiting_clients": len(self._queues[lane]),
+                "queued_total": self.queued[lane],
+                "avg_wait_ms": (
+                    round(self.wait_seconds[lane] / waited * 1000, 3) if waited > 0 else 0.0
+                ),
+                "max_wait_ms": round(self.max_wait[lane] * 1000, 3),
+            }
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 3),
+            "lanes": lanes,
+        }
+
+
+async def ordered_map(
+    fn: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int
+) -> AsyncIterator[R]:
+    """Yield ``fn(item)`` for each item in input order, with at most ``limit`` calls in flight.
+
+    Items are consumed lazily, so memory stays bounded by ``limit`` however long ``items`` is.
+    If a call raises, the calls still in flight are cancelled and the exception propagates.
+    """
+    pending: deque[asyncio.Future] = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(fn(item)))
+            if len(pending) >= max(1, limit):
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
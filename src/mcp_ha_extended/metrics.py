@@ -0,0 +1,186 @@
+"""Latency and throughput metrics for tool calls and Home Assistant requests."""
+
+import bisect
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+# Histogram bucket upper bounds in seconds (Prometheus defaults)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus label used for each metric group
+GROUP_LABELS = {"tool": "tool", "ha_request": "endpoint", "parse": "format"}
+
+# Collapse IDs in endpoints so each endpoint is one time series
+_ENDPOINT_PATTERNS = (
+    (re.compile(r"^/automation/[^/]+"), "/automation/{id}"),
+    (re.compile(r"^/states/[^/]+"), "/states/{entity_id}"),
+    (re.compile(r"^/history/period/[^/]+"), "/history/period/{start}"),
+)
+
+
+def endpoint_label(method: str, endpoint: str) -> str:
+    """Return a low-cardinality label such as ``GET /automation/{id}``."""
+    path = endpoint.split("?", 1)[0]
+    for pattern, replacement in _ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path, count=1)
+    return f"{method} {path}"
+
+
+def percentile(sorted_samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[rank]
+
+
+class OperationStats:
+    """Counters, in-flight gauge and latency histogram for one tool or endpoint.
+
+    Bucket counts cover every call since start; percentiles are computed over the most recent
+    ``window`` samples so they follow current behaviour.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float, error: bool) -> None:
+        """Record one finished call."""
+        self.calls += 1
+        self.errors += error
+        self.total_seconds += seconds
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self._recent.append(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return counters and latency percentiles in milliseconds."""
+        recent = sorted(self._recent)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "p50_ms": round(percentile(recent, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(recent, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(recent, 0.99) * 1000, 3),
+            "max_ms": round(recent[-1] * 1000, 3) if recent else 0.0,
+            "mean_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+        }
+
+
+class Span:
+    """Handle yielded by ``MetricsRegistry.track``; set ``error`` to count a failure."""
+
+    __slots__ = ("error",)
+
+    def __init__(self):
+        self.error = False
+
+
+class MetricsRegistry:
+    """Metrics grouped by kind (``tool``, ``ha_request``, ``parse``) and name."""
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.started_at = time.time()
+        self._groups: dict[str, dict[str, OperationStats]] = {}
+
+    def stats(self, group: str, name: str) -> OperationStats:
+        """Return (creating if needed) the stats for ``name`` in ``group``."""
+        operations = self._groups.setdefault(group, {})
+        stats = operations.get(name)
+        if stats is None:
+            stats = operations[name] = OperationStats(self.window)
+        return stats
+
+    @contextmanager
+    def track(self, group: str, name: str) -> Iterator[Span]:
+        """Time a block, counting it as in flight while it runs and as an error if it raises."""
+        stats = self.stats(group, name)
+        span = Span()
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.observe(time.perf_counter() - started, span.error)
+
+    def reset(self) -> None:
+        """Drop every recorded metric."""
+        self._groups.clear()
+        self.started_at = time.time()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return every group's metrics as plain data."""
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            **{
+                group: {name: stats.snapshot() for name, stats in sorted(operations.items())}
+                for group, operations in sorted(self._groups.items())
+            },
+        }
+
+    def render_prometheus(self, gauges: dict[str, float] | None = None) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        ``gauges`` adds unlabelled gauge values such as cache sizes or hit counts.
+        """
+        lines = []
+        for group, operations in sorted(self._groups.items()):
+            prefix = f"mcp_ha_{group}"
+            label = GROUP_LABELS.get(group, "name")
+            items = sorted(operations.items())
+            lines += [f"# TYPE {prefix}_calls_total counter"]
+            lines += [f"{prefix}_calls_total{{{_label(label, n)}}} {s.calls}" for n, s in items]
+            lines += [f"# TYPE {prefix}_errors_total counter"]
+            lines += [f"{prefix}_errors_total{{{_label(label, n)}}} {s.errors}" for n, s in items]
+            lines += [f"# TYPE {prefix}_in_flight gauge"]
+            lines += [f"{prefix}_in_flight{{{_label(label, n)}}} {s.in_flight}" for n, s in items]
+            lines += [f"# TYPE {prefix}_duration_seconds histogram"]
+            for name, stats in items:
+                labels = _label(label, name)
+                cumulative = 0
+                for bound, count in zip((*BUCKETS, "+Inf"), stats.bucket_counts, strict=True):
+                    cumulative += count
+                    lines.append(
+                        f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {stats.total_seconds}")
+                lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {stats.calls}")
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE mcp_ha_{name} gauge", f"mcp_ha_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _label(name: str, value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'{name}="{escaped}"'
+
+
+async def start_metrics_server(render: Callable[[], str], host: str, port: int) -> "web.AppRunner":
+    """Serve ``render()`` as Prometheus text on ``http://host:port/metrics``."""
+    from aiohttp import web
+
+    async def handle(request: "web.Request") -> "web.Response":
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,104 @@
+"""Fast parsing of automation configurations supplied as YAML or JSON text."""
+
+import copy
+import functools
+import hashlib
+import json
+from typing import Any
+
+from mcp_ha_extended.cache import MISSING, TTLCache
+
+
+@functools.cache
+def yaml_classes() -> tuple[type, type]:
+    """Return the safe YAML loader and dumper, importing PyYAML on first use.
+
+    libyaml's C implementation is several times faster; fall back to pure Python without it.
+    """
+    import yaml
+
+    return (
+        getattr(yaml, "CSafeLoader", yaml.SafeLoader),
+        getattr(yaml, "CSafeDumper", yaml.SafeDumper),
+    )
+
+
+def libyaml_available() -> bool:
+    """Whether YAML is parsed by libyaml rather than the pure-Python loader."""
+    return yaml_classes()[0].__name__ == "CSafeLoader"
+
+
+def load_yaml(text: str) -> Any:
+    """Parse YAML with the fastest available safe loader."""
+    import yaml
+
+    return yaml.load(text, Loader=yaml_classes()[0])
+
+
+def dump_yaml(data: Any) -> str:
+    """Serialize data to block-style YAML with the fastest available safe dumper."""
+    import yaml
+
+    return yaml.dump(data, Dumper=yaml_classes()[1], default_flow_style=False, sort_keys=False)
+
+
+def content_hash(text: str) -> str:
+    """Return a stable digest of a configuration's text."""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def canonical_hash(config: Any) -> str:
+    """Return a digest of a parsed config that ignores key order and formatting.
+
+    Two configs hash the same exactly when they are equal as JSON data.
+    """
+    text = json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def detect_format(text: str) -> str:
+    """Return ``json`` for text that looks like a JSON object, otherwise ``yaml``."""
+    return "json" if text.lstrip().startswith("{") else "yaml"
+
+
+def parse_config(text: str) -> Any:
+    """Parse a configuration, skipping the YAML parser for JSON objects.
+
+    JSON is a subset of YAML, so text that only looks like JSON (e.g. a YAML flow mapping)
+    falls back to the YAML loader.
+    """
+    if detect_format(text) == "json":
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return load_yaml(text)
+
+
+class ParseCache:
+    """LRU cache of parsed configurations keyed by a hash of their text.
+
+    Callers get their own deep copy, so mutating a result never changes the cached one.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self._cache = TTLCache(ttl=None, max_entries=max_entries)
+
+    def get(self, text: str) -> Any:
+        """Return a copy of the parsed config for ``text`` or ``MISSING``."""
+        value = self._cache.get(content_hash(text))
+        return value if value is MISSING else copy.deepcopy(value)
+
+    def set(self, text: str, value: Any) -> None:
+        """Store a copy of the parsed config for ``text``."""
+        if self._cache.enabled:
+            self._cache.set(content_hash(text), copy.deepcopy(value))
+
+    def clear(self) -> None:
+        """Drop every cached result and reset the counters."""
+        self._cache.clear()
+        self._cache.reset_stats()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and size, plus whether libyaml is in use."""
+        return {**self._cache.stats(), "libyaml": libyaml_available()}
@@ -0,0 +1,154 @@
+"""SQLite copy of cached automation responses that survives restarts.
+
+A restarted server answers its first reads from disk instead of Home Assistant and refreshes
+each entry in the background. Only the first read of a key after start is served from disk,
+so entries that may be stale are never served twice.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Hashable
+
+from mcp_ha_extended.cache import MISSING
+from mcp_ha_extended.parsing import canonical_hash
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL
+)
+"""
+
+
+class PersistentCache:
+    """Cache entries stored by key with a content hash, in a SQLite database.
+
+    The database is opened on first use. Every operation runs on one worker thread, in the
+    order it was requested, so the event loop never blocks on disk and a write can never
+    overtake a later delete of the same key.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: "sqlite3.Connection | None" = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ha-cache-db")
+        # Keys already read from disk (or known to be fresh) in this process
+        self._served: set[Hashable] = set()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self) -> "sqlite3.Connection":
+        if self._db is None:
+            import sqlite3
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            # WAL lets a respawned process read while the old one is still writing
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _submit(self, fn, *args) -> Future:
+        import sqlite3
+
+        def run():
+            try:
+                return fn(self._connect(), *args)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                self.errors += 1
+                logger.warning("Persistent cache %s failed: %s", fn.__name__, e)
+                return MISSING
+
+        return self._executor.submit(run)
+
+    async def load(self, key: Hashable) -> Any:
+        """Return the stored value for ``key``, or ``MISSING``; each key is served only once."""
+        if key in self._served:
+            return MISSING
+        self._served.add(key)
+        value = await asyncio.wrap_future(self._submit(_select, str(key)))
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store(self, key: Hashable, value: Any) -> Future:
+        """Save ``value`` under ``key``; unchanged content is not rewritten."""
+        self._served.add(key)
+        self.writes += 1
+        return self._submit(_upsert, str(key), value)
+
+    def delete(self, *keys: Hashable) -> Future:
+        """Forget ``keys`` so a restart does not serve them."""
+        self._served.update(keys)
+        return self._submit(_delete, [str(key) for key in keys])
+
+    def clear(self) -> Future:
+        """Forget every entry."""
+        return self._submit(_clear)
+
+    def close(self) -> None:
+        """Finish pending operations and close the database."""
+        self._executor.shutdown(wait=True)
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return disk hit/miss/write/error counters."""
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+
+
+def _select(db: "sqlite3.Connection", key: str) -> Any:
+    row = db.execute("SELECT hash, value FROM entries WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return MISSING
+    value = json.loads(row[1])
+    if canonical_hash(value) != row[0]:
+        raise ValueError(f"Corrupt entry for {key}")
+    return value
+
+
+def _upsert(db: "sqlite3.Connection", key: str, value: Any) -> None:
+    text = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    with db:
+        db.execute(
+            "INSERT INTO entries (key, hash, value, stored_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET hash = excluded.hash, value = excluded.value, "
+            "stored_at = excluded.stored_at WHERE entries.hash != excluded.hash",
+            (key, canonical_hash(value), text, time.time()),
+        )
+
+
+def _delete(db: "sqlite3.Connection", keys: list[str]) -> None:
+    with db:
+        db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+
+
+def _clear(db: "sqlite3.Connection") -> None:
+    with db:
+        db.execute("DELETE FROM entries")
@@ -0,0 +1,138 @@
+"""Retry and circuit breaker policies for Home Assistant API calls."""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+
+# Methods that can be repeated without changing the outcome
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Statuses that mean "try again later" rather than "your request is wrong"
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Home Assistant while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(
+            f"Home Assistant is unavailable; not sending requests for another {retry_in:.1f}s"
+        )
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """Parse a ``Retry-After`` header (seconds or HTTP date) into a delay in seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at - (time.time() if now is None else now))
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, capped at ``max_delay``."""
+
+    def __init__(
+        self,
+        retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        rng: Callable[[float, float], float] = random.uniform,
+    ):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    def should_retry(self, method: str, attempt: int, status: int | None) -> bool:
+        """Whether a failed attempt (0-based) may be repeated.
+
+        Idempotent methods are retried on connection errors, timeouts and retryable statuses.
+        Other methods are only retried on 429, where Home Assistant refused the request.
+        """
+        if attempt >= self.retries:
+            return False
+        if method.upper() in IDEMPOTENT_METHODS:
+            return status is None or status in RETRYABLE_STATUSES
+        return status == 429
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Seconds to wait before retrying after the given (0-based) attempt."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self._rng(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, then let a single probe through after a cool-down.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. Once ``reset_timeout``
+    has passed it lets one call through (half-open): success closes it again, failure re-opens
+    it. A probe that never reports back is replaced after another ``reset_timeout``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` if calls should not be attempted right now."""
+        if self.state == self.CLOSED:
+            return
+        now = self._clock()
+        if self.state == self.OPEN:
+            retry_in = self._opened_at + self.reset_timeout - now
+            if retry_in > 0:
+                raise CircuitOpenError(retry_in)
+            self.state = self.HALF_OPEN
+            self._probe_at = now
+            return
+        # Half-open: a probe is in flight
+        retry_in = self._probe_at + self.reset_timeout - now
+        if retry_in > 0:
+            raise CircuitOpenError(retry_in)
+        self._probe_at = now
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker once the threshold is reached."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self._opened_at = self._clock()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the breaker state and counters."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,213 @@
+"""In-memory inverted index over automation configs."""
+
+import re
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Iterable
+
+# Keys whose presence means an automation object carries its full configuration
+CONFIG_KEYS = ("trigger", "triggers", "action", "actions")
+
+SUMMARY_FIELDS = ("id", "alias", "enabled", "description")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> set[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _walk(value: Any, terms: dict[str, set[str]]) -> None:
+    """Collect entity IDs, services and condition types from any nested config."""
+    if isinstance(value, list):
+        for item in value:
+            _walk(item, terms)
+        return
+    if not isinstance(value, dict):
+        return
+    for key, item in value.items():
+        if key == "entity_id":
+            for entity_id in _as_list(item):
+                if isinstance(entity_id, str):
+                    terms["entity"].update(e.strip() for e in entity_id.split(",") if e.strip())
+        elif key in ("service", "action") and isinstance(item, str) and "." in item:
+            terms["service"].add(item)
+        elif key == "condition" and isinstance(item, str):
+            terms["condition"].add(item)
+        else:
+            _walk(item, terms)
+
+
+def extract_terms(automation: dict[str, Any]) -> dict[str, set[str]]:
+    """Return the indexed terms of an automation, grouped by field."""
+    terms: dict[str, set[str]] = {
+        "entity": set(),
+        "service": set(),
+        "trigger": set(),
+        "condition": set(),
+        "text": set(),
+    }
+    for trigger in _as_list(automation.get("triggers", automation.get("trigger"))):
+        if isinstance(trigger, dict):
+            platform = trigger.get("platform") or trigger.get("trigger")
+            if isinstance(platform, str):
+                terms["trigger"].add(platform)
+    _walk({k: v for k, v in automation.items() if k not in ("alias", "description")}, terms)
+    terms["text"] = tokenize(
+        f"{automation.get('alias') or ''} {automation.get('description') or ''}"
+    )
+    return terms
+
+
+class AutomationIndex:
+    """Inverted index from entity IDs, services, trigger platforms, condition types and alias
+    tokens to automation IDs.
+
+    Lookups intersect posting sets, so they stay fast regardless of how many automations are
+    indexed. Documents can be added, replaced and removed incrementally; each may carry a
+    fingerprint of the list entry it was built from, so a refresh only refetches what changed.
+    """
+
+    def __init__(self):
+        self._postings: dict[tuple[str, str], set[str]] = defaultdict(set)
+        self._terms: dict[str, dict[str, set[str]]] = {}
+        self._summaries: dict[str, dict[str, Any]] = {}
+        self._fingerprints: dict[str, str | None] = {}
+        # Sorted alias/description tokens, for prefix lookups
+        self._vocabulary: list[str] = []
+        self.loaded = False
+        self.built_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def rebuild(self, automations: Iterable[dict[str, Any]]) -> None:
+        """Replace the index contents with the given automation configs."""
+        self.clear()
+        for automation in automations:
+            self.add(automation)
+        self.mark_built()
+
+    def mark_built(self) -> None:
+        """Mark the index as complete and up to date as of now."""
+        self.loaded = True
+        self.built_at = time.monotonic()
+
+    def clear(self) -> None:
+        """Drop everything and mark the index as needing a rebuild."""
+        self._postings.clear()
+        self._terms.clear()
+        self._summaries.clear()
+        self._fingerprints.clear()
+        self._vocabulary.clear()
+        self.loaded = False
+
+    def add(self, automation: dict[str, Any], fingerprint: str | None = None) -> None:
+        """Index an automation, replacing any previous version with the same ID."""
+        automation_id = automation.get("id")
+        if automation_id is None:
+            return
+        automation_id = str(automation_id)
+        self.remove(automation_id)
+        terms = extract_terms(automation)
+        for field, values in terms.items():
+            for value in values:
+                key = (field, value.lower())
+                if field == "text" and key not in self._postings:
+                    insort(self._vocabulary, key[1])
+                self._postings[key].add(automation_id)
+        self._terms[automation_id] = terms
+        self._fingerprints[automation_id] = fingerprint
+        self._summaries[automation_id] = {
+            field: automation.get(field, True if field == "enabled" else None)
+            for field in SUMMARY_FIELDS
+        } | {"id": automation_id}
+
+    def remove(self, automation_id: str) -> None:
+        """Remove an automation from the index."""
+        terms = self._terms.pop(automation_id, None)
+        self._summaries.pop(automation_id, None)
+        self._fingerprints.pop(automation_id, None)
+        if terms is None:
+            return
+        for field, values in terms.items():
+            for value in values:
+                key = (field, value.lower())
+                postings = self._postings.get(key)
+                if postings is not None:
+                    postings.discard(automation_id)
+                    if not postings:
+                        del self._postings[key]
+                        if field == "text":
+                            del self._vocabulary[bisect_left(self._vocabulary, key[1])]
+
+    def fingerprint(self, automation_id: str) -> str | None:
+        """Return the fingerprint an automation was indexed with, if any."""
+        return self._fingerprints.get(automation_id)
+
+    def retain(self, automation_ids: Iterable[str]) -> None:
+        """Remove every automation not in ``automation_ids``."""
+        keep = set(automation_ids)
+        for automation_id in [a for a in self._summaries if a not in keep]:
+            self.remove(automation_id)
+
+    def set_enabled(self, automation_id: str, enabled: bool) -> None:
+        """Update the enabled flag reported for an indexed automation."""
+        summary = self._summaries.get(automation_id)
+        if summary is not None:
+            summary["enabled"] = enabled
+
+    def _prefix_postings(self, prefix: str) -> set[str]:
+        """Return the automations with an alias or description token starting with ``prefix``."""
+        matches: set[str] = set()
+        for i in range(bisect_left(self._vocabulary, prefix), len(self._vocabulary)):
+            term = self._vocabulary[i]
+            if not term.startswith(prefix):
+                break
+            matches |= self._postings[("text", term)]
+        return matches
+
+    def search(
+        self,
+        *,
+        entity_id: str | None = None,
+        service: str | None = None,
+        trigger_platform: str | None = None,
+        condition_type: str | None = None,
+        text: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return summaries of automations matching every given criterion.
+
+        ``text`` matches when each of its tokens starts a word of the alias or description, so
+        ``light`` finds both "Porch light" and "Kitchen lights".
+        """
+        candidates: set[str] | None = None
+        for field, value in (
+            ("entity", entity_id),
+            ("service", service),
+            ("trigger", trigger_platform),
+            ("condition", condition_type),
+        ):
+            if value:
+                postings = self._postings.get((field, value.lower()), set())
+                candidates = postings.copy() if candidates is None else candidates & postings
+                if not candidates:
+                    return []
+
+        for token in tokenize(text or ""):
+            postings = self._prefix_postings(token)
+            candidates = postings if candidates is None else candidates & postings
+            if not candidates:
+                return []
+
+        if candidates is None:
+            candidates = set(self._summaries)
+        return [self._summaries[automation_id] for automation_id in sorted(candidates)]
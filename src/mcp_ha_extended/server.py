@@ -5,19 +5,110 @@ This MCP server provides tools to manage Home Assistant automations via the REST
 """
 
 import asyncio
+import base64
+import binascii
 import json
+import logging
 import os
-from typing import Any, Sequence
+import secrets
+import time
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Sequence
+from urllib.parse import quote
 
-import aiohttp
-import yaml
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
+from mcp_ha_extended import client
+from mcp_ha_extended.backend import BACKENDS, websocket_route
+from mcp_ha_extended.backup import (
+    BackupWriter,
+    default_backup_dir,
+    default_backup_name,
+    read_backup,
+    resolve_backup_path,
+)
+from mcp_ha_extended.budget import fit, resolve_path
+from mcp_ha_extended.cache import MISSING, TTLCache
+from mcp_ha_extended.concurrency import (
+    ConcurrencyLimit,
+    KeyedLock,
+    RateLimiter,
+    SingleFlight,
+    ordered_map,
+)
+from mcp_ha_extended.metrics import MetricsRegistry, endpoint_label, start_metrics_server
+from mcp_ha_extended.parsing import ParseCache, canonical_hash, detect_format, parse_config
+from mcp_ha_extended.persistent import PersistentCache
+from mcp_ha_extended.resilience import CircuitBreaker, RetryPolicy, parse_retry_after
+from mcp_ha_extended.search import CONFIG_KEYS, AutomationIndex
+from mcp_ha_extended.states import StateStore
+from mcp_ha_extended.traces import filter_runs, summarize_history, summarize_trace, time_window
+from mcp_ha_extended.validation import (
+    SERVICE_RE,
+    AutomationValidationError,
+    validate_automation,
+)
+
+# aiohttp, PyYAML and the WebSocket client are imported on first use so the server can answer
+# ``initialize`` sooner; only the MCP SDK is needed for that
+if TYPE_CHECKING:
+    import aiohttp
+
+    from mcp_ha_extended.websocket import HAWebSocketClient
+
+logger = logging.getLogger(__name__)
+
 # Configuration
 HA_URL = os.getenv("HA_URL", "http://homeassistant.local:8123")
 HA_TOKEN = os.getenv("HA_TOKEN", "")
+HA_CACHE_TTL = float(os.getenv("HA_CACHE_TTL", "30"))
+HA_CACHE_MAX_ENTRIES = int(os.getenv("HA_CACHE_MAX_ENTRIES", "512"))
+HA_REQUEST_TIMEOUT = float(os.getenv("HA_REQUEST_TIMEOUT", "10"))
+HA_RETRY_ATTEMPTS = int(os.getenv("HA_RETRY_ATTEMPTS", "3"))
+HA_RETRY_BACKOFF = float(os.getenv("HA_RETRY_BACKOFF", "0.5"))
+HA_RETRY_MAX_BACKOFF = float(os.getenv("HA_RETRY_MAX_BACKOFF", "10"))
+HA_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HA_CIRCUIT_FAILURE_THRESHOLD", "5"))
+HA_CIRCUIT_RESET_TIMEOUT = float(os.getenv("HA_CIRCUIT_RESET_TIMEOUT", "30"))
+HA_MAX_INFLIGHT = int(os.getenv("HA_MAX_INFLIGHT", "10"))
+HA_RATE_LIMIT = float(os.getenv("HA_RATE_LIMIT", "50"))
+HA_RATE_BURST = int(os.getenv("HA_RATE_BURST", "100"))
+HA_PARSE_CACHE_SIZE = int(os.getenv("HA_PARSE_CACHE_SIZE", "128"))
+HA_METRICS_PORT = int(os.getenv("HA_METRICS_PORT", "0"))
+HA_METRICS_HOST = os.getenv("HA_METRICS_HOST", "0.0.0.0")
+HA_OUTPUT_FORMAT = os.getenv("HA_OUTPUT_FORMAT", "pretty").lower()
+HA_BATCH_CONCURRENCY = int(os.getenv("HA_BATCH_CONCURRENCY", "8"))
+HA_BACKUP_DIR = os.getenv("HA_BACKUP_DIR") or default_backup_dir()
+HA_CACHE_FILE = os.getenv("HA_CACHE_FILE", "")
+HA_RESPONSE_MAX_BYTES = int(os.getenv("HA_RESPONSE_MAX_BYTES", "65536"))
+HA_CONTINUATION_TTL = float(os.getenv("HA_CONTINUATION_TTL", "300"))
+HA_TRANSPORT = os.getenv("HA_TRANSPORT", "stdio").lower()
+HA_BACKEND = os.getenv("HA_BACKEND", "rest").lower()
+HA_HTTP_HOST = os.getenv("HA_HTTP_HOST", "0.0.0.0")
+HA_HTTP_PORT = int(os.getenv("HA_HTTP_PORT", "8000"))
+HA_HTTP_AUTH_TOKEN = os.getenv("HA_HTTP_AUTH_TOKEN", "")
+HA_VALIDATE_AUTOMATIONS = os.getenv("HA_VALIDATE_AUTOMATIONS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+HA_WEBSOCKET_EVENTS = os.getenv("HA_WEBSOCKET_EVENTS", "false").lower() in ("1", "true", "yes")
+
+# Fields returned by list_automations when the caller does not ask for specific ones
+DEFAULT_LIST_FIELDS = ("id", "alias", "enabled", "description")
+
+# Events that can change the automation configs we cache
+AUTOMATION_EVENT_TYPES = ("automation_reloaded", "state_changed", "entity_registry_updated")
+
+# Events that change entity states or the areas entities belong to
+STATE_EVENT_TYPES = (
+    "state_changed",
+    "entity_registry_updated",
+    "device_registry_updated",
+    "area_registry_updated",
+)
 
 
 def _check_ha_token():
@@ -25,25 +116,1064 @@ def _check_ha_token():
     if not HA_TOKEN:
         raise ValueError("HA_TOKEN environment variable must be set")
 
+
+def dump_json(data: Any) -> str:
+    """Serialize a tool response in the configured output format (``pretty`` or ``compact``)."""
+    if HA_OUTPUT_FORMAT == "compact":
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, indent=2)
+
+
+def project(automation: dict[str, Any], fields: Sequence[str]) -> dict[str, Any]:
+    """Keep only the requested fields of an automation."""
+    return {field: automation.get(field, True if field == "enabled" else None) for field in fields}
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a list offset as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a pagination cursor produced by ``encode_cursor``."""
+    try:
+        prefix, _, offset = base64.urlsafe_b64decode(cursor.encode()).decode().partition(":")
+        if prefix == "offset" and offset.isdigit():
+            return int(offset)
+    except (binascii.Error, UnicodeDecodeError):
+        pass
+    raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def paginate(items: Sequence[Any], arguments: dict, key: str) -> dict[str, Any]:
+    """Return the page of ``items`` selected by the ``offset``/``cursor`` and ``limit`` arguments.
+
+    ``next_cursor`` is included when more items follow.
+    """
+    if "cursor" in arguments:
+        offset = decode_cursor(arguments["cursor"])
+    else:
+        offset = arguments.get("offset", 0)
+    limit = arguments.get("limit")
+    end = len(items) if limit is None else min(offset + limit, len(items))
+    page = {"count": len(items), "offset": offset, key: list(items[offset:end])}
+    if end < len(items):
+        page["next_cursor"] = encode_cursor(end)
+    return page
+
+
 # MCP Server instance
 server = Server("home-assistant-automations")
 
+# Read-through cache for the /automation and /automation/{id} endpoints, keyed by endpoint
+automation_cache = TTLCache(ttl=HA_CACHE_TTL, max_entries=HA_CACHE_MAX_ENTRIES)
+
+# Full responses that were cut to fit HA_RESPONSE_MAX_BYTES, keyed by continuation handle
+continuations = TTLCache(ttl=HA_CONTINUATION_TTL, max_entries=32)
+
+# Parsed automation configs keyed by a hash of their text, for agents resending the same YAML
+parse_cache = ParseCache(max_entries=HA_PARSE_CACHE_SIZE)
+
+# Per-tool, per-endpoint and parsing latency metrics
+metrics = MetricsRegistry()
+
+# Transient failure handling for every request sent to Home Assistant
+retry_policy = RetryPolicy(
+    retries=HA_RETRY_ATTEMPTS, base_delay=HA_RETRY_BACKOFF, max_delay=HA_RETRY_MAX_BACKOFF
+)
+circuit_breaker = CircuitBreaker(
+    failure_threshold=HA_CIRCUIT_FAILURE_THRESHOLD, reset_timeout=HA_CIRCUIT_RESET_TIMEOUT
+)
+
+# Shares one response between identical GETs that are in flight at the same time
+inflight_gets = SingleFlight()
+
+# Search index over full automation configs, built lazily by ensure_index()
+automation_index = AutomationIndex()
+_index_builds = SingleFlight()
+
+# Mirror of entity states that the entity tools answer from, loaded lazily by ensure_states()
+state_store = StateStore()
+
+# On-disk copy of automation_cache for warm restarts, off unless HA_CACHE_FILE is set
+persistent_cache = PersistentCache(HA_CACHE_FILE) if HA_CACHE_FILE else None
+
+# Background refreshes of entries served from persistent_cache
+_revalidations: set[asyncio.Task] = set()
+_state_loads = SingleFlight()
+
+# WebSocket connection shared by the event listener and commands, opened on first use
+websocket_client: "HAWebSocketClient | None" = None
+
+# Caps requests on the wire so queued ones don't burn their timeout waiting for a connection
+ha_request_limit = ConcurrencyLimit(HA_MAX_INFLIGHT)
+
+# Caps the request rate so agents can't starve Home Assistant, sharing it fairly between clients
+rate_limiter = RateLimiter(HA_RATE_LIMIT, HA_RATE_BURST)
+
+# Serializes writes to the same automation so concurrent GET/PUT sequences never interleave
+automation_locks = KeyedLock()
+
+# Automation config ID -> entity ID, learned from configs and state_changed events
+automation_entity_ids: dict[str, str] = {}
+
+
+def current_client() -> int | None:
+    """Identify the MCP session the current request belongs to, for fair rate limiting."""
+    try:
+        return id(server.request_context.session)
+    except LookupError:
+        return None
+
 
 async def ha_api_call(method: str, endpoint: str, data: dict | None = None) -> dict:
-    """Make an authenticated API call to Home Assistant."""
+    """Make an authenticated API call to Home Assistant.
+
+    Identical GETs issued while one is already in flight share its response; other methods
+    always reach Home Assistant.
+    """
     _check_ha_token()
+    if method == "GET":
+        return await inflight_gets.do(endpoint, partial(_dispatch, method, endpoint, data))
+    return await _dispatch(method, endpoint, data)
+
+
+async def _dispatch(method: str, endpoint: str, data: dict | None) -> dict:
+    """Send a request over the configured backend.
+
+    With ``HA_BACKEND=websocket``, requests that have a WebSocket API equivalent are sent on
+    the shared connection; the rest, and every request while it is reconnecting, use REST.
+    Reads interrupted by a dropped connection are repeated over REST; writes are not, since
+    they may already have been applied.
+    """
+    if HA_BACKEND == "websocket":
+        route = websocket_route(method, endpoint, data, automation_entity_id)
+        if route is not None and await websocket_available():
+            try:
+                return route.adapt(await websocket_call(route.message))
+            except ConnectionError:
+                if method != "GET":
+                    raise
+    return await _send(method, endpoint, data)
+
+
+async def _send(method: str, endpoint: str, data: dict | None) -> dict:
+    """Send a request, retrying transient failures and failing fast while HA is down.
+
+    Connection errors, timeouts and 5xx responses count against the circuit breaker.
+    Idempotent methods are retried with jittered backoff, honouring ``Retry-After``.
+    """
+    import aiohttp
+
+    attempt = 0
+    while True:
+        circuit_breaker.before_call()
+        await rate_limiter.acquire(current_client(), "read" if method == "GET" else "write")
+        try:
+            async with ha_request_limit:
+                with metrics.track("ha_request", endpoint_label(method, endpoint)):
+                    result = await _send_once(method, endpoint, data)
+        except aiohttp.ClientResponseError as e:
+            status = e.status
+            retry_after = parse_retry_after(e.headers.get("Retry-After") if e.headers else None)
+            if status >= 500:
+                circuit_breaker.record_failure()
+            else:
+                # Home Assistant answered, so it is up even if it rejected the request
+                circuit_breaker.record_success()
+            error: Exception = e
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            status = None
+            retry_after = None
+            circuit_breaker.record_failure()
+            error = e
+        else:
+            circuit_breaker.record_success()
+            return result
+
+        if not retry_policy.should_retry(method, attempt, status):
+            raise error
+        await asyncio.sleep(retry_policy.delay(attempt, retry_after))
+        attempt += 1
+
+
+async def _send_once(method: str, endpoint: str, data: dict | None) -> dict:
+    """Send one request to Home Assistant over the shared session."""
+    import aiohttp
+
     url = f"{HA_URL}/api{endpoint}"
     headers = {
         "Authorization": f"Bearer {HA_TOKEN}",
         "Content-Type": "application/json",
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.request(method, url, headers=headers, json=data) as response:
-            response.raise_for_status()
-            if response.content_type == "application/json":
-                return await response.json()
-            return {"status": "success", "status_code": response.status}
+    session = await client.acquire_session()
+    if session is None:
+        # No shared session (e.g. when used as a library): fall back to a one-off session
+        async with aiohttp.ClientSession() as session:
+            return await _request(session, method, url, headers, data)
+    return await _request(session, method, url, headers, data)
+
+
+async def _request(
+    session: "aiohttp.ClientSession",
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    data: dict | None,
+) -> dict:
+    """Send a single request on the given session and decode the response."""
+    import aiohttp
+
+    timeout = aiohttp.ClientTimeout(total=HA_REQUEST_TIMEOUT)
+    async with session.request(
+        method, url, headers=headers, json=data, timeout=timeout
+    ) as response:
+        response.raise_for_status()
+        if response.content_type == "application/json":
+            return await response.json()
+        return {"status": "success", "status_code": response.status}
+
+
+async def cached_get(endpoint: str) -> Any:
+    """GET an automation endpoint, serving it from the automation cache when possible.
+
+    After a restart, the first read of an endpoint is answered from ``persistent_cache`` and
+    refreshed from Home Assistant in the background.
+    """
+    result = automation_cache.get(endpoint)
+    if result is not MISSING:
+        return result
+    generation = automation_cache.generation
+    if persistent_cache is not None and automation_cache.enabled:
+        result = await persistent_cache.load(endpoint)
+        if result is not MISSING and automation_cache.generation == generation:
+            automation_cache.set(endpoint, result)
+            _revalidate(endpoint, result)
+            return result
+    result = await ha_api_call("GET", endpoint)
+    # Don't cache a response that an invalidation raced past while it was in flight
+    if automation_cache.generation == generation:
+        remember_automation(endpoint, result)
+    return result
+
+
+def _revalidate(endpoint: str, stored: Any) -> None:
+    """Refresh an entry served from disk, replacing it if Home Assistant has changed it."""
+
+    async def refresh() -> None:
+        generation = automation_cache.generation
+        try:
+            result = await ha_api_call("GET", endpoint)
+        except Exception as e:
+            logger.warning("Could not revalidate %s: %s", endpoint, e)
+            automation_cache.invalidate(endpoint)
+            return
+        if automation_cache.generation != generation:
+            return
+        remember_automation(endpoint, result)
+        if endpoint == "/automation" and canonical_hash(result) != canonical_hash(stored):
+            automation_index.clear()
+
+    task = asyncio.create_task(refresh())
+    _revalidations.add(task)
+    task.add_done_callback(_revalidations.discard)
+
+
+def remember_automation(endpoint: str, result: Any) -> None:
+    """Cache an automation response in memory and, if enabled, on disk."""
+    automation_cache.set(endpoint, result)
+    if persistent_cache is not None and automation_cache.enabled:
+        persistent_cache.store(endpoint, result)
+
+
+def invalidate_automation(automation_id: str | None = None) -> None:
+    """Drop cached automation data after a successful write."""
+    endpoints = ["/automation"]
+    if automation_id is not None:
+        endpoints.append(f"/automation/{automation_id}")
+    # A GET that started before the write must not answer reads made after it
+    inflight_gets.forget(*endpoints)
+    automation_cache.invalidate(*endpoints)
+    if persistent_cache is not None:
+        persistent_cache.delete(*endpoints)
+
+
+def forget_automations() -> None:
+    """Drop every cached automation, in memory and on disk, e.g. after a reload."""
+    inflight_gets.forget(*(key for key in inflight_gets.keys() if key.startswith("/automation")))
+    automation_cache.clear()
+    automation_index.clear()
+    if persistent_cache is not None:
+        persistent_cache.clear()
+
+
+def parse_automation_yaml(automation_yaml: str) -> Any:
+    """Parse an automation's YAML (or JSON) configuration, reusing recently parsed results."""
+    automation_dict = parse_cache.get(automation_yaml)
+    if automation_dict is MISSING:
+        with metrics.track("parse", detect_format(automation_yaml)):
+            automation_dict = parse_config(automation_yaml)
+        parse_cache.set(automation_yaml, automation_dict)
+    return automation_dict
+
+
+def check_automation(config: Any) -> None:
+    """Refuse a config that fails offline validation, unless ``HA_VALIDATE_AUTOMATIONS`` is off.
+
+    Entities are checked against the state mirror only if it is already loaded.
+    """
+    if not HA_VALIDATE_AUTOMATIONS:
+        return
+    entity_exists = state_store.__contains__ if state_store.loaded else None
+    result = validate_automation(config, entity_exists)
+    if not result["valid"]:
+        raise AutomationValidationError(result)
+
+
+async def create_automation(automation_yaml: str) -> dict:
+    """Create an automation from YAML and return Home Assistant's response."""
+    automation_dict = parse_automation_yaml(automation_yaml)
+    check_automation(automation_dict)
+    config_id = automation_dict.get("id") if isinstance(automation_dict, dict) else None
+
+    # Home Assistant expects the automation object directly
+    async with automation_locks.lock(*([str(config_id)] if config_id is not None else [])):
+        result = await ha_api_call("POST", "/automation", automation_dict)
+    invalidate_automation()
+    automation_id = (result.get("id") if isinstance(result, dict) else None) or config_id
+    if automation_index.loaded and automation_id is not None:
+        automation_index.add({**automation_dict, "id": automation_id})
+    return result
+
+
+async def update_automation(automation_id: str, automation_yaml: str) -> dict:
+    """Replace an automation's configuration with the given YAML."""
+    automation_dict = parse_automation_yaml(automation_yaml)
+    check_automation(automation_dict)
+    return await put_automation(automation_id, automation_dict)
+
+
+async def put_automation(automation_id: str, automation_dict: Any) -> dict:
+    """Write an automation's full configuration, creating the automation if it is missing."""
+    async with automation_locks.lock(automation_id):
+        result = await ha_api_call("PUT", f"/automation/{automation_id}", automation_dict)
+        invalidate_automation(automation_id)
+        if automation_index.loaded and isinstance(automation_dict, dict):
+            automation_index.add({**automation_dict, "id": automation_id})
+    return result
+
+
+async def delete_automation(automation_id: str) -> None:
+    """Delete an automation."""
+    async with automation_locks.lock(automation_id):
+        await ha_api_call("DELETE", f"/automation/{automation_id}")
+        invalidate_automation(automation_id)
+        automation_index.remove(automation_id)
+
+
+def automation_list(result: Any) -> list[dict[str, Any]]:
+    """Return the automations of a ``GET /automation`` response."""
+    return result if isinstance(result, list) else result.get("automations", [])
+
+
+def has_config(automation: dict[str, Any]) -> bool:
+    """Whether an automation object carries its full configuration, not just a summary."""
+    return any(key in automation for key in CONFIG_KEYS)
+
+
+async def fetch_config(automation: dict[str, Any], cached: bool = False) -> dict[str, Any]:
+    """Return the full configuration of a listed automation, fetching it if only summarized.
+
+    With ``cached`` the fetch is served from the automation cache when possible.
+    """
+    if has_config(automation) or automation.get("id") is None:
+        return automation
+    endpoint = f"/automation/{automation['id']}"
+    config = await (cached_get(endpoint) if cached else ha_api_call("GET", endpoint))
+    return {**config, "id": automation["id"]} if isinstance(config, dict) else automation
+
+
+async def current_config_hashes(cached: bool = False) -> dict[str, str | None]:
+    """Map every automation ID to the ``canonical_hash`` of its current configuration.
+
+    Entries are ``None`` where the list only carries a summary; ``config_hash`` fetches those.
+    """
+    result = await (cached_get("/automation") if cached else ha_api_call("GET", "/automation"))
+    return {
+        str(automation["id"]): canonical_hash(automation) if has_config(automation) else None
+        for automation in automation_list(result)
+        if automation.get("id") is not None
+    }
+
+
+async def config_hash(
+    automation_id: str, hashes: dict[str, str | None], cached: bool = False
+) -> str | None:
+    """Return the current config hash of an automation, or ``None`` if it does not exist."""
+    if automation_id not in hashes:
+        return None
+    if hashes[automation_id] is None:
+        config = await fetch_config({"id": automation_id}, cached=cached)
+        hashes[automation_id] = canonical_hash(config)
+    return hashes[automation_id]
+
+
+def desired_automations(automations: list[Any]) -> dict[str, dict[str, Any]]:
+    """Parse a desired set of automation configs (YAML/JSON text or objects) keyed by ID."""
+    desired = {}
+    for i, automation in enumerate(automations):
+        config = parse_automation_yaml(automation) if isinstance(automation, str) else automation
+        if not isinstance(config, dict) or config.get("id") in (None, ""):
+            raise ValueError(f"Automation {i} must be a mapping with an 'id'")
+        check_automation(config)
+        automation_id = str(config["id"])
+        if automation_id in desired:
+            raise ValueError(f"Duplicate automation ID: {automation_id}")
+        desired[automation_id] = {**config, "id": automation_id}
+    return desired
+
+
+async def sync_automations(
+    automations: list[Any],
+    delete_missing: bool = False,
+    dry_run: bool = False,
+    max_concurrency: int = HA_BATCH_CONCURRENCY,
+) -> dict[str, Any]:
+    """Make Home Assistant's automations match a desired set with as few writes as possible.
+
+    Current configs are compared by ``canonical_hash``, read through the automation cache, so
+    only new or changed automations are written. With ``delete_missing``, automations absent
+    from the desired set are deleted. Every config is parsed before anything is written.
+    """
+    desired = desired_automations(automations)
+    hashes = await current_config_hashes(cached=True)
+    to_delete = [i for i in hashes if i not in desired] if delete_missing else []
+    result = {"created": [], "updated": [], "deleted": [], "unchanged": 0, "errors": []}
+
+    async def apply(automation_id: str) -> tuple[str, str, str | None]:
+        action = "delete"
+        try:
+            if automation_id in desired:
+                config = desired[automation_id]
+                current = await config_hash(automation_id, hashes, cached=True)
+                if current == canonical_hash(config):
+                    return automation_id, "unchanged", None
+                action = "update" if current is not None else "create"
+                if not dry_run:
+                    await put_automation(automation_id, config)
+            elif not dry_run:
+                await delete_automation(automation_id)
+            return automation_id, f"{action}d", None
+        except Exception as e:
+            return automation_id, action, str(e)
+
+    changes = ordered_map(apply, [*desired, *to_delete], max_concurrency)
+    async for automation_id, outcome, error in changes:
+        if error is not None:
+            result["errors"].append(
+                {"automation_id": automation_id, "action": outcome, "error": error}
+            )
+        elif outcome == "unchanged":
+            result["unchanged"] += 1
+        else:
+            result[outcome].append(automation_id)
+    return {"dry_run": dry_run, **result}
+
+
+async def export_automations(filename: str | None = None) -> dict[str, Any]:
+    """Stream every automation's configuration to a gzip JSON Lines file in the backup dir."""
+    path = resolve_backup_path(HA_BACKUP_DIR, filename or default_backup_name())
+    automations = automation_list(await ha_api_call("GET", "/automation"))
+    with BackupWriter(path) as writer:
+        async for config in ordered_map(fetch_config, automations, HA_BATCH_CONCURRENCY):
+            writer.write(config)
+    return {
+        "file": str(path.relative_to(Path(HA_BACKUP_DIR).resolve())),
+        "count": writer.count,
+        "bytes": path.stat().st_size,
+    }
+
+
+async def import_automations(
+    filename: str, dry_run: bool = False, max_concurrency: int = HA_BATCH_CONCURRENCY
+) -> dict[str, Any]:
+    """Restore automations from a backup, skipping those whose config is already identical.
+
+    The file is verified in full before anything is written, so a corrupt backup changes
+    nothing. Automations missing from the backup are left alone.
+    """
+    path = resolve_backup_path(HA_BACKUP_DIR, filename)
+    if not path.is_file():
+        raise FileNotFoundError(f"Backup not found: {filename}")
+    total = sum(1 for _ in read_backup(path))
+
+    hashes = await current_config_hashes()
+    counts = {"created": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    errors = []
+
+    async def restore(record: dict[str, Any]) -> str:
+        automation_id = record["id"]
+        try:
+            current = await config_hash(automation_id, hashes)
+            if current == record["hash"]:
+                return "unchanged"
+            if not dry_run:
+                await put_automation(automation_id, record["config"])
+            return "updated" if current is not None else "created"
+        except Exception as e:
+            errors.append({"automation_id": automation_id, "error": str(e)})
+            return "failed"
+
+    async for outcome in ordered_map(restore, read_backup(path), max_concurrency):
+        counts[outcome] += 1
+    return {"file": filename, "dry_run": dry_run, "total": total, **counts, "errors": errors}
+
+
+async def ensure_index() -> AutomationIndex:
+    """Build the search index if it is missing, or refresh it once older than the cache TTL."""
+    ttl = automation_cache.ttl
+    fresh = ttl is None or time.monotonic() - automation_index.built_at < ttl
+    if automation_index.loaded and fresh:
+        return automation_index
+    await _index_builds.do("index", _build_index)
+    return automation_index
+
+
+async def _build_index() -> None:
+    """Bring the index in line with the automation list.
+
+    Automations no longer listed are dropped, and the rest are re-indexed only when their
+    config differs from the indexed one. A summary-only list entry says nothing about triggers
+    or actions, so those configs are read through the automation cache: still-cached ones cost
+    nothing, expired ones are fetched again.
+    """
+    if not automation_index.loaded:
+        automation_index.clear()
+    result = await cached_get("/automation")
+    listed = {
+        str(automation["id"]): automation
+        for automation in automation_list(result)
+        if automation.get("id") is not None
+    }
+    semaphore = asyncio.Semaphore(HA_BATCH_CONCURRENCY)
+
+    async def index(automation_id: str, automation: dict[str, Any]) -> None:
+        if not has_config(automation):
+            endpoint = f"/automation/{automation_id}"
+            config = automation_cache.peek(endpoint)
+            if config is MISSING:
+                async with semaphore:
+                    config = await cached_get(endpoint)
+            if isinstance(config, dict):
+                automation = {**automation, **config}
+        fingerprint = canonical_hash(automation)
+        if automation_index.fingerprint(automation_id) != fingerprint:
+            automation_index.add({**automation, "id": automation_id}, fingerprint)
+
+    automation_index.retain(listed)
+    await asyncio.gather(*(index(i, automation) for i, automation in listed.items()))
+    automation_index.mark_built()
+
+
+async def ensure_states() -> StateStore:
+    """Load the state mirror if it is missing, or older than the cache TTL without events."""
+    fresh = state_store.live or time.monotonic() - state_store.loaded_at < HA_CACHE_TTL
+    if not (state_store.loaded and fresh):
+        await _state_loads.do("states", _load_states)
+    return state_store
+
+
+async def _load_states() -> None:
+    state_store.begin_load()
+    try:
+        states = await ha_api_call("GET", "/states")
+    except BaseException:
+        state_store.clear()
+        raise
+    state_store.load(states)
+    # Automation entities carry their config ID, so the mirror also maps IDs to entities
+    for state in states:
+        config_id = (state.get("attributes") or {}).get("id")
+        if config_id is not None and state["entity_id"].startswith("automation."):
+            automation_entity_ids[str(config_id)] = state["entity_id"]
+
+
+async def ensure_registry() -> StateStore:
+    """Load entity area assignments from the registries if they are missing."""
+    if not state_store.registry_loaded:
+        await _state_loads.do("registry", _load_registry)
+    return state_store
+
+
+async def _load_registry() -> None:
+    entities, devices, areas = await asyncio.gather(
+        websocket_call({"type": "config/entity_registry/list"}),
+        websocket_call({"type": "config/device_registry/list"}),
+        websocket_call({"type": "config/area_registry/list"}),
+    )
+    state_store.load_registry(entities, devices, areas)
+
+
+async def open_websocket() -> "HAWebSocketClient":
+    """Start the shared WebSocket client if it is not running yet, without waiting for it."""
+    global websocket_client
+    if websocket_client is None:
+        from mcp_ha_extended.websocket import HAWebSocketClient, websocket_url
+
+        session = await client.acquire_session()
+        if websocket_client is None:
+            websocket_client = HAWebSocketClient(websocket_url(HA_URL), HA_TOKEN, session=session)
+            await websocket_client.start()
+    return websocket_client
+
+
+async def websocket_available() -> bool:
+    """Whether a request can go over the WebSocket API now.
+
+    Only the first connection is waited for; while an open client is reconnecting, callers
+    should use REST instead of stalling until it is back.
+    """
+    if websocket_client is not None and not websocket_client.connected.is_set():
+        return False
+    try:
+        await websocket_connection()
+    except ConnectionError:
+        return False
+    return True
+
+
+async def websocket_connection() -> "HAWebSocketClient":
+    """Return the connected WebSocket client, connecting first if no connection is open yet."""
+    await open_websocket()
+    try:
+        await asyncio.wait_for(websocket_client.connected.wait(), HA_REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ConnectionError("Could not connect to the Home Assistant WebSocket API") from None
+    return websocket_client
+
+
+async def websocket_call(message: dict[str, Any]) -> Any:
+    """Send a WebSocket API command and return its result.
+
+    Commands are multiplexed over one connection by message ID, so concurrent callers are
+    pipelined rather than queued behind each other.
+    """
+    ws_client = await websocket_connection()
+    lane = "write" if message["type"] == "call_service" else "read"
+    await rate_limiter.acquire(current_client(), lane)
+    with metrics.track("ha_request", f"WS {message['type']}"):
+        return await ws_client.call(message, timeout=HA_REQUEST_TIMEOUT)
+
+
+def service_call_message(call: dict[str, Any]) -> dict[str, Any]:
+    """Turn a ``call_services`` entry into a WebSocket ``call_service`` command."""
+    service = call.get("service")
+    if not isinstance(service, str) or not SERVICE_RE.match(service):
+        raise ValueError(f"Invalid service {service!r}, expected e.g. light.turn_on")
+    domain, service_name = service.split(".", 1)
+    message: dict[str, Any] = {"type": "call_service", "domain": domain, "service": service_name}
+    if call.get("data"):
+        message["service_data"] = call["data"]
+    if call.get("target"):
+        message["target"] = call["target"]
+    if call.get("return_response"):
+        message["return_response"] = True
+    return message
+
+
+async def _call_service_rest(message: dict[str, Any]) -> Any:
+    """Send a ``call_service`` command as ``POST /api/services`` and return its response."""
+    endpoint = f"/services/{message['domain']}/{message['service']}"
+    if message.get("return_response"):
+        endpoint += "?return_response"
+    body = {**message.get("service_data", {}), **message.get("target", {})}
+    result = await ha_api_call("POST", endpoint, body)
+    return result.get("service_response") if isinstance(result, dict) else None
+
+
+async def call_services(calls: list[dict[str, Any]]) -> dict[str, Any]:
+    """Call Home Assistant services concurrently, returning one result per call in order.
+
+    All calls are pipelined over the shared WebSocket connection, so a batch costs about one
+    round trip. If the WebSocket API is not available (see ``websocket_available``) they are
+    sent as REST POSTs instead, bounded by ``HA_MAX_INFLIGHT``. A call that fails is never
+    retried on the other transport, since it may already have run.
+    """
+    _check_ha_token()
+    use_websocket = bool(calls) and await websocket_available()
+    transport = "websocket" if use_websocket else "rest"
+
+    async def run(index: int, call: dict[str, Any]) -> dict[str, Any]:
+        item = {"index": index, "service": call.get("service")}
+        try:
+            message = service_call_message(call)
+            if use_websocket:
+                result = await websocket_call(message)
+                response = result.get("response") if isinstance(result, dict) else None
+            else:
+                response = await _call_service_rest(message)
+        except Exception as e:
+            return {**item, "status": "error", "error": str(e), "type": type(e).__name__}
+        if message["domain"] == "automation":
+            # turn_on/turn_off/reload change what the automation cache and index hold
+            forget_automations()
+        item["status"] = "ok"
+        if response is not None:
+            item["response"] = response
+        return item
+
+    results = await asyncio.gather(*(run(i, call) for i, call in enumerate(calls)))
+    summary = {"transport": transport, "total": len(results), "ok": 0, "error": 0}
+    for item in results:
+        summary[item["status"]] += 1
+    return {**summary, "results": list(results)}
+
+
+async def resolve_automation_entity(automation_id: str) -> str:
+    """Find the ``automation.*`` entity of an automation, looking it up in the state mirror."""
+    entity_id = automation_entity_id(automation_id)
+    if entity_id is None:
+        store = await ensure_states()
+        matches = store.query(domain="automation", attributes={"id": automation_id})
+        if not matches:
+            raise ValueError(f"No automation entity found for {automation_id}")
+        entity_id = automation_entity_ids[automation_id] = matches[0]
+    return entity_id
+
+
+async def automation_traces(
+    automation_id: str,
+    run_id: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+) -> dict[str, Any]:
+    """Return the summarized runs of an automation in a time window, or one run's steps."""
+    if run_id is not None:
+        trace = await websocket_call(
+            {
+                "type": "trace/get",
+                "domain": "automation",
+                "item_id": automation_id,
+                "run_id": run_id,
+            }
+        )
+        return summarize_trace(trace)
+    start_time, end_time = time_window(start, end)
+    runs = await websocket_call(
+        {"type": "trace/list", "domain": "automation", "item_id": automation_id}
+    )
+    return {
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        "runs": filter_runs(runs or [], start_time, end_time),
+    }
+
+
+async def automation_history(
+    automation_id: str, start: str | None = None, end: str | None = None
+) -> dict[str, Any]:
+    """Return when an automation ran and was enabled or disabled within a time window."""
+    entity_id = await resolve_automation_entity(automation_id)
+    start_time, end_time = time_window(start, end)
+    result = await ha_api_call(
+        "GET",
+        f"/history/period/{quote(start_time.isoformat())}"
+        f"?filter_entity_id={entity_id}&end_time={quote(end_time.isoformat())}",
+    )
+    rows = result[0] if result else []
+    return {
+        "entity_id": entity_id,
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        **summarize_history(rows, start_time, end_time),
+    }
+
+
+def automation_entity_id(automation_id: str) -> str | None:
+    """Resolve the ``automation.*`` entity ID for an automation, if it is known locally."""
+    if automation_id.startswith("automation."):
+        return automation_id
+    cached = automation_cache.peek(f"/automation/{automation_id}")
+    if isinstance(cached, dict) and cached.get("entity_id"):
+        return cached["entity_id"]
+    return automation_entity_ids.get(automation_id)
+
+
+def automation_config_id(entity_id: str) -> str | None:
+    """Resolve the config ID of an ``automation.*`` entity, if it is known locally."""
+    state = state_store.get(entity_id)
+    config_id = ((state or {}).get("attributes") or {}).get("id")
+    if config_id is not None:
+        return str(config_id)
+    return next((c for c, e in automation_entity_ids.items() if e == entity_id), None)
+
+
+async def resolve_automation(automation_id: str) -> tuple[str | None, str]:
+    """Return the config ID and entity ID of an automation given either one.
+
+    Whichever is not known locally is looked up in the state mirror, which is loaded once for
+    all later lookups. Automations defined in YAML without an ``id`` have no config ID.
+    """
+    if not automation_id.startswith("automation."):
+        return automation_id, await resolve_automation_entity(automation_id)
+    config_id = automation_config_id(automation_id)
+    if config_id is None:
+        await ensure_states()
+        config_id = automation_config_id(automation_id)
+    return config_id, automation_id
+
+
+async def _call_automation_toggle(
+    config_ids: list[str | None], entity_ids: list[str], enabled: bool
+) -> None:
+    """Turn automations on or off with a single ``automation.turn_on/turn_off`` service call.
+
+    Callers must hold the automation locks of the automations.
+    """
+    service = "turn_on" if enabled else "turn_off"
+    await ha_api_call("POST", f"/services/automation/{service}", {"entity_id": entity_ids})
+    for config_id in config_ids:
+        invalidate_automation(config_id)
+        if config_id is not None:
+            automation_index.set_enabled(config_id, enabled)
+
+
+async def set_automation_enabled(automation_id: str, enabled: bool) -> None:
+    """Enable or disable an automation with one ``automation.turn_on``/``turn_off`` call.
+
+    ``automation_id`` may be a config ID or an ``automation.*`` entity ID.
+    """
+    config_id, entity_id = await resolve_automation(automation_id)
+    async with automation_locks.lock(config_id or entity_id):
+        await _call_automation_toggle([config_id], [entity_id], enabled)
+
+
+async def _run_batch_operation(operation: dict[str, Any]) -> dict[str, Any]:
+    """Run one batch operation and return its compact result fields."""
+    action = operation.get("action")
+    automation_id = operation.get("automation_id")
+    if action not in ("create", "update", "delete", "enable", "disable"):
+        raise ValueError(f"Unknown batch action: {action}")
+    if action in ("create", "update") and "automation_yaml" not in operation:
+        raise ValueError(f"automation_yaml is required for {action}")
+    if action == "create":
+        result = await create_automation(operation["automation_yaml"])
+        return {"automation_id": result.get("id") if isinstance(result, dict) else None}
+    if not automation_id:
+        raise ValueError(f"automation_id is required for {action}")
+    if action == "update":
+        await update_automation(automation_id, operation["automation_yaml"])
+    elif action == "delete":
+        await delete_automation(automation_id)
+    else:
+        await set_automation_enabled(automation_id, action == "enable")
+    return {"automation_id": automation_id}
+
+
+def _batch_item(index: int, operation: dict[str, Any]) -> dict[str, Any]:
+    """Build the identifying fields of a batch result item."""
+    item = {"index": index, "action": operation.get("action")}
+    if operation.get("automation_id"):
+        item["automation_id"] = operation["automation_id"]
+    return item
+
+
+async def run_batch(
+    operations: list[dict[str, Any]],
+    max_concurrency: int = HA_BATCH_CONCURRENCY,
+    stop_on_error: bool = False,
+) -> list[dict[str, Any]]:
+    """Run automation operations concurrently, returning one result per operation in order.
+
+    At most ``max_concurrency`` operations talk to Home Assistant at once. Enable/disable
+    operations are coalesced into one service call per direction.
+    With ``stop_on_error``, operations that have not started when the first failure happens
+    are reported as ``skipped``.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    failed = asyncio.Event()
+    results: list[dict[str, Any]] = [{} for _ in operations]
+
+    async def run(indexes: list[int], operation: Callable[[], Awaitable[dict[str, Any]]]) -> None:
+        items = [_batch_item(i, operations[i]) for i in indexes]
+        async with semaphore:
+            if stop_on_error and failed.is_set():
+                outcome = {"status": "skipped"}
+            else:
+                try:
+                    outcome = {"status": "ok", **await operation()}
+                except Exception as e:
+                    failed.set()
+                    outcome = {"status": "error", "error": str(e), "type": type(e).__name__}
+        for i, item in zip(indexes, items, strict=True):
+            results[i] = {**item, **outcome}
+
+    toggling = [
+        index
+        for index, operation in enumerate(operations)
+        if operation.get("action") in ("enable", "disable") and operation.get("automation_id")
+    ]
+    resolved = await asyncio.gather(
+        *(resolve_automation(operations[i]["automation_id"]) for i in toggling),
+        return_exceptions=True,
+    )
+    toggles: dict[bool, list[tuple[int, str | None, str]]] = {True: [], False: []}
+    jobs = []
+    for index, ids in zip(toggling, resolved, strict=True):
+        if isinstance(ids, tuple):
+            toggles[operations[index]["action"] == "enable"].append((index, *ids))
+    coalesced = {index for group in toggles.values() for index, _, _ in group}
+    for index, operation in enumerate(operations):
+        if index not in coalesced:
+            # Includes toggles whose automation could not be resolved, to report the error
+            jobs.append(run([index], partial(_run_batch_operation, operation)))
+
+    for enabled, group in toggles.items():
+        if group:
+            indexes, config_ids, entity_ids = (list(column) for column in zip(*group, strict=True))
+
+            async def toggle(ids=config_ids, entities=entity_ids, flag=enabled) -> dict:
+                locks = [c or e for c, e in zip(ids, entities, strict=True)]
+                async with automation_locks.lock(*locks):
+                    await _call_automation_toggle(ids, entities, flag)
+                return {}
+
+            jobs.append(run(indexes, toggle))
+
+    await asyncio.gather(*jobs)
+    return results
+
+
+def _set_cached_enabled(automation_id: str, enabled: bool) -> None:
+    """Update the enabled flag of a cached automation and list entry in place."""
+    endpoint = f"/automation/{automation_id}"
+    current = automation_cache.peek(endpoint)
+    if isinstance(current, dict):
+        remember_automation(endpoint, {**current, "enabled": enabled})
+    automations = automation_cache.peek("/automation")
+    if isinstance(automations, list):
+        remember_automation(
+            "/automation",
+            [
+                {**auto, "enabled": enabled} if auto.get("id") == automation_id else auto
+                for auto in automations
+            ],
+        )
+
+
+async def handle_automation_event(event: dict[str, Any]) -> None:
+    """Keep the automation cache coherent with changes made outside this server."""
+    event_type = event.get("event_type")
+    data = event.get("data", {})
+
+    if event_type == "automation_reloaded":
+        forget_automations()
+
+    elif event_type == "entity_registry_updated":
+        if data.get("entity_id", "").startswith("automation."):
+            invalidate_automation()
+
+    elif event_type == "state_changed":
+        if not data.get("entity_id", "").startswith("automation."):
+            return
+        old_state = data.get("old_state")
+        new_state = data.get("new_state")
+        state = new_state or old_state or {}
+        automation_id = state.get("attributes", {}).get("id")
+        if automation_id is not None:
+            if new_state is None:
+                automation_entity_ids.pop(automation_id, None)
+            else:
+                automation_entity_ids[automation_id] = data["entity_id"]
+        if old_state is None or new_state is None or automation_id is None:
+            # Automation added or removed
+            invalidate_automation(automation_id)
+            automation_index.clear()
+        elif old_state.get("state") != new_state.get("state"):
+            if new_state.get("state") in ("on", "off"):
+                _set_cached_enabled(automation_id, new_state["state"] == "on")
+                automation_index.set_enabled(automation_id, new_state["state"] == "on")
+            else:
+                invalidate_automation(automation_id)
+        # Attribute-only changes (last_triggered, current runs) leave the config untouched
+
+
+async def handle_state_event(event: dict[str, Any]) -> None:
+    """Keep the entity state mirror and its area assignments current."""
+    if event.get("event_type") == "state_changed":
+        state_store.apply_event(event.get("data", {}))
+    else:
+        state_store.clear_registry()
+
+
+async def start_event_listener() -> "HAWebSocketClient":
+    """Start the WebSocket listener that keeps the automation cache and state mirror live."""
+    global websocket_client
+    from mcp_ha_extended.websocket import HAWebSocketClient, websocket_url
+
+    session = await client.acquire_session()
+    listener = HAWebSocketClient(websocket_url(HA_URL), HA_TOKEN, session=session)
+    for event_type in AUTOMATION_EVENT_TYPES:
+        listener.subscribe(event_type, handle_automation_event)
+    for event_type in STATE_EVENT_TYPES:
+        listener.subscribe(event_type, handle_state_event)
+
+    async def on_connect() -> None:
+        # Events may have been missed while disconnected; start from a clean cache and keep
+        # entries until an event invalidates them
+        automation_cache.clear()
+        if HA_CACHE_TTL != 0:
+            automation_cache.ttl = None
+        state_store.clear()
+        state_store.clear_registry()
+        state_store.live = True
+
+    async def on_disconnect() -> None:
+        automation_cache.clear()
+        automation_cache.ttl = HA_CACHE_TTL
+        state_store.clear()
+        state_store.live = False
+
+    listener.on_connect(on_connect)
+    listener.on_disconnect(on_disconnect)
+    websocket_client = listener
+    await listener.start()
+    return listener
+
+
+def server_stats() -> dict[str, Any]:
+    """Collect latency metrics and the state of caches, coalescing and the circuit breaker."""
+    return {
+        **metrics.snapshot(),
+        "automation_cache": automation_cache.stats(),
+        "request_coalescing": inflight_gets.stats(),
+        "parse_cache": parse_cache.stats(),
+        "circuit_breaker": circuit_breaker.stats(),
+        "ha_request_limit": ha_request_limit.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "automation_locks": automation_locks.stats(),
+        "state_store": state_store.stats(),
+        "persistent_cache": persistent_cache.stats() if persistent_cache is not None else None,
+    }
+
+
+def render_prometheus() -> str:
+    """Render server metrics in the Prometheus text format."""
+    cache = automation_cache.stats()
+    return metrics.render_prometheus(
+        {
+            "cache_hits_total": cache["hits"],
+            "cache_misses_total": cache["misses"],
+            "cache_evictions_total": cache["evictions"],
+            "cache_entries": cache["size"],
+            "coalesced_requests_total": inflight_gets.coalesced,
+            "circuit_breaker_open": int(circuit_breaker.state != circuit_breaker.CLOSED),
+            "ha_requests_waiting": ha_request_limit.waiting,
+            "rate_limit_waiting_reads": rate_limiter.depth("read"),
+            "rate_limit_waiting_writes": rate_limiter.depth("write"),
+        }
+    )
 
 
 @server.list_tools()
@@ -52,10 +1182,33 @@ async def list_tools() -> list[Tool]:
     return [
         Tool(
             name="list_automations",
-            description="List all automations in Home Assistant",
+            description=(
+                "List automations in Home Assistant. Use fields to choose the returned keys and "
+                "limit with offset or cursor to page through large installations"
+            ),
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Keys to return per automation (default: id, alias, enabled, description)",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Number of automations to skip",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of automations to return",
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous page (overrides offset)",
+                    },
+                },
             },
         ),
         Tool(
@@ -67,20 +1220,28 @@ async def list_tools() -> list[Tool]:
                     "automation_id": {
                         "type": "string",
                         "description": "The automation ID to retrieve",
-                    }
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Only return these top-level keys of the automation",
+                    },
                 },
                 "required": ["automation_id"],
             },
         ),
         Tool(
             name="create_automation",
-            description="Create a new automation from YAML configuration",
+            description="Create a new automation from YAML (or JSON) configuration",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "automation_yaml": {
                         "type": "string",
-                        "description": "YAML configuration for the automation (single automation object)",
+                        "description": (
+                            "YAML configuration for the automation (single automation object); "
+                            "a JSON object is also accepted and parsed faster"
+                        ),
                     },
                     "alias": {
                         "type": "string",
@@ -102,7 +1263,7 @@ async def list_tools() -> list[Tool]:
                     },
                     "automation_yaml": {
                         "type": "string",
-                        "description": "Updated YAML configuration for the automation",
+                        "description": "Updated YAML (or JSON) configuration for the automation",
                     },
                 },
                 "required": ["automation_id", "automation_yaml"],
@@ -164,141 +1325,769 @@ async def list_tools() -> list[Tool]:
                 "required": ["automation_id"],
             },
         ),
-    ]
-
-
-@server.call_tool()
-async def call_tool(name: str, arguments: dict) -> Sequence[TextContent]:
-    """Handle tool calls."""
-
-    try:
-        if name == "list_automations":
-            result = await ha_api_call("GET", "/automation")
-            automations = result if isinstance(result, list) else result.get("automations", [])
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps(
-                        {
-                            "count": len(automations),
-                            "automations": [
-                                {
-                                    "id": auto.get("id"),
-                                    "alias": auto.get("alias"),
-                                    "enabled": auto.get("enabled", True),
-                                    "description": auto.get("description"),
-                                }
-                                for auto in automations
-                            ],
+        Tool(
+            name="batch_automations",
+            description=(
+                "Create, update, delete, enable or disable many automations in one call. "
+                "Operations run concurrently and results are returned in input order"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "operations": {
+                        "type": "array",
+                        "description": "Operations to run",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "action": {
+                                    "type": "string",
+                                    "enum": ["create", "update", "delete", "enable", "disable"],
+                                    "description": "Operation to perform",
+                                },
+                                "automation_id": {
+                                    "type": "string",
+                                    "description": "Target automation ID (not used by create)",
+                                },
+                                "automation_yaml": {
+                                    "type": "string",
+                                    "description": (
+                                        "YAML or JSON configuration (create and update only)"
+                                    ),
+                                },
+                            },
+                            "required": ["action"],
                         },
-                        indent=2,
-                    ),
-                )
-            ]
-
-        elif name == "get_automation":
-            automation_id = arguments["automation_id"]
-            result = await ha_api_call("GET", f"/automation/{automation_id}")
-            return [TextContent(type="text", text=json.dumps(result, indent=2))]
-
-        elif name == "create_automation":
-            automation_yaml = arguments["automation_yaml"]
-
-            # Parse YAML to dict
-            automation_dict = yaml.safe_load(automation_yaml)
-
-            # Home Assistant expects the automation object directly
-            result = await ha_api_call("POST", "/automation", automation_dict)
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps({"status": "created", "result": result}, indent=2),
-                )
-            ]
-
-        elif name == "update_automation":
-            automation_id = arguments["automation_id"]
-            automation_yaml = arguments["automation_yaml"]
-
-            # Parse YAML to dict
-            automation_dict = yaml.safe_load(automation_yaml)
-
-            result = await ha_api_call("PUT", f"/automation/{automation_id}", automation_dict)
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps({"status": "updated", "result": result}, indent=2),
-                )
-            ]
-
-        elif name == "delete_automation":
-            automation_id = arguments["automation_id"]
-            await ha_api_call("DELETE", f"/automation/{automation_id}")
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps({"status": "deleted", "automation_id": automation_id}, indent=2),
-                )
-            ]
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum operations sent to Home Assistant at once",
+                    },
+                    "stop_on_error": {
+                        "type": "boolean",
+                        "description": "Skip operations not yet started after the first failure",
+                    },
+                },
+                "required": ["operations"],
+            },
+        ),
+        Tool(
+            name="search_automations",
+            description=(
+                "Find automations by entity, service, trigger platform, condition type or "
+                "alias/description text. All given criteria must match"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "entity_id": {
+                        "type": "string",
+                        "description": "Entity referenced anywhere in the automation",
+                    },
+                    "service": {
+                        "type": "string",
+                        "description": "Service/action called, e.g. light.turn_on",
+                    },
+                    "trigger_platform": {
+                        "type": "string",
+                        "description": "Trigger platform, e.g. state, time, sun",
+                    },
+                    "condition_type": {
+                        "type": "string",
+                        "description": "Condition type, e.g. state, template, time",
+                    },
+                    "text": {
+                        "type": "string",
+                        "description": "Word prefixes that must appear in the alias or description",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of automations to return",
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="get_server_metrics",
+            description=(
+                "Get call counts, error counts, in-flight requests and p50/p95/p99 latency for "
+                "every tool and Home Assistant endpoint, plus cache and circuit breaker state"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        Tool(
+            name="get_cache_stats",
+            description=(
+                "Get hit/miss statistics for the automation cache, request coalescing and the "
+                "parsed YAML cache"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
+        Tool(
+            name="export_automations",
+            description=(
+                "Save every automation's configuration to a compressed backup file in the "
+                "backup directory"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": (
+                            "File name relative to the backup directory (default: "
+                            "timestamped automations-*.jsonl.gz)"
+                        ),
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="import_automations",
+            description=(
+                "Restore automations from a backup file, only writing those whose "
+                "configuration differs from Home Assistant"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "filename": {
+                        "type": "string",
+                        "description": "Backup file name relative to the backup directory",
+                    },
+                    "dry_run": {
+                        "type": "boolean",
+                        "description": "Report what would change without writing anything",
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum automations written to Home Assistant at once",
+                    },
+                },
+                "required": ["filename"],
+            },
+        ),
+        Tool(
+            name="sync_automations",
+            description=(
+                "Make Home Assistant's automations match a desired set, only creating, "
+                "updating or deleting automations whose configuration differs"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "automations": {
+                        "type": "array",
+                        "description": "Desired automations; each must have an 'id'",
+                        "items": {
+                            "type": "string",
+                            "description": "YAML or JSON configuration of one automation",
+                        },
+                    },
+                    "delete_missing": {
+                        "type": "boolean",
+                        "description": "Delete automations that are not in the desired set",
+                    },
+                    "dry_run": {
+                        "type": "boolean",
+                        "description": "Report the changes without writing anything",
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum automations written to Home Assistant at once",
+                    },
+                },
+                "required": ["automations"],
+            },
+        ),
+        Tool(
+            name="list_entities",
+            description=(
+                "List entities with their state and friendly name, optionally filtered by domain "
+                "or area. Use limit with offset or cursor to page through large installations"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "domain": {
+                        "type": "string",
+                        "description": "Entity domain, e.g. light or binary_sensor",
+                    },
+                    "area": {
+                        "type": "string",
+                        "description": "Area ID or name; each entity is listed with its area",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Number of entities to skip",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of entities to return",
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous page (overrides offset)",
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="get_states",
+            description="Get the full state objects (state, attributes, timestamps) of entities",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "entity_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Entity IDs to return",
+                    },
+                },
+                "required": ["entity_ids"],
+            },
+        ),
+        Tool(
+            name="search_entities",
+            description=(
+                "Find entities by name, domain, area, state or attribute values. All given "
+                "criteria must match"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "text": {
+                        "type": "string",
+                        "description": "Words in the entity ID or friendly name",
+                    },
+                    "domain": {
+                        "type": "string",
+                        "description": "Entity domain, e.g. light or binary_sensor",
+                    },
+                    "area": {
+                        "type": "string",
+                        "description": "Area ID or name",
+                    },
+                    "state": {
+                        "type": "string",
+                        "description": "Current state, e.g. on or unavailable",
+                    },
+                    "attributes": {
+                        "type": "object",
+                        "description": (
+                            'Required attribute values, e.g. {"device_class": "motion"}; '
+                            "null only requires the attribute to exist"
+                        ),
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of entities to return",
+                    },
+                },
+            },
+        ),
+        Tool(
+            name="validate_automation",
+            description=(
+                "Check an automation config offline: structure of triggers, conditions and "
+                "actions, entity IDs, templates and whether referenced entities exist"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "automation_yaml": {
+                        "type": "string",
+                        "description": "YAML or JSON configuration of the automation",
+                    },
+                    "check_entities": {
+                        "type": "boolean",
+                        "description": "Warn about entities Home Assistant does not know (default)",
+                    },
+                },
+                "required": ["automation_yaml"],
+            },
+        ),
+        Tool(
+            name="get_automation_traces",
+            description=(
+                "List an automation's recent runs with their trigger, outcome and last step, "
+                "or with run_id get one run's steps as a compact timeline"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "automation_id": {
+                        "type": "string",
+                        "description": "The ID of the automation",
+                    },
+                    "run_id": {
+                        "type": "string",
+                        "description": "Run to show step by step (from a previous listing)",
+                    },
+                    "start": {
+                        "type": "string",
+                        "description": "ISO 8601 start of the time window (default: 24 hours ago)",
+                    },
+                    "end": {
+                        "type": "string",
+                        "description": "ISO 8601 end of the time window (default: now)",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Number of entries to skip",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of entries to return",
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous page (overrides offset)",
+                    },
+                },
+                "required": ["automation_id"],
+            },
+        ),
+        Tool(
+            name="get_automation_history",
+            description=(
+                "Get when an automation was triggered, enabled or disabled within a time window"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "automation_id": {
+                        "type": "string",
+                        "description": "The ID of the automation",
+                    },
+                    "start": {
+                        "type": "string",
+                        "description": "ISO 8601 start of the time window (default: 24 hours ago)",
+                    },
+                    "end": {
+                        "type": "string",
+                        "description": "ISO 8601 end of the time window (default: now)",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "Number of entries to skip",
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "description": "Maximum number of entries to return",
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "next_cursor from a previous page (overrides offset)",
+                    },
+                },
+                "required": ["automation_id"],
+            },
+        ),
+        Tool(
+            name="get_continuation",
+            description=(
+                "Fetch the rest of a response that was cut to fit the size budget, using the "
+                "handle and a path from its continuation entry"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "handle": {
+                        "type": "string",
+                        "description": "continuation.handle of the cut response",
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": (
+                            "Path of the part to fetch, e.g. automations or action[2].sequence "
+                            "(default: the whole response)"
+                        ),
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "minimum": 0,
+                        "description": "First list item or character to return (the shown count)",
+                    },
+                },
+                "required": ["handle"],
+            },
+        ),
+        Tool(
+            name="call_services",
+            description=(
+                "Call Home Assistant services such as light.turn_on or script.run. All calls are "
+                "sent at once and run concurrently; results are returned in input order"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "calls": {
+                        "type": "array",
+                        "description": "Service calls to make",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "service": {
+                                    "type": "string",
+                                    "description": "Service to call, e.g. light.turn_on",
+                                },
+                                "target": {
+                                    "type": "object",
+                                    "description": "entity_id, device_id and/or area_id to act on",
+                                },
+                                "data": {
+                                    "type": "object",
+                                    "description": 'Service data, e.g. {"brightness_pct": 50}',
+                                },
+                                "return_response": {
+                                    "type": "boolean",
+                                    "description": "Return the service's response data",
+                                },
+                            },
+                            "required": ["service"],
+                        },
+                    },
+                },
+                "required": ["calls"],
+            },
+        ),
+    ]
 
-        elif name == "trigger_automation":
-            automation_id = arguments["automation_id"]
-            await ha_api_call("POST", f"/automation/{automation_id}/trigger")
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps({"status": "triggered", "automation_id": automation_id}, indent=2),
-                )
-            ]
 
-        elif name == "enable_automation":
-            automation_id = arguments["automation_id"]
-            # Get current automation, update enabled flag
-            current = await ha_api_call("GET", f"/automation/{automation_id}")
-            current["enabled"] = True
-            await ha_api_call("PUT", f"/automation/{automation_id}", current)
+@server.call_tool()
+async def call_tool(name: str, arguments: dict) -> Sequence[TextContent]:
+    """Handle tool calls."""
+    with metrics.track("tool", name) as span:
+        try:
+            return [budget_response(content) for content in await _run_tool(name, arguments)]
+        except Exception as e:
+            span.error = True
             return [
                 TextContent(
                     type="text",
-                    text=json.dumps({"status": "enabled", "automation_id": automation_id}, indent=2),
+                    text=dump_json({"error": str(e), "type": type(e).__name__}),
                 )
             ]
 
-        elif name == "disable_automation":
-            automation_id = arguments["automation_id"]
-            # Get current automation, update enabled flag
-            current = await ha_api_call("GET", f"/automation/{automation_id}")
-            current["enabled"] = False
-            await ha_api_call("PUT", f"/automation/{automation_id}", current)
-            return [
-                TextContent(
-                    type="text",
-                    text=json.dumps({"status": "disabled", "automation_id": automation_id}, indent=2),
-                )
-            ]
 
+def budget_response(content: TextContent) -> TextContent:
+    """Cut a response longer than ``HA_RESPONSE_MAX_BYTES`` down to size.
+
+    The full response is kept under a continuation handle; a ``continuation`` entry lists
+    each path that was cut so ``get_continuation`` can fetch the rest.
+    """
+    if not HA_RESPONSE_MAX_BYTES or len(content.text) <= HA_RESPONSE_MAX_BYTES:
+        return content
+    data = json.loads(content.text)
+    handle = secrets.token_urlsafe(9)
+    continuations.set(handle, data)
+    # Leave room for the continuation entry and, when pretty-printing, the indentation
+    budget = HA_RESPONSE_MAX_BYTES - min(1024, HA_RESPONSE_MAX_BYTES // 4)
+    while True:
+        shaped, elided = fit(data, budget)
+        continuation = {"handle": handle, "truncated": elided}
+        if isinstance(shaped, dict):
+            text = dump_json({**shaped, "continuation": continuation})
         else:
-            raise ValueError(f"Unknown tool: {name}")
+            text = dump_json({"result": shaped, "continuation": continuation})
+        if len(text) <= HA_RESPONSE_MAX_BYTES or budget <= 256:
+            return TextContent(type="text", text=text)
+        budget = int(budget * HA_RESPONSE_MAX_BYTES / len(text) * 0.95)
+
+
+def get_continuation(handle: str, path: str = "", offset: int = 0) -> dict[str, Any]:
+    """Return the part of a cut response at ``path``, from item (or character) ``offset`` on."""
+    data = continuations.get(handle)
+    if data is MISSING:
+        raise ValueError(f"Unknown or expired continuation handle: {handle}")
+    value = resolve_path(data, path)
+    response: dict[str, Any] = {"path": path}
+    if isinstance(value, (list, str)):
+        response.update({"offset": offset, "total": len(value)})
+        value = value[offset:]
+    response["value"] = value
+    return response
+
+
+async def _run_tool(name: str, arguments: dict) -> Sequence[TextContent]:
+    """Run a tool and return its response; exceptions are reported by ``call_tool``."""
+    if name == "list_automations":
+        result = await cached_get("/automation")
+        automations = automation_list(result)
+        fields = arguments.get("fields") or DEFAULT_LIST_FIELDS
+        response = paginate(automations, arguments, "automations")
+        response["automations"] = [project(auto, fields) for auto in response["automations"]]
+        return [TextContent(type="text", text=dump_json(response))]
 
-    except Exception as e:
+    elif name == "get_automation":
+        automation_id = arguments["automation_id"]
+        result = await cached_get(f"/automation/{automation_id}")
+        if arguments.get("fields") and isinstance(result, dict):
+            result = project(result, arguments["fields"])
+        return [TextContent(type="text", text=dump_json(result))]
+
+    elif name == "create_automation":
+        result = await create_automation(arguments["automation_yaml"])
         return [
             TextContent(
                 type="text",
-                text=json.dumps({"error": str(e), "type": type(e).__name__}, indent=2),
+                text=dump_json({"status": "created", "result": result}),
             )
         ]
 
+    elif name == "update_automation":
+        automation_id = arguments["automation_id"]
+        result = await update_automation(automation_id, arguments["automation_yaml"])
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({"status": "updated", "result": result}),
+            )
+        ]
+
+    elif name == "delete_automation":
+        automation_id = arguments["automation_id"]
+        await delete_automation(automation_id)
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({"status": "deleted", "automation_id": automation_id}),
+            )
+        ]
+
+    elif name == "trigger_automation":
+        automation_id = arguments["automation_id"]
+        await ha_api_call("POST", f"/automation/{automation_id}/trigger")
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({"status": "triggered", "automation_id": automation_id}),
+            )
+        ]
+
+    elif name == "enable_automation":
+        automation_id = arguments["automation_id"]
+        await set_automation_enabled(automation_id, True)
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({"status": "enabled", "automation_id": automation_id}),
+            )
+        ]
+
+    elif name == "disable_automation":
+        automation_id = arguments["automation_id"]
+        await set_automation_enabled(automation_id, False)
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({"status": "disabled", "automation_id": automation_id}),
+            )
+        ]
+
+    elif name == "batch_automations":
+        results = await run_batch(
+            arguments["operations"],
+            max_concurrency=arguments.get("max_concurrency", HA_BATCH_CONCURRENCY),
+            stop_on_error=arguments.get("stop_on_error", False),
+        )
+        summary = {"total": len(results), "ok": 0, "error": 0, "skipped": 0}
+        for item in results:
+            summary[item["status"]] += 1
+        return [
+            TextContent(
+                type="text",
+                text=dump_json({**summary, "results": results}),
+            )
+        ]
+
+    elif name == "search_automations":
+        index = await ensure_index()
+        matches = index.search(
+            entity_id=arguments.get("entity_id"),
+            service=arguments.get("service"),
+            trigger_platform=arguments.get("trigger_platform"),
+            condition_type=arguments.get("condition_type"),
+            text=arguments.get("text"),
+        )
+        limit = arguments.get("limit")
+        return [
+            TextContent(
+                type="text",
+                text=dump_json(
+                    {"count": len(matches), "automations": matches[:limit] if limit else matches}
+                ),
+            )
+        ]
+
+    elif name == "get_server_metrics":
+        return [TextContent(type="text", text=dump_json(server_stats()))]
+
+    elif name == "get_cache_stats":
+        return [
+            TextContent(
+                type="text",
+                text=dump_json(
+                    {
+                        "automation_cache": automation_cache.stats(),
+                        "request_coalescing": inflight_gets.stats(),
+                        "parse_cache": parse_cache.stats(),
+                        "state_store": state_store.stats(),
+                        "persistent_cache": (
+                            persistent_cache.stats() if persistent_cache is not None else None
+                        ),
+                    }
+                ),
+            )
+        ]
+
+    elif name == "export_automations":
+        result = await export_automations(arguments.get("filename"))
+        return [TextContent(type="text", text=dump_json(result))]
+
+    elif name == "import_automations":
+        result = await import_automations(
+            arguments["filename"],
+            dry_run=arguments.get("dry_run", False),
+            max_concurrency=arguments.get("max_concurrency", HA_BATCH_CONCURRENCY),
+        )
+        return [TextContent(type="text", text=dump_json(result))]
+
+    elif name in ("list_entities", "search_entities"):
+        store = await ensure_states()
+        if arguments.get("area") is not None:
+            await ensure_registry()
+        entity_ids = store.query(
+            domain=arguments.get("domain"),
+            area=arguments.get("area"),
+            state=arguments.get("state"),
+            attributes=arguments.get("attributes"),
+            text=arguments.get("text"),
+        )
+        response = paginate(entity_ids, arguments, "entities")
+        response["entities"] = [store.summary(entity_id) for entity_id in response["entities"]]
+        return [TextContent(type="text", text=dump_json(response))]
+
+    elif name == "get_states":
+        store = await ensure_states()
+        entity_ids = arguments["entity_ids"]
+        response = {
+            "states": [store.get(e) for e in entity_ids if e in store],
+            "missing": [e for e in entity_ids if e not in store],
+        }
+        return [TextContent(type="text", text=dump_json(response))]
+
+    elif name == "validate_automation":
+        config = parse_automation_yaml(arguments["automation_yaml"])
+        entity_exists = None
+        if arguments.get("check_entities", True):
+            entity_exists = (await ensure_states()).__contains__
+        result = validate_automation(config, entity_exists)
+        return [TextContent(type="text", text=dump_json(result))]
+
+    elif name == "get_automation_traces":
+        result = await automation_traces(
+            arguments["automation_id"],
+            run_id=arguments.get("run_id"),
+            start=arguments.get("start"),
+            end=arguments.get("end"),
+        )
+        key = "steps" if "steps" in result else "runs"
+        response = {**result, **paginate(result[key], arguments, key)}
+        return [TextContent(type="text", text=dump_json(response))]
+
+    elif name == "get_automation_history":
+        result = await automation_history(
+            arguments["automation_id"], start=arguments.get("start"), end=arguments.get("end")
+        )
+        response = {**result, **paginate(result["events"], arguments, "events")}
+        return [TextContent(type="text", text=dump_json(response))]
+
+    elif name == "get_continuation":
+        response = get_continuation(
+            arguments["handle"], arguments.get("path", ""), arguments.get("offset", 0)
+        )
+        return [TextContent(type="text", text=dump_json(response))]
+
+    elif name == "call_services":
+        result = await call_services(arguments["calls"])
+        return [TextContent(type="text", text=dump_json(result))]
+
+    elif name == "sync_automations":
+        result = await sync_automations(
+            arguments["automations"],
+            delete_missing=arguments.get("delete_missing", False),
+            dry_run=arguments.get("dry_run", False),
+            max_concurrency=arguments.get("max_concurrency", HA_BATCH_CONCURRENCY),
+        )
+        return [TextContent(type="text", text=dump_json(result))]
+
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+
 
 async def main():
-    """Run the MCP server."""
+    """Run the MCP server over stdio, or over HTTP for many clients with ``HA_TRANSPORT=http``."""
     _check_ha_token()
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options(),
+    if HA_TRANSPORT not in ("stdio", "http"):
+        raise ValueError(f"HA_TRANSPORT must be 'stdio' or 'http', not {HA_TRANSPORT!r}")
+    if HA_BACKEND not in BACKENDS:
+        raise ValueError(f"HA_BACKEND must be one of {', '.join(BACKENDS)}, not {HA_BACKEND!r}")
+    client.open_session_on_demand()
+    if HA_WEBSOCKET_EVENTS:
+        await start_event_listener()
+    elif HA_BACKEND == "websocket":
+        # Authenticate while the client initializes so the first tool call finds it connected
+        await open_websocket()
+    metrics_runner = None
+    if HA_METRICS_PORT:
+        metrics_runner = await start_metrics_server(
+            render_prometheus, HA_METRICS_HOST, HA_METRICS_PORT
         )
+    try:
+        if HA_TRANSPORT == "http":
+            from mcp_ha_extended.transport import serve_http
 
+            await serve_http(server, HA_HTTP_HOST, HA_HTTP_PORT, auth_token=HA_HTTP_AUTH_TOKEN)
+        else:
+            async with stdio_server() as (read_stream, write_stream):
+                await server.run(
+                    read_stream,
+                    write_stream,
+                    server.create_initialization_options(),
+                )
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        if websocket_client is not None:
+            await websocket_client.stop()
+        if persistent_cache is not None:
+            persistent_cache.close()
+        await client.close_session()
 
-if __name__ == "__main__":
+
+def run() -> None:
+    """Console-script entry point."""
     asyncio.run(main())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,199 @@
+"""In-memory mirror of Home Assistant entity states and the areas they belong to."""
+
+import time
+from collections import defaultdict
+from typing import Any, Iterable
+
+from mcp_ha_extended.search import tokenize
+
+
+def domain_of(entity_id: str) -> str:
+    """Return the domain of an entity ID, e.g. ``light`` for ``light.kitchen``."""
+    return entity_id.split(".", 1)[0]
+
+
+class StateStore:
+    """Entity states keyed by entity ID, loaded in one go and updated by ``state_changed``.
+
+    Area assignments come from the entity, device and area registries and are loaded
+    separately, only once a caller needs them.
+    """
+
+    def __init__(self):
+        self._states: dict[str, dict[str, Any]] = {}
+        self._domains: dict[str, set[str]] = defaultdict(set)
+        self._entity_areas: dict[str, str] = {}
+        self._area_names: dict[str, str] = {}
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.registry_loaded = False
+        # True while state_changed events keep the mirror current
+        self.live = False
+        self.loads = 0
+        self.events = 0
+        # Events received while a load is in flight, replayed on top of the loaded snapshot
+        self._buffered: list[dict[str, Any]] | None = None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._states
+
+    def begin_load(self) -> None:
+        """Start buffering events until ``load`` so none are lost to an older snapshot."""
+        self._buffered = []
+
+    def load(self, states: Iterable[dict[str, Any]]) -> None:
+        """Replace every state with the result of ``GET /api/states``."""
+        self._states.clear()
+        self._domains.clear()
+        for state in states:
+            self._set(state)
+        buffered, self._buffered = self._buffered or [], None
+        self.loaded = True
+        for data in buffered:
+            self._apply(data)
+        self.loaded_at = time.monotonic()
+        self.loads += 1
+
+    def load_registry(
+        self,
+        entities: Iterable[dict[str, Any]],
+        devices: Iterable[dict[str, Any]],
+        areas: Iterable[dict[str, Any]],
+    ) -> None:
+        """Resolve each entity's area from the registries; entities inherit their device's."""
+        device_areas = {d["id"]: d["area_id"] for d in devices if d.get("area_id")}
+        self._area_names = {a["area_id"]: a.get("name") or a["area_id"] for a in areas}
+        self._entity_areas = {}
+        for entity in entities:
+            area_id = entity.get("area_id") or device_areas.get(entity.get("device_id"))
+            if area_id:
+                self._entity_areas[entity["entity_id"]] = area_id
+        self.registry_loaded = True
+
+    def clear(self) -> None:
+        """Drop every state and mark the mirror as needing a reload."""
+        self._states.clear()
+        self._domains.clear()
+        self._buffered = None
+        self.loaded = False
+
+    def clear_registry(self) -> None:
+        """Forget area assignments so they are reloaded on next use."""
+        self._entity_areas.clear()
+        self._area_names.clear()
+        self.registry_loaded = False
+
+    def apply_event(self, data: dict[str, Any]) -> None:
+        """Apply the data of a ``state_changed`` event; ignored until the mirror is loaded."""
+        self.events += 1
+        if self._buffered is not None:
+            self._buffered.append(data)
+        elif self.loaded:
+            self._apply(data)
+
+    def _apply(self, data: dict[str, Any]) -> None:
+        new_state = data.get("new_state")
+        if new_state is not None:
+            self._set(new_state)
+            return
+        entity_id = data.get("entity_id", "")
+        if self._states.pop(entity_id, None) is not None:
+            domain = self._domains[domain_of(entity_id)]
+            domain.discard(entity_id)
+            if not domain:
+                del self._domains[domain_of(entity_id)]
+
+    def _set(self, state: dict[str, Any]) -> None:
+        entity_id = state["entity_id"]
+        self._states[entity_id] = state
+        self._domains[domain_of(entity_id)].add(entity_id)
+
+    def get(self, entity_id: str) -> dict[str, Any] | None:
+        """Return the full state object of an entity."""
+        return self._states.get(entity_id)
+
+    def area_id(self, area: str) -> str | None:
+        """Resolve an area ID or (case-insensitive) area name to its ID."""
+        if area in self._area_names:
+            return area
+        wanted = area.casefold()
+        for area_id, name in self._area_names.items():
+            if name.casefold() == wanted:
+                return area_id
+        return None
+
+    def summary(self, entity_id: str) -> dict[str, Any]:
+        """Return the compact form of an entity used in listings."""
+        state = self._states[entity_id]
+        summary = {
+            "entity_id": entity_id,
+            "state": state.get("state"),
+            "name": state.get("attributes", {}).get("friendly_name"),
+        }
+        if self.registry_loaded:
+            area_id = self._entity_areas.get(entity_id)
+            summary["area"] = self._area_names.get(area_id, area_id) if area_id else None
+        return summary
+
+    def query(
+        self,
+        *,
+        domain: str | None = None,
+        area: str | None = None,
+        state: str | None = None,
+        attributes: dict[str, Any] | None = None,
+        text: str | None = None,
+    ) -> list[str]:
+        """Return the sorted IDs of entities matching every given criterion.
+
+        ``attributes`` maps attribute names to required values; a value of ``None`` only
+        requires the attribute to be present. ``text`` matches when each of its tokens appears
+        in the entity ID or friendly name. Filtering by ``area`` needs the registry loaded.
+        """
+        candidates: Iterable[str] = self._domains.get(domain, ()) if domain else self._states
+        if area is not None:
+            if not self.registry_loaded:
+                raise RuntimeError("Area assignments are not loaded")
+            area_id = self.area_id(area)
+            if area_id is None:
+                return []
+            candidates = [e for e in candidates if self._entity_areas.get(e) == area_id]
+        tokens = tokenize(text or "")
+        matches = []
+        for entity_id in candidates:
+            entity = self._states[entity_id]
+            if state is not None and entity.get("state") != state:
+                continue
+            if attributes and not _attributes_match(entity.get("attributes", {}), attributes):
+                continue
+            if tokens:
+                name = entity.get("attributes", {}).get("friendly_name") or ""
+                haystack = f"{entity_id} {name}".lower()
+                if not all(token in haystack for token in tokens):
+                    continue
+            matches.append(entity_id)
+        return sorted(matches)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the mirror's size, freshness and update counters."""
+        return {
+            "entities": len(self._states),
+            "loaded": self.loaded,
+            "live": self.live,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 3) if self.loaded else None,
+            "registry_loaded": self.registry_loaded,
+            "loads": self.loads,
+            "events": self.events,
+        }
+
+
+def _attributes_match(actual: dict[str, Any], required: dict[str, Any]) -> bool:
+    for name, value in required.items():
+        if name not in actual:
+            return False
+        if value is not None and actual[name] != value:
+            return False
+    return True
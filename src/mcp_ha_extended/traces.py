@@ -0,0 +1,128 @@
+"""Compact summaries of automation traces and history for tool responses.
+
+Raw traces carry every step's variables and the full automation config and easily reach
+megabytes; these helpers keep what is needed to follow a run.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+# Step result keys that are small and say what a step did
+STEP_RESULT_KEYS = ("result", "enabled", "choice", "delay", "done", "running_script")
+
+# Default look-back when a caller gives no start time
+DEFAULT_WINDOW = timedelta(hours=24)
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp; naive times are taken as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}") from None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def time_window(
+    start: str | None, end: str | None, now: datetime | None = None
+) -> tuple[datetime, datetime]:
+    """Resolve optional ISO bounds into a window, defaulting to the last 24 hours."""
+    end_time = parse_time(end) if end else now or datetime.now(timezone.utc)
+    start_time = parse_time(start) if start else end_time - DEFAULT_WINDOW
+    if start_time > end_time:
+        raise ValueError("start must not be after end")
+    return start_time, end_time
+
+
+def _in_window(timestamp: str | None, start: datetime, end: datetime) -> bool:
+    if not timestamp:
+        return False
+    try:
+        return start <= parse_time(timestamp) <= end
+    except ValueError:
+        return False
+
+
+def summarize_run(run: dict[str, Any]) -> dict[str, Any]:
+    """Return the compact form of a ``trace/list`` entry."""
+    timestamp = run.get("timestamp") or {}
+    return {
+        "run_id": run.get("run_id"),
+        "start": timestamp.get("start"),
+        "finish": timestamp.get("finish"),
+        "state": run.get("state"),
+        "execution": run.get("script_execution"),
+        "trigger": run.get("trigger"),
+        "last_step": run.get("last_step"),
+        "error": run.get("error"),
+    }
+
+
+def filter_runs(
+    runs: Iterable[dict[str, Any]], start: datetime, end: datetime
+) -> list[dict[str, Any]]:
+    """Summarize the runs that started inside the window, newest first."""
+    summaries = [
+        summarize_run(run)
+        for run in runs
+        if _in_window((run.get("timestamp") or {}).get("start"), start, end)
+    ]
+    return sorted(summaries, key=lambda run: run["start"] or "", reverse=True)
+
+
+def summarize_step(step: dict[str, Any]) -> dict[str, Any]:
+    """Reduce a trace step to its path, time, outcome and the service it called."""
+    summary = {"path": step.get("path"), "timestamp": step.get("timestamp")}
+    result = step.get("result")
+    if isinstance(result, dict):
+        summary.update({key: result[key] for key in STEP_RESULT_KEYS if key in result})
+        params = result.get("params")
+        if isinstance(params, dict):
+            summary["service"] = f"{params.get('domain')}.{params.get('service')}"
+            target = params.get("target") or (params.get("service_data") or {}).get("entity_id")
+            if target:
+                summary["target"] = target
+    if step.get("error"):
+        summary["error"] = step["error"]
+    return summary
+
+
+def summarize_trace(trace: dict[str, Any]) -> dict[str, Any]:
+    """Return a run's outcome and its steps as one timeline ordered by time.
+
+    Variables, contexts and the automation config are left out.
+    """
+    steps = [
+        summarize_step({**step, "path": step.get("path", path)})
+        for path, path_steps in (trace.get("trace") or {}).items()
+        for step in path_steps
+    ]
+    steps.sort(key=lambda step: step["timestamp"] or "")
+    return {**summarize_run(trace), "steps": steps}
+
+
+def summarize_history(
+    states: Iterable[dict[str, Any]], start: datetime, end: datetime
+) -> dict[str, Any]:
+    """Turn an automation entity's history into its state at ``start`` and a list of events.
+
+    Home Assistant records a history row whenever ``last_triggered`` changes, so each run in
+    the window shows up as a ``triggered`` event; state flips show up as ``enabled`` or
+    ``disabled``.
+    """
+    initial_state = previous_state = None
+    seen_triggers = set()
+    events = []
+    for row in states:
+        state = row.get("state")
+        if previous_state is None:
+            initial_state = state
+        elif state != previous_state:
+            event = {"on": "enabled", "off": "disabled"}.get(state, state)
+            events.append({"time": row.get("last_changed"), "event": event})
+        triggered = (row.get("attributes") or {}).get("last_triggered")
+        if triggered not in seen_triggers and _in_window(triggered, start, end):
+            seen_triggers.add(triggered)
+            events.append({"time": triggered, "event": "triggered"})
+        previous_state = state
+    return {"initial_state": initial_state, "runs": len(seen_triggers), "events": events}
@@ -0,0 +1,108 @@
+"""HTTP transports that let one server process serve many MCP clients.
+
+Streamable HTTP is served on ``/mcp``; the older HTTP+SSE transport stays available on ``/sse``
+(with messages posted to ``/messages/``) for clients that do not support it yet.
+"""
+
+import contextlib
+import hmac
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import uvicorn
+from mcp.server.lowlevel import Server
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+STREAMABLE_HTTP_PATH = "/mcp"
+SSE_PATH = "/sse"
+SSE_MESSAGES_PATH = "/messages/"
+HEALTH_PATH = "/health"
+
+ASGIApp = Callable[[dict[str, Any], Callable, Callable], Awaitable[None]]
+
+
+class _ASGIEndpoint:
+    """Route to a raw ASGI callable instead of a Starlette request handler."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        await self.app(scope, receive, send)
+
+
+class BearerAuthMiddleware:
+    """Reject HTTP requests that do not carry ``Authorization: Bearer <token>``.
+
+    The health check stays open so container supervisors can probe it.
+    """
+
+    def __init__(self, app: ASGIApp, token: str):
+        self.app = app
+        self._expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "http" and scope["path"] != HEALTH_PATH:
+            provided = dict(scope["headers"]).get(b"authorization", b"")
+            if not hmac.compare_digest(provided, self._expected):
+                response = JSONResponse(
+                    {"error": "Unauthorized"},
+                    status_code=401,
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def create_http_app(server: Server, *, auth_token: str = "") -> Starlette:
+    """Build an ASGI app serving ``server`` over Streamable HTTP and HTTP+SSE.
+
+    All sessions share the same process, so they share its connection pool and caches.
+    """
+    session_manager = StreamableHTTPSessionManager(app=server)
+    sse = SseServerTransport(SSE_MESSAGES_PATH)
+
+    async def handle_streamable_http(scope, receive, send) -> None:
+        await session_manager.handle_request(scope, receive, send)
+
+    async def handle_sse(scope, receive, send) -> None:
+        async with sse.connect_sse(scope, receive, send) as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok"})
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with session_manager.run():
+            yield
+
+    app = Starlette(
+        routes=[
+            Route(HEALTH_PATH, health),
+            Route(STREAMABLE_HTTP_PATH, _ASGIEndpoint(handle_streamable_http)),
+            Route(SSE_PATH, _ASGIEndpoint(handle_sse)),
+            Mount(SSE_MESSAGES_PATH, app=sse.handle_post_message),
+        ],
+        lifespan=lifespan,
+    )
+    if auth_token:
+        app.add_middleware(BearerAuthMiddleware, token=auth_token)
+    return app
+
+
+async def serve_http(server: Server, host: str, port: int, *, auth_token: str = "") -> None:
+    """Serve ``server`` over HTTP until the process is asked to stop."""
+    config = uvicorn.Config(
+        create_http_app(server, auth_token=auth_token),
+        host=host,
+        port=port,
+        log_level="info",
+        lifespan="on",
+    )
+    await uvicorn.Server(config).serve()
@@ -0,0 +1,486 @@
+"""Offline validation of automation configs before they are sent to Home Assistant.
+
+Checks the structure of triggers, conditions and actions, the syntax of entity IDs and
+templates, and optionally whether referenced entities exist. Only problems Home Assistant
+would reject are errors; anything that may still be intended (an integration's own trigger
+platform, an action type from a newer release, an entity that is not loaded yet) is a warning.
+"""
+
+import re
+from typing import Any, Callable
+
+ENTITY_ID_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$")
+# Entity registry IDs, which the UI writes into device steps and targets instead of entity IDs
+REGISTRY_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+SERVICE_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9_]+$")
+
+MODES = ("single", "restart", "queued", "parallel")
+
+TOP_LEVEL_KEYS = {
+    "id",
+    "alias",
+    "description",
+    "mode",
+    "max",
+    "max_exceeded",
+    "initial_state",
+    "hide_entity",
+    "trace",
+    "variables",
+    "trigger_variables",
+    "use_blueprint",
+    "trigger",
+    "triggers",
+    "condition",
+    "conditions",
+    "action",
+    "actions",
+}
+
+# Trigger platforms and the options each one needs; a tuple means "at least one of".
+# Options Home Assistant defaults (such as the zone ``event``) are not listed.
+TRIGGER_REQUIRED: dict[str, tuple] = {
+    "calendar": ("entity_id",),
+    "conversation": ("command",),
+    "device": ("device_id", "domain"),
+    "event": ("event_type",),
+    "geo_location": ("source", "zone"),
+    "homeassistant": ("event",),
+    "mqtt": ("topic",),
+    "numeric_state": ("entity_id", ("above", "below")),
+    "persistent_notification": (),
+    "state": ("entity_id",),
+    "sun": ("event",),
+    "tag": ("tag_id",),
+    "template": ("value_template",),
+    "time": ("at",),
+    "time_pattern": (("hours", "minutes", "seconds"),),
+    "webhook": ("webhook_id",),
+    "zone": ("entity_id", "zone"),
+}
+
+CONDITION_REQUIRED: dict[str, tuple] = {
+    "and": ("conditions",),
+    "or": ("conditions",),
+    "not": ("conditions",),
+    "device": ("device_id", "domain"),
+    "numeric_state": ("entity_id", ("above", "below")),
+    "state": ("entity_id", "state"),
+    "sun": (("before", "after"),),
+    "template": ("value_template",),
+    "time": (("before", "after", "weekday"),),
+    "trigger": ("id",),
+    "zone": ("entity_id", "zone"),
+}
+
+# Condition shorthand: a mapping whose only key is one of these, holding the nested conditions
+COMPOUND_CONDITIONS = ("and", "or", "not")
+
+# Keys that identify an action step, checked in this order
+ACTION_KEYS = (
+    "service",
+    "action",
+    "delay",
+    "wait_template",
+    "wait_for_trigger",
+    "event",
+    "condition",
+    "repeat",
+    "choose",
+    "if",
+    "parallel",
+    "sequence",
+    "variables",
+    "stop",
+    "scene",
+    "device_id",
+    "set_conversation_response",
+)
+
+# Action options holding nested steps, validated on their own
+NESTED_ACTION_KEYS = (
+    "repeat",
+    "choose",
+    "default",
+    "if",
+    "then",
+    "else",
+    "parallel",
+    "sequence",
+    "wait_for_trigger",
+)
+
+# Option keys whose string values are templates
+TEMPLATE_KEYS = ("value_template", "wait_template")
+
+_TEMPLATE_BLOCKS = {
+    "if": "endif",
+    "for": "endfor",
+    "macro": "endmacro",
+    "call": "endcall",
+    "filter": "endfilter",
+    "with": "endwith",
+}
+# Tags allowed inside an open block, and the end tags of the blocks they may appear in
+_TEMPLATE_MIDDLE = {"elif": ("endif",), "else": ("endif", "endfor")}
+_TEMPLATE_OPEN_RE = re.compile(r"{{|{%|{#")
+_TEMPLATE_CLOSERS = {"{{": "}}", "{%": "%}"}
+_RAW_END_RE = re.compile(r"{%[-+]?\s*endraw\s*[-+]?%}")
+
+
+def template_error(template: str) -> str | None:
+    """Return why a Jinja template is malformed, or ``None`` if its structure is sound.
+
+    This checks delimiters, quotes, brackets and block nesting; it does not evaluate anything.
+    """
+    stack: list[str] = []
+    position = 0
+    while match := _TEMPLATE_OPEN_RE.search(template, position):
+        opening = match.group()
+        if opening == "{#":
+            end = template.find("#}", match.end())
+            if end < 0:
+                return "Unclosed comment"
+            position = end + 2
+            continue
+        end, problem = _scan_tag(template, match.end(), opening)
+        if problem:
+            return problem
+        body = template[match.end() : end]
+        position = end + 2
+        if opening == "{{":
+            continue
+        words = body.strip().strip("-+").split()
+        tag = words[0] if words else ""
+        if tag == "raw":
+            # Everything up to endraw is literal text
+            raw_end = _RAW_END_RE.search(template, position)
+            if raw_end is None:
+                return "Missing 'endraw'"
+            position = raw_end.end()
+        elif tag == "set" and "=" not in body:
+            stack.append("endset")
+        elif tag in _TEMPLATE_BLOCKS:
+            stack.append(_TEMPLATE_BLOCKS[tag])
+        elif tag in _TEMPLATE_MIDDLE:
+            if not stack or stack[-1] not in _TEMPLATE_MIDDLE[tag]:
+                return f"'{tag}' outside of a matching block"
+        elif tag.startswith("end"):
+            if not stack or stack.pop() != tag:
+                return f"Unexpected '{tag}'"
+        elif not tag:
+            return "Empty statement"
+    if stack:
+        return f"Missing '{stack[-1]}'"
+    return None
+
+
+def _scan_tag(template: str, start: int, opening: str) -> tuple[int, str | None]:
+    """Find where the tag opened just before ``start`` closes; return that index and a problem.
+
+    Delimiters inside string literals (with backslash escapes) or an open ``{`` literal do
+    not close the tag.
+    """
+    closing = _TEMPLATE_CLOSERS[opening]
+    pairs = {")": "(", "]": "[", "}": "{"}
+    brackets: list[str] = []
+    quote = None
+    problem = None
+    i = start
+    while i < len(template):
+        char = template[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif "{" not in brackets and template.startswith(closing, i):
+            if problem is None and brackets:
+                problem = f"Unclosed '{brackets[-1]}'"
+            return i, problem
+        elif "{" not in brackets and template.startswith(("}}", "%}"), i):
+            return i, f"'{opening}' closed by '{template[i : i + 2]}'"
+        elif char in "'\"":
+            quote = char
+        elif char in "([{":
+            brackets.append(char)
+        elif char in pairs:
+            if brackets and brackets[-1] == pairs[char]:
+                brackets.pop()
+            elif problem is None:
+                problem = f"Unbalanced '{char}'"
+        i += 1
+    if quote:
+        return i, "Unterminated string"
+    return i, "Unclosed template delimiter"
+
+
+def is_template(value: Any) -> bool:
+    """Whether a string value contains Jinja syntax."""
+    return isinstance(value, str) and ("{{" in value or "{%" in value)
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class AutomationValidator:
+    """Collects errors and warnings for one automation config.
+
+    ``entity_exists`` is called for every literal entity ID; pass ``None`` to skip the check.
+    """
+
+    def __init__(self, entity_exists: Callable[[str], bool] | None = None):
+        self.entity_exists = entity_exists
+        self.errors: list[dict[str, str]] = []
+        self.warnings: list[dict[str, str]] = []
+
+    def error(self, path: str, message: str) -> None:
+        self.errors.append({"path": path, "message": message})
+
+    def warning(self, path: str, message: str) -> None:
+        self.warnings.append({"path": path, "message": message})
+
+    def result(self) -> dict[str, Any]:
+        """Return the outcome as plain data."""
+        return {
+            "valid": not self.errors,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "entities_checked": self.entity_exists is not None,
+        }
+
+    def validate(self, config: Any) -> dict[str, Any]:
+        """Validate a parsed automation config and return ``result()``."""
+        if not isinstance(config, dict):
+            self.error("", "Automation config must be a mapping")
+            return self.result()
+        for key in config:
+            if key not in TOP_LEVEL_KEYS:
+                self.warning(str(key), "Unknown option")
+        for key in ("alias", "description"):
+            if key in config and not isinstance(config[key], str):
+                self.error(key, "Must be a string")
+        if "use_blueprint" in config:
+            # Triggers and actions come from the blueprint
+            self.blueprint("use_blueprint", config["use_blueprint"])
+            return self.result()
+        for singular, plural in (("trigger", "triggers"), ("action", "actions")):
+            if singular in config and plural in config:
+                self.error(plural, f"Use either '{singular}' or '{plural}', not both")
+            if singular not in config and plural not in config:
+                self.error(plural, "Required")
+        mode = config.get("mode", "single")
+        if mode not in MODES:
+            self.error("mode", f"Must be one of {', '.join(MODES)}")
+        if "max" in config and (not isinstance(config["max"], int) or config["max"] < 1):
+            self.error("max", "Must be a positive integer")
+
+        trigger_key = "triggers" if "triggers" in config else "trigger"
+        for i, trigger in enumerate(_as_list(config.get(trigger_key))):
+            self.trigger(f"{trigger_key}[{i}]", trigger)
+        condition_key = "conditions" if "conditions" in config else "condition"
+        for i, condition in enumerate(_as_list(config.get(condition_key))):
+            self.condition(f"{condition_key}[{i}]", condition)
+        action_key = "actions" if "actions" in config else "action"
+        self.actions(action_key, config.get(action_key))
+        return self.result()
+
+    def blueprint(self, path: str, blueprint: Any) -> None:
+        if not isinstance(blueprint, dict):
+            self.error(path, "Must be a mapping with 'path' and 'input'")
+            return
+        if not isinstance(blueprint.get("path"), str) or not blueprint["path"]:
+            self.error(f"{path}.path", "Required")
+        if not isinstance(blueprint.get("input", {}), dict):
+            self.error(f"{path}.input", "Must be a mapping")
+
+    def trigger(self, path: str, trigger: Any) -> None:
+        if not isinstance(trigger, dict):
+            self.error(path, "Trigger must be a mapping")
+            return
+        platform = trigger.get("platform", trigger.get("trigger"))
+        if not isinstance(platform, str):
+            self.error(path, "Missing 'trigger' (or 'platform')")
+            return
+        required = TRIGGER_REQUIRED.get(platform)
+        if required is None:
+            if "." not in platform:
+                self.warning(f"{path}.trigger", f"Unknown trigger platform '{platform}'")
+        else:
+            self.required(path, trigger, required)
+        self.options(path, trigger)
+
+    def condition(self, path: str, condition: Any) -> None:
+        if isinstance(condition, str):
+            # Template shorthand
+            self.template(path, condition)
+            return
+        if not isinstance(condition, dict):
+            self.error(path, "Condition must be a mapping or a template")
+            return
+        kind = condition.get("condition")
+        shorthand = [key for key in COMPOUND_CONDITIONS if key in condition]
+        if kind is None and len(shorthand) == 1:
+            # `- or: [...]` is short for `- condition: or` with `conditions: [...]`
+            kind = shorthand[0]
+            for i, nested in enumerate(_as_list(condition[kind])):
+                self.condition(f"{path}.{kind}[{i}]", nested)
+            self.options(path, condition, skip=(kind,))
+            return
+        if not isinstance(kind, str):
+            self.error(path, "Missing 'condition'")
+            return
+        required = CONDITION_REQUIRED.get(kind)
+        if required is None:
+            self.warning(f"{path}.condition", f"Unknown condition type '{kind}'")
+        else:
+            self.required(path, condition, required)
+        for i, nested in enumerate(_as_list(condition.get("conditions"))):
+            self.condition(f"{path}.conditions[{i}]", nested)
+        self.options(path, condition, skip=("conditions",))
+
+    def actions(self, path: str, actions: Any) -> None:
+        for i, action in enumerate(_as_list(actions)):
+            self.action(f"{path}[{i}]", action)
+
+    def action(self, path: str, action: Any) -> None:
+        if not isinstance(action, dict):
+            self.error(path, "Action must be a mapping")
+            return
+        kind = next((key for key in ACTION_KEYS if key in action), None)
+        if kind is None:
+            # Newer Home Assistant versions add action types this list does not know yet
+            self.warning(path, "Unknown action; expected one of " + ", ".join(ACTION_KEYS[:6]))
+            return
+        value = action[kind]
+        if kind in ("service", "action"):
+            if not isinstance(value, str) or not (SERVICE_RE.match(value) or is_template(value)):
+                self.error(f"{path}.{kind}", "Must be a service such as light.turn_on")
+        elif kind == "condition":
+            self.condition(path, action)
+            return
+        elif kind == "repeat":
+            self.repeat(f"{path}.repeat", value)
+        elif kind == "choose":
+            for i, option in enumerate(_as_list(value)):
+                option_path = f"{path}.choose[{i}]"
+                if not isinstance(option, dict) or "sequence" not in option:
+                    self.error(option_path, "Choice needs 'conditions' and 'sequence'")
+                    continue
+                for j, condition in enumerate(_as_list(option.get("conditions"))):
+                    self.condition(f"{option_path}.conditions[{j}]", condition)
+                self.actions(f"{option_path}.sequence", option["sequence"])
+            if "default" in action:
+                self.actions(f"{path}.default", action["default"])
+        elif kind == "if":
+            if "then" not in action:
+                self.error(path, "'if' needs 'then'")
+            for i, condition in enumerate(_as_list(value)):
+                self.condition(f"{path}.if[{i}]", condition)
+            self.actions(f"{path}.then", action.get("then"))
+            self.actions(f"{path}.else", action.get("else"))
+        elif kind in ("parallel", "sequence"):
+            for i, step in enumerate(_as_list(value)):
+                step_path = f"{path}.{kind}[{i}]"
+                if isinstance(step, dict) and "sequence" in step and kind == "parallel":
+                    self.actions(f"{step_path}.sequence", step["sequence"])
+                else:
+                    self.action(step_path, step)
+        elif kind == "wait_for_trigger":
+            for i, trigger in enumerate(_as_list(value)):
+                self.trigger(f"{path}.wait_for_trigger[{i}]", trigger)
+        elif kind == "wait_template":
+            self.template(f"{path}.wait_template", value)
+        self.options(path, action, skip=NESTED_ACTION_KEYS)
+
+    def repeat(self, path: str, repeat: Any) -> None:
+        if not isinstance(repeat, dict):
+            self.error(path, "Must be a mapping")
+            return
+        loops = [key for key in ("count", "while", "until", "for_each") if key in repeat]
+        if len(loops) != 1:
+            self.error(path, "Needs exactly one of count, while, until or for_each")
+        if "sequence" not in repeat:
+            self.error(path, "Missing 'sequence'")
+        for key in ("while", "until"):
+            for i, condition in enumerate(_as_list(repeat.get(key))):
+                self.condition(f"{path}.{key}[{i}]", condition)
+        self.actions(f"{path}.sequence", repeat.get("sequence"))
+
+    def required(self, path: str, options: dict[str, Any], required: tuple) -> None:
+        for requirement in required:
+            if isinstance(requirement, tuple):
+                if not any(key in options for key in requirement):
+                    self.error(path, f"Needs at least one of {', '.join(requirement)}")
+            elif requirement not in options:
+                self.error(f"{path}.{requirement}", "Required")
+
+    def options(self, path: str, options: dict[str, Any], skip: tuple = ()) -> None:
+        """Check entity IDs and templates anywhere in a step's remaining options."""
+        for key, value in options.items():
+            if key in skip:
+                continue
+            if key == "entity_id":
+                self.entity_ids(f"{path}.entity_id", value)
+            elif key in ("target", "data", "service_data") and isinstance(value, dict):
+                if "entity_id" in value:
+                    self.entity_ids(f"{path}.{key}.entity_id", value["entity_id"])
+                self.templates(f"{path}.{key}", value)
+            elif key in TEMPLATE_KEYS or is_template(value):
+                self.template(f"{path}.{key}", value)
+
+    def templates(self, path: str, value: Any) -> None:
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self.templates(f"{path}.{key}", item)
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                self.templates(f"{path}[{i}]", item)
+        elif is_template(value):
+            self.template(path, value)
+
+    def template(self, path: str, value: Any) -> None:
+        if not isinstance(value, str):
+            self.error(path, "Template must be a string")
+            return
+        problem = template_error(value)
+        if problem:
+            self.error(path, f"Invalid template: {problem}")
+
+    def entity_ids(self, path: str, value: Any) -> None:
+        if is_template(value):
+            self.template(path, value)
+            return
+        if isinstance(value, str):
+            value = [e.strip() for e in value.split(",")]
+        for entity_id in _as_list(value):
+            if isinstance(entity_id, str) and REGISTRY_ID_RE.match(entity_id):
+                # Not resolvable without the entity registry
+                continue
+            if not isinstance(entity_id, str) or not ENTITY_ID_RE.match(entity_id):
+                if entity_id not in ("all", "none"):
+                    self.error(path, f"Invalid entity ID: {entity_id!r}")
+            elif self.entity_exists is not None and not self.entity_exists(entity_id):
+                self.warning(path, f"Unknown entity: {entity_id}")
+
+
+def validate_automation(
+    config: Any, entity_exists: Callable[[str], bool] | None = None
+) -> dict[str, Any]:
+    """Validate a parsed automation config; see ``AutomationValidator``."""
+    return AutomationValidator(entity_exists).validate(config)
+
+
+class AutomationValidationError(ValueError):
+    """Raised instead of sending an automation config that fails validation."""
+
+    def __init__(self, result: dict[str, Any]):
+        details = "; ".join(
+            f"{error['path']}: {error['message']}" if error["path"] else error["message"]
+            for error in result["errors"]
+        )
+        super().__init__(f"Invalid automation config: {details}")
+        self.result = result
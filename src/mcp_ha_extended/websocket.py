@@ -0,0 +1,227 @@
+"""Home Assistant WebSocket API client.
+
+Keeps one authenticated connection open, correlates command results by message ID and
+re-subscribes to events after every reconnect. Events are dispatched to their handlers one at
+a time, in the order Home Assistant sent them.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict[str, Any]], Awaitable[None]]
+ConnectionHandler = Callable[[], Awaitable[None]]
+
+
+class WebSocketAuthError(Exception):
+    """Raised when Home Assistant rejects the access token."""
+
+
+class WebSocketCommandError(Exception):
+    """Raised when Home Assistant answers a command with ``success: false``."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+def websocket_url(ha_url: str) -> str:
+    """Derive the WebSocket API URL from the Home Assistant base URL."""
+    base = ha_url.rstrip("/")
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://") :]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://") :]
+    return f"{base}/api/websocket"
+
+
+class HAWebSocketClient:
+    """Long-lived, self-reconnecting connection to the Home Assistant WebSocket API."""
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        *,
+        heartbeat: float = 30.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+        session: aiohttp.ClientSession | None = None,
+    ):
+        self.url = url
+        self._token = token
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._session = session
+        self._owns_session = session is None
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._event_handlers: dict[str, list[EventHandler]] = {}
+        self._subscriptions: dict[int, str] = {}
+        self._on_connect: list[ConnectionHandler] = []
+        self._on_disconnect: list[ConnectionHandler] = []
+        self._task: asyncio.Task | None = None
+        self.connected = asyncio.Event()
+        self.connections = 0
+
+    def subscribe(self, event_type: str, handler: EventHandler) -> None:
+        """Register a handler for an event type; subscriptions are renewed on reconnect.
+
+        Handlers run on the receive loop, so they must not wait on ``call()``.
+        """
+        self._event_handlers.setdefault(event_type, []).append(handler)
+
+    def on_connect(self, handler: ConnectionHandler) -> None:
+        """Register a callback run after every successful (re)connect and subscribe."""
+        self._on_connect.append(handler)
+
+    def on_disconnect(self, handler: ConnectionHandler) -> None:
+        """Register a callback run whenever the connection is lost."""
+        self._on_disconnect.append(handler)
+
+    async def start(self) -> None:
+        """Start the background connection task."""
+        if self._task is not None:
+            return
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        self._task = asyncio.create_task(self._run(), name="ha-websocket")
+
+    async def stop(self) -> None:
+        """Stop the background task and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+        self.connected.clear()
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def call(self, message: dict[str, Any], timeout: float | None = 30.0) -> Any:
+        """Send a command and wait for its ``result`` message."""
+        ws = self._ws
+        if ws is None or ws.closed:
+            raise ConnectionError("Home Assistant WebSocket is not connected")
+        return await asyncio.wait_for(self._command(ws, next(self._ids), message), timeout)
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self._connect_once()
+                delay = self.reconnect_delay
+            except WebSocketAuthError:
+                logger.error("Home Assistant rejected the WebSocket access token")
+                raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Home Assistant WebSocket connection failed: %s", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _connect_once(self) -> None:
+        async with self._session.ws_connect(self.url, heartbeat=self.heartbeat) as ws:
+            await self._authenticate(ws)
+            self._ws = ws
+            reader = asyncio.create_task(self._receive_loop(ws))
+            try:
+                self._subscriptions.clear()
+                for event_type in self._event_handlers:
+                    message_id = next(self._ids)
+                    self._subscriptions[message_id] = event_type
+                    await self._command(
+                        ws, message_id, {"type": "subscribe_events", "event_type": event_type}
+                    )
+                self.connections += 1
+                self.connected.set()
+                for handler in self._on_connect:
+                    await handler()
+                await reader
+            finally:
+                reader.cancel()
+                self._ws = None
+                self.connected.clear()
+                self._fail_pending()
+                for handler in self._on_disconnect:
+                    try:
+                        await handler()
+                    except Exception:
+                        logger.exception("WebSocket disconnect handler failed")
+
+    async def _command(
+        self, ws: aiohttp.ClientWebSocketResponse, message_id: int, message: dict[str, Any]
+    ) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        try:
+            await ws.send_str(json.dumps({**message, "id": message_id}))
+            return await future
+        finally:
+            self._pending.pop(message_id, None)
+
+    async def _authenticate(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        message = await ws.receive_json()
+        if message.get("type") != "auth_required":
+            raise ConnectionError(f"Unexpected WebSocket handshake message: {message.get('type')}")
+        await ws.send_json({"type": "auth", "access_token": self._token})
+        message = await ws.receive_json()
+        if message.get("type") == "auth_invalid":
+            raise WebSocketAuthError(message.get("message", "Invalid access token"))
+        if message.get("type") != "auth_ok":
+            raise ConnectionError(f"Unexpected WebSocket auth response: {message.get('type')}")
+
+    async def _receive_loop(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                payload = json.loads(msg.data)
+                # Home Assistant may coalesce several messages into one frame
+                for message in payload if isinstance(payload, list) else [payload]:
+                    await self._dispatch(message)
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Home Assistant WebSocket closed"))
+
+    async def _dispatch(self, message: dict[str, Any]) -> None:
+        message_type = message.get("type")
+        if message_type == "result":
+            future = self._pending.get(message.get("id"))
+            if future is None or future.done():
+                return
+            if message.get("success", False):
+                future.set_result(message.get("result"))
+            else:
+                error = message.get("error") or {}
+                future.set_exception(
+                    WebSocketCommandError(
+                        error.get("code", "unknown_error"), error.get("message", "")
+                    )
+                )
+        elif message_type == "event":
+            event_type = self._subscriptions.get(message.get("id"))
+            for handler in self._event_handlers.get(event_type, []):
+                try:
+                    await handler(message.get("event", {}))
+                except Exception:
+                    logger.exception("WebSocket event handler for %s failed", event_type)
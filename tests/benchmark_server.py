@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Benchmark the MCP server against an in-process fake Home Assistant.
+
+This is a standalone script, not a pytest test file. Run it from the repository root:
+
+    pdm run bench --mode call_tool --automations 500 --requests 2000 --concurrency 32
+
+``call_tool`` mode dispatches tool calls in-process; ``stdio`` mode starts the server as a
+subprocess and talks to it through an MCP client session, covering the full ``server.run`` path;
+``startup`` mode spawns fresh server processes and times their first responses.
+Save a run with ``--output`` and compare later runs with ``--baseline`` to catch regressions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from mcp_ha_extended import client, server
+from mcp_ha_extended.metrics import percentile
+from tests.fake_home_assistant import FakeHomeAssistant
+
+TOKEN = "benchmark_token"
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# A tool call: (tool name, arguments)
+Call = tuple[str, dict[str, Any]]
+CallFactory = Callable[[random.Random, list[str]], Call]
+
+# Weighted tool mixes; reads dominate real assistant sessions
+WORKLOADS: dict[str, list[tuple[int, CallFactory]]] = {
+    "read": [
+        (5, lambda rng, ids: ("get_automation", {"automation_id": rng.choice(ids)})),
+        (3, lambda rng, ids: ("list_automations", {"limit": 50})),
+        (
+            2,
+            lambda rng, ids: (
+                "search_automations",
+                {"entity_id": f"light.kitchen_{rng.randrange(0, len(ids), 5)}"},
+            ),
+        ),
+    ],
+    "mixed": [
+        (4, lambda rng, ids: ("get_automation", {"automation_id": rng.choice(ids)})),
+        (2, lambda rng, ids: ("list_automations", {"limit": 50})),
+        (1, lambda rng, ids: ("search_automations", {"service": "light.turn_on", "limit": 10})),
+        (1, lambda rng, ids: ("trigger_automation", {"automation_id": rng.choice(ids)})),
+        (1, lambda rng, ids: ("enable_automation", {"automation_id": rng.choice(ids)})),
+        (1, lambda rng, ids: ("disable_automation", {"automation_id": rng.choice(ids)})),
+    ],
+}
+
+# Report keys compared against a baseline, and whether higher values are better
+GATED_KEYS = {
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "initialize_p50_ms": False,
+    "first_call_p50_ms": False,
+}
+
+
+def make_calls(workload: str, count: int, automation_ids: list[str], seed: int) -> list[Call]:
+    """Draw ``count`` tool calls from a workload, reproducibly."""
+    rng = random.Random(seed)
+    weights, factories = zip(*WORKLOADS[workload], strict=True)
+    return [factory(rng, automation_ids) for factory in rng.choices(factories, weights, k=count)]
+
+
+def is_error(text: str) -> bool:
+    """Whether a tool response is an error payload."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+async def drive(
+    invoke: Callable[[str, dict[str, Any]], Awaitable[str]], calls: list[Call], concurrency: int
+) -> tuple[list[float], int, float]:
+    """Run calls through ``concurrency`` workers; return latencies, error count and wall time."""
+    queue = iter(calls)
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for name, arguments in queue:
+            started = time.perf_counter()
+            try:
+                failed = is_error(await invoke(name, arguments))
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(latencies: list[float], errors: int, wall: float) -> dict[str, Any]:
+    """Turn raw measurements into report fields."""
+    ordered = sorted(latencies)
+    return {
+        "completed": len(ordered),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ordered) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def max_rss_mb(who: int) -> float:
+    """Peak resident set size of this process or its children, in MiB (Linux units)."""
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+async def bench_call_tool(
+    fake: FakeHomeAssistant, calls: list[Call], warmup: list[Call], concurrency: int
+) -> dict[str, Any]:
+    """Benchmark in-process ``call_tool`` dispatch."""
+    server.HA_URL = fake.url
+    server.HA_TOKEN = TOKEN
+
+    async def invoke(name: str, arguments: dict[str, Any]) -> str:
+        return (await server.call_tool(name, arguments))[0].text
+
+    await client.open_session()
+    try:
+        await drive(invoke, warmup, concurrency)
+        fake.rest_requests.clear()
+        tracemalloc.start()
+        try:
+            report = summarize(*await drive(invoke, calls, concurrency))
+            report["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        finally:
+            tracemalloc.stop()
+    finally:
+        await client.close_session()
+    report["max_rss_mb"] = max_rss_mb(resource.RUSAGE_SELF)
+    return report
+
+
+def server_parameters(ha_url: str, env: dict[str, str]):
+    """Describe how to spawn the server as a stdio subprocess talking to ``ha_url``."""
+    from mcp import StdioServerParameters
+
+    python_path = os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))
+    return StdioServerParameters(
+        command=sys.executable,
+        args=["-m", "mcp_ha_extended.server"],
+        env={
+            **os.environ,
+            **env,
+            "HA_URL": ha_url,
+            "HA_TOKEN": TOKEN,
+            "PYTHONPATH": python_path,
+        },
+    )
+
+
+async def bench_stdio(
+    fake: FakeHomeAssistant,
+    calls: list[Call],
+    warmup: list[Call],
+    concurrency: int,
+    env: dict[str, str],
+) -> dict[str, Any]:
+    """Benchmark the server as a subprocess over the MCP stdio transport."""
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    async with stdio_client(server_parameters(fake.url, env)) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+
+            async def invoke(name: str, arguments: dict[str, Any]) -> str:
+                result = await session.call_tool(name, arguments)
+                return result.content[0].text
+
+            await drive(invoke, warmup, concurrency)
+            fake.rest_requests.clear()
+            report = summarize(*await drive(invoke, calls, concurrency))
+    # Children's peak RSS is only reported once they have exited
+    report["server_max_rss_mb"] = max_rss_mb(resource.RUSAGE_CHILDREN)
+    return report
+
+
+async def bench_startup(fake: FakeHomeAssistant, runs: int, env: dict[str, str]) -> dict[str, Any]:
+    """Time fresh server processes from spawn to ``initialize`` and to their first tool call."""
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    initialize: list[float] = []
+    first_call: list[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        async with stdio_client(server_parameters(fake.url, env)) as (read_stream, write_stream):
+            async with ClientSession(read_stream, write_stream) as session:
+                await session.initialize()
+                initialize.append(time.perf_counter() - started)
+                await session.call_tool("list_automations", {"limit": 1})
+                first_call.append(time.perf_counter() - started)
+    initialize.sort()
+    first_call.sort()
+    return {
+        "runs": runs,
+        "initialize_p50_ms": round(percentile(initialize, 0.50) * 1000, 1),
+        "initialize_max_ms": round(initialize[-1] * 1000, 1),
+        "first_call_p50_ms": round(percentile(first_call, 0.50) * 1000, 1),
+        "first_call_max_ms": round(first_call[-1] * 1000, 1),
+    }
+
+
+async def run_benchmark(
+    *,
+    mode: str = "call_tool",
+    workload: str = "read",
+    automations: int = 200,
+    requests: int = 1000,
+    concurrency: int = 16,
+    warmup: int = 50,
+    latency: float = 0.002,
+    error_rate: float = 0.0,
+    seed: int = 0,
+    runs: int = 5,
+    env: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """Run one benchmark against a fresh fake Home Assistant and return the report."""
+    fake = FakeHomeAssistant(
+        TOKEN, automations=automations, latency=latency, error_rate=error_rate, seed=seed
+    )
+    await fake.start()
+    try:
+        automation_ids = list(fake.automations)
+        calls = make_calls(workload, requests, automation_ids, seed)
+        warmup_calls = make_calls(workload, warmup, automation_ids, seed + 1)
+        if mode == "call_tool":
+            report = await bench_call_tool(fake, calls, warmup_calls, concurrency)
+        elif mode == "stdio":
+            report = await bench_stdio(fake, calls, warmup_calls, concurrency, env or {})
+        elif mode == "startup":
+            report = await bench_startup(fake, runs, env or {})
+        else:
+            raise ValueError(f"Unknown mode: {mode}")
+        upstream = len(fake.rest_requests)
+    finally:
+        await fake.stop()
+    return {
+        "mode": mode,
+        "workload": workload,
+        "automations": automations,
+        "requests": requests,
+        "concurrency": concurrency,
+        "ha_latency_ms": latency * 1000,
+        "ha_error_rate": error_rate,
+        **report,
+        "upstream_requests": upstream,
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Return a description of every gated metric that regressed beyond ``tolerance``."""
+    regressions = []
+    for key, higher_is_better in GATED_KEYS.items():
+        old, new = baseline.get(key), report.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{key}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("call_tool", "stdio", "startup"), default="call_tool")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="read")
+    parser.add_argument("--automations", type=int, default=200, help="dataset size")
+    parser.add_argument("--requests", type=int, default=1000, help="measured tool calls")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured tool calls first")
+    parser.add_argument("--latency", type=float, default=2.0, help="fake HA latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HA 503s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=5, help="server spawns in startup mode")
+    parser.add_argument("--output", type=Path, help="write the report to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare against a saved report")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(
+        run_benchmark(
+            mode=args.mode,
+            workload=args.workload,
+            automations=args.automations,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            warmup=args.warmup,
+            latency=args.latency / 1000,
+            error_rate=args.error_rate,
+            seed=args.seed,
+            runs=args.runs,
+        )
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
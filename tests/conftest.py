@@ -0,0 +1,31 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+from mcp_ha_extended import server
+from mcp_ha_extended.concurrency import RateLimiter
+
+
+def _reset_server_state():
+    server.automation_cache.clear()
+    server.automation_cache.reset_stats()
+    server.automation_cache.ttl = server.HA_CACHE_TTL
+    server.automation_entity_ids.clear()
+    server.automation_index.clear()
+    server.circuit_breaker.record_success()
+    server.continuations.clear()
+    server.metrics.reset()
+    server.parse_cache.clear()
+    server.rate_limiter = RateLimiter(server.HA_RATE_LIMIT, server.HA_RATE_BURST)
+    server.state_store.clear()
+    server.state_store.clear_registry()
+    server.state_store.live = False
+    server.websocket_client = None
+
+
+@pytest.fixture(autouse=True)
+def reset_server_state():
+    """Start every test with empty caches so results never leak between tests."""
+    _reset_server_state()
+    yield
+    _reset_server_state()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""In-process stand-in for the Home Assistant API, used by tests.
+
+This is a helper module, not a pytest test file.
+"""
+
+import asyncio
+import json
+import random
+from typing import Any, Awaitable, Callable
+
+from aiohttp import WSMsgType, web
+
+CommandHandler = Callable[[dict[str, Any]], Awaitable[Any]]
+
+
+def make_automation(index: int) -> dict[str, Any]:
+    """Build a realistic automation config for synthetic datasets."""
+    room = ("kitchen", "hallway", "bedroom", "garage", "office")[index % 5]
+    return {
+        "id": f"automation_{index:05d}",
+        "alias": f"{room.title()} lights {index}",
+        "description": f"Turn on the {room} lights on motion",
+        "enabled": index % 7 != 0,
+        "mode": "single",
+        "trigger": [
+            {"platform": "state", "entity_id": f"binary_sensor.{room}_motion_{index}", "to": "on"}
+        ],
+        "condition": [{"condition": "sun", "after": "sunset"}],
+        "action": [
+            {"service": "light.turn_on", "target": {"entity_id": f"light.{room}_{index}"}},
+            {"delay": {"seconds": 30}},
+        ],
+    }
+
+
+class FakeHomeAssistant:
+    """Minimal Home Assistant REST and WebSocket API server bound to a random local port.
+
+    ``latency`` delays every REST response and ``error_rate`` answers that fraction of REST
+    requests with a 503, so tests and benchmarks can reproduce a slow or flaky instance.
+    """
+
+    def __init__(
+        self,
+        token: str = "test_token",
+        *,
+        automations: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.token = token
+        self.latency = latency
+        self.error_rate = error_rate
+        self.connections = 0
+        self.received: list[dict[str, Any]] = []
+        self.rest_requests: list[tuple[str, str]] = []
+        self.service_calls: list[tuple[str, dict[str, Any]]] = []
+        self.command_handlers: dict[str, CommandHandler] = {}
+        self.automations: dict[str, dict[str, Any]] = {}
+        self.states: dict[str, dict[str, Any]] = {}
+        self.load_dataset(automations)
+        self._random = random.Random(seed)
+        self._subscriptions: list[tuple[web.WebSocketResponse, int, str]] = []
+        self._sockets: set[web.WebSocketResponse] = set()
+        self._runner: web.AppRunner | None = None
+        self.app = web.Application(middlewares=[self._rest_middleware])
+        self.app.router.add_get("/api/websocket", self._websocket)
+        self.app.router.add_get("/api/automation", self._list_automations)
+        self.app.router.add_post("/api/automation", self._create_automation)
+        self.app.router.add_get("/api/automation/{automation_id}", self._get_automation)
+        self.app.router.add_put("/api/automation/{automation_id}", self._update_automation)
+        self.app.router.add_delete("/api/automation/{automation_id}", self._delete_automation)
+        self.app.router.add_post(
+            "/api/automation/{automation_id}/trigger", self._trigger_automation
+        )
+        self.app.router.add_post("/api/services/{domain}/{service}", self._call_service)
+        self.app.router.add_get("/api/states", self._list_states)
+        self.url = ""
+
+    def load_dataset(self, count: int) -> None:
+        """Replace the stored automations with ``count`` synthetic ones."""
+        self.automations = {
+            automation["id"]: automation for automation in map(make_automation, range(count))
+        }
+
+    async def start(self) -> str:
+        """Start serving and return the base URL."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Close all sockets and stop serving."""
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def drop_connections(self) -> None:
+        """Close every open WebSocket to simulate a Home Assistant restart."""
+        for ws in list(self._sockets):
+            await ws.close()
+        self._subscriptions.clear()
+
+    def subscribed(self, event_type: str) -> int:
+        """Return the number of live subscriptions to ``event_type``."""
+        return sum(
+            1 for ws, _, sub_type in self._subscriptions if sub_type == event_type and not ws.closed
+        )
+
+    async def push_event(self, event_type: str, data: dict[str, Any]) -> None:
+        """Send an event to every client subscribed to ``event_type``."""
+        for ws, subscription_id, sub_type in list(self._subscriptions):
+            if sub_type == event_type and not ws.closed:
+                await ws.send_json(
+                    {
+                        "id": subscription_id,
+                        "type": "event",
+                        "event": {"event_type": event_type, "data": data},
+                    }
+                )
+
+    @web.middleware
+    async def _rest_middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        if request.path == "/api/websocket":
+            return await handler(request)
+        self.rest_requests.append((request.method, request.path))
+        if request.headers.get("Authorization") != f"Bearer {self.token}":
+            return web.json_response({"message": "Unauthorized"}, status=401)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+        return await handler(request)
+
+    async def _list_automations(self, request: web.Request) -> web.Response:
+        return web.json_response(list(self.automations.values()))
+
+    async def _get_automation(self, request: web.Request) -> web.Response:
+        automation = self.automations.get(request.match_info["automation_id"])
+        if automation is None:
+            return web.json_response({"message": "Resource not found"}, status=404)
+        return web.json_response(automation)
+
+    async def _create_automation(self, request: web.Request) -> web.Response:
+        automation = await request.json()
+        automation.setdefault("id", f"automation_{len(self.automations):05d}")
+        self.automations[str(automation["id"])] = automation
+        return web.json_response({"result": "ok", "id": automation["id"]})
+
+    async def _update_automation(self, request: web.Request) -> web.Response:
+        automation_id = request.match_info["automation_id"]
+        self.automations[automation_id] = {**await request.json(), "id": automation_id}
+        return web.json_response({"result": "ok"})
+
+    async def _delete_automation(self, request: web.Request) -> web.Response:
+        if self.automations.pop(request.match_info["automation_id"], None) is None:
+            return web.json_response({"message": "Resource not found"}, status=404)
+        return web.json_response({"result": "ok"})
+
+    async def _trigger_automation(self, request: web.Request) -> web.Response:
+        if request.match_info["automation_id"] not in self.automations:
+            return web.json_response({"message": "Resource not found"}, status=404)
+        return web.json_response({"result": "ok"})
+
+    def automation_states(self) -> dict[str, dict[str, Any]]:
+        """Return an ``automation.*`` entity per stored automation, as Home Assistant has."""
+        return {
+            f"automation.{automation_id}": {
+                "entity_id": f"automation.{automation_id}",
+                "state": "on" if automation.get("enabled", True) else "off",
+                "attributes": {"id": automation_id, "friendly_name": automation.get("alias")},
+            }
+            for automation_id, automation in self.automations.items()
+        }
+
+    async def _list_states(self, request: web.Request) -> web.Response:
+        return web.json_response(list({**self.automation_states(), **self.states}.values()))
+
+    async def _call_service(self, request: web.Request) -> web.Response:
+        service = f"{request.match_info['domain']}.{request.match_info['service']}"
+        data = await request.json() if request.can_read_body else {}
+        self.service_calls.append((service, data))
+        return web.json_response([])
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        try:
+            await ws.send_json({"type": "auth_required", "ha_version": "2024.6.0"})
+            auth = await ws.receive_json()
+            if auth.get("access_token") != self.token:
+                await ws.send_json({"type": "auth_invalid", "message": "Invalid access token"})
+                await ws.close()
+                return ws
+            await ws.send_json({"type": "auth_ok", "ha_version": "2024.6.0"})
+            self.connections += 1
+
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                message = json.loads(msg.data)
+                self.received.append(message)
+                asyncio.create_task(self._handle_command(ws, message))
+        finally:
+            self._sockets.discard(ws)
+        return ws
+
+    async def _handle_command(self, ws: web.WebSocketResponse, message: dict[str, Any]) -> None:
+        message_id = message["id"]
+        if message["type"] == "subscribe_events":
+            self._subscriptions.append((ws, message_id, message["event_type"]))
+            await ws.send_json(
+                {"id": message_id, "type": "result", "success": True, "result": None}
+            )
+            return
+
+        handler = self.command_handlers.get(message["type"])
+        try:
+            result = await handler(message) if handler is not None else None
+        except Exception as e:
+            await ws.send_json(
+                {
+                    "id": message_id,
+                    "type": "result",
+                    "success": False,
+                    "error": {"code": type(e).__name__, "message": str(e)},
+                }
+            )
+            return
+        await ws.send_json({"id": message_id, "type": "result", "success": True, "result": result})
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Tests for routing REST requests onto WebSocket API commands."""
+
+from mcp_ha_extended.backend import websocket_route
+
+ENTITIES = {"kitchen": "automation.kitchen_lights"}
+
+
+def route(method, endpoint, data=None):
+    """Route a request, resolving automation entities from ``ENTITIES``."""
+    return websocket_route(method, endpoint, data, ENTITIES.get)
+
+
+class TestWebSocketRoute:
+    """Test websocket_route."""
+
+    def test_states(self):
+        """Test that the state listing maps to get_states."""
+        states = route("GET", "/states")
+
+        assert states.message == {"type": "get_states"}
+        assert states.adapt([{"entity_id": "light.a"}]) == [{"entity_id": "light.a"}]
+
+    def test_service_call(self):
+        """Test that service calls keep their data and shape the response like REST."""
+        plain = route("POST", "/services/light/turn_on", {"entity_id": ["light.a"]})
+        with_response = route("POST", "/services/weather/get_forecasts?return_response", {})
+
+        assert plain.message == {
+            "type": "call_service",
+            "domain": "light",
+            "service": "turn_on",
+            "service_data": {"entity_id": ["light.a"]},
+        }
+        assert plain.adapt({"context": {}}) == []
+        assert with_response.message["return_response"] is True
+        assert with_response.adapt({"context": {}, "response": {"x": 1}}) == {
+            "changed_states": [],
+            "service_response": {"x": 1},
+        }
+
+    def test_automation_by_entity(self):
+        """Test that reading and triggering an automation address it by entity ID."""
+        config = route("GET", "/automation/kitchen")
+        trigger = route("POST", "/automation/kitchen/trigger")
+
+        assert config.message == {"type": "automation/config", "entity_id": ENTITIES["kitchen"]}
+        assert config.adapt({"config": {"id": "kitchen"}}) == {"id": "kitchen"}
+        assert trigger.message["target"] == {"entity_id": ENTITIES["kitchen"]}
+        assert trigger.adapt({"context": {}}) == {"status": "success"}
+
+    def test_requests_without_a_command_stay_on_rest(self):
+        """Test that requests with no WebSocket equivalent have no route."""
+        assert route("GET", "/automation") is None
+        assert route("GET", "/automation/unknown_id") is None
+        assert route("PUT", "/automation/kitchen", {"alias": "x"}) is None
+        assert route("DELETE", "/automation/kitchen") is None
+        assert route("GET", "/history/period/2024-01-01T00:00:00?filter_entity_id=a.b") is None
+        assert route("POST", "/services/light/turn_on?other") is None
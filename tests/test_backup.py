@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Tests for automation backup files."""
+
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from mcp_ha_extended.backup import (
+    BackupWriter,
+    default_backup_name,
+    make_record,
+    read_backup,
+    resolve_backup_path,
+)
+from mcp_ha_extended.parsing import canonical_hash
+
+CONFIGS = [
+    {"id": str(i), "alias": f"Automation {i}", "trigger": [], "action": []} for i in range(5)
+]
+
+
+class TestResolveBackupPath:
+    """Test backup file name resolution."""
+
+    def test_appends_suffix(self, tmp_path):
+        """Test that the backup suffix is added when missing."""
+        assert resolve_backup_path(tmp_path, "nightly") == tmp_path.resolve() / "nightly.jsonl.gz"
+        assert resolve_backup_path(tmp_path, "a.jsonl.gz") == tmp_path.resolve() / "a.jsonl.gz"
+
+    def test_allows_subdirectories(self, tmp_path):
+        """Test that names may point into a subdirectory of the backup directory."""
+        path = resolve_backup_path(tmp_path, "weekly/a")
+        assert path == tmp_path.resolve() / "weekly" / "a.jsonl.gz"
+
+    @pytest.mark.parametrize("filename", ["", "../a", "x/../../a", "/etc/passwd", "a\x00b"])
+    def test_rejects_escaping_names(self, tmp_path, filename):
+        """Test that names outside the backup directory are refused."""
+        with pytest.raises(ValueError):
+            resolve_backup_path(tmp_path, filename)
+
+    def test_rejects_symlink_escape(self, tmp_path):
+        """Test that a symlink pointing outside the backup directory is refused."""
+        backups = tmp_path / "backups"
+        backups.mkdir()
+        (backups / "out").symlink_to(tmp_path)
+
+        with pytest.raises(ValueError):
+            resolve_backup_path(backups, "out/a")
+
+    def test_default_name(self):
+        """Test that default names are timestamped."""
+        now = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+        assert default_backup_name(now) == "automations-20240506-070809.jsonl.gz"
+
+
+class TestBackupFiles:
+    """Test writing and reading backup files."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that written configs are read back unchanged with their hashes."""
+        path = tmp_path / "a.jsonl.gz"
+        with BackupWriter(path) as writer:
+            for config in CONFIGS:
+                writer.write(config)
+
+        records = list(read_backup(path))
+
+        assert writer.count == 5
+        assert [record["config"] for record in records] == CONFIGS
+        assert [record["id"] for record in records] == ["0", "1", "2", "3", "4"]
+        assert records[0]["hash"] == canonical_hash(CONFIGS[0])
+
+    def test_failed_write_keeps_previous_file(self, tmp_path):
+        """Test that an interrupted export leaves the previous backup and no temp file."""
+        path = tmp_path / "a.jsonl.gz"
+        with BackupWriter(path) as writer:
+            writer.write(CONFIGS[0])
+
+        with pytest.raises(RuntimeError):
+            with BackupWriter(path) as writer:
+                writer.write(CONFIGS[1])
+                raise RuntimeError("interrupted")
+
+        assert [record["config"] for record in read_backup(path)] == [CONFIGS[0]]
+        assert list(tmp_path.iterdir()) == [path]
+
+    def test_detects_corrupt_record(self, tmp_path):
+        """Test that a config edited after export fails its hash check."""
+        path = tmp_path / "a.jsonl.gz"
+        record = {**make_record(CONFIGS[0]), "config": {**CONFIGS[0], "alias": "Tampered"}}
+        with gzip.open(path, "wt") as file:
+            file.write(json.dumps(record) + "\n")
+
+        with pytest.raises(ValueError, match="line 1"):
+            list(read_backup(path))
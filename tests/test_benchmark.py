@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Smoke tests for the benchmark harness and the fake Home Assistant REST API."""
+
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+
+from tests.benchmark_server import compare, make_calls, run_benchmark
+from tests.fake_home_assistant import FakeHomeAssistant
+
+
+class TestFakeHomeAssistantREST:
+    """Test the REST side of the fake Home Assistant."""
+
+    @pytest.mark.asyncio
+    async def test_automation_endpoints(self):
+        """Test listing, fetching, updating and deleting automations."""
+        fake = FakeHomeAssistant("token", automations=3)
+        url = await fake.start()
+        headers = {"Authorization": "Bearer token"}
+        try:
+            async with aiohttp.ClientSession(headers=headers) as session:
+                async with session.get(f"{url}/api/automation") as response:
+                    assert len(await response.json()) == 3
+                async with session.put(
+                    f"{url}/api/automation/automation_00001", json={"alias": "Renamed"}
+                ) as response:
+                    assert response.status == 200
+                async with session.get(f"{url}/api/automation/automation_00001") as response:
+                    assert (await response.json())["alias"] == "Renamed"
+                async with session.delete(f"{url}/api/automation/automation_00001") as response:
+                    assert response.status == 200
+                async with session.get(f"{url}/api/automation/automation_00001") as response:
+                    assert response.status == 404
+        finally:
+            await fake.stop()
+
+    @pytest.mark.asyncio
+    async def test_auth_and_error_injection(self):
+        """Test that bad tokens get 401 and injected errors get 503."""
+        fake = FakeHomeAssistant("token", automations=1, error_rate=1.0)
+        url = await fake.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{url}/api/automation") as response:
+                    assert response.status == 401
+                async with session.get(
+                    f"{url}/api/automation", headers={"Authorization": "Bearer token"}
+                ) as response:
+                    assert response.status == 503
+        finally:
+            await fake.stop()
+
+
+class TestBenchmark:
+    """Smoke-test the benchmark harness on tiny runs."""
+
+    def test_calls_are_reproducible(self):
+        """Test that the same seed draws the same calls."""
+        ids = ["a", "b", "c"]
+        assert make_calls("mixed", 20, ids, seed=1) == make_calls("mixed", 20, ids, seed=1)
+
+    @pytest.mark.asyncio
+    async def test_call_tool_mode(self):
+        """Test an in-process run completes and reports latency and memory."""
+        with patch("mcp_ha_extended.server.HA_URL"), patch("mcp_ha_extended.server.HA_TOKEN"):
+            report = await run_benchmark(
+                mode="call_tool", workload="mixed", automations=20, requests=40, warmup=5
+            )
+
+        assert report["completed"] == 40
+        assert report["errors"] == 0
+        assert report["throughput_rps"] > 0
+        assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+        assert report["upstream_requests"] > 0
+        assert "tracemalloc_peak_mb" in report
+
+    @pytest.mark.asyncio
+    async def test_stdio_mode(self):
+        """Test a run through a server subprocess over stdio."""
+        report = await run_benchmark(
+            mode="stdio", automations=10, requests=20, concurrency=4, warmup=2
+        )
+
+        assert report["completed"] == 20
+        assert report["errors"] == 0
+
+    def test_compare_flags_regressions(self):
+        """Test that only regressions beyond the tolerance are reported."""
+        baseline = {"p95_ms": 10.0, "p99_ms": 20.0, "throughput_rps": 1000.0}
+
+        assert (
+            compare({"p95_ms": 11.0, "p99_ms": 20.0, "throughput_rps": 950.0}, baseline, 0.2) == []
+        )
+        regressions = compare(
+            {"p95_ms": 15.0, "p99_ms": 20.0, "throughput_rps": 700.0}, baseline, 0.2
+        )
+        assert [r.split(":")[0] for r in regressions] == ["p95_ms", "throughput_rps"]
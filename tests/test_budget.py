@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Tests for fitting tool responses into a size budget."""
+
+import pytest
+
+from mcp_ha_extended.budget import fit, json_size, resolve_path
+
+
+def automation(index: int, actions: int) -> dict:
+    """Build an automation with ``actions`` nested actions."""
+    return {
+        "id": str(index),
+        "alias": f"Automation {index}",
+        "action": [
+            {"choose": [{"sequence": [{"service": "light.turn_on", "data": {"n": n}}]}]}
+            for n in range(actions)
+        ],
+    }
+
+
+class TestFit:
+    """Test fit."""
+
+    def test_small_value_is_unchanged(self):
+        """Test that a value within budget is returned as is."""
+        data = {"automations": [automation(0, 2)]}
+
+        assert fit(data, 10_000) == (data, [])
+
+    @pytest.mark.parametrize("budget", [300, 1000, 5000])
+    def test_result_fits_budget(self, budget):
+        """Test that the cut value stays within the budget."""
+        data = {"count": 50, "automations": [automation(i, 10) for i in range(50)]}
+
+        shaped, elided = fit(data, budget)
+
+        assert json_size(shaped) <= budget
+        assert elided
+
+    def test_lists_keep_a_prefix(self):
+        """Test that lists keep their leading items and record what was shown."""
+        data = {"count": 50, "automations": [automation(i, 10) for i in range(50)]}
+
+        shaped, elided = fit(data, 3000)
+
+        shown = next(e for e in elided if e["path"] == "automations")
+        assert shown["total"] == 50
+        assert shaped["count"] == 50
+        assert shaped["automations"][0] == data["automations"][0]
+        assert len(shaped["automations"]) == shown["shown"]
+
+    def test_nested_lists_are_cut_by_path(self):
+        """Test that a partly shown item reports its own nested cuts."""
+        shaped, elided = fit(automation(0, 40), 1000)
+
+        assert elided[-1] == {"path": "action", "shown": len(shaped["action"]), "total": 40}
+        assert all(e["path"].startswith("action") for e in elided)
+
+    def test_long_strings_are_cut(self):
+        """Test that a long string keeps a prefix."""
+        shaped, elided = fit({"description": "x" * 1000}, 200)
+
+        assert shaped["description"] == "x" * len(shaped["description"])
+        assert elided == [
+            {"path": "description", "shown": len(shaped["description"]), "total": 1000}
+        ]
+
+    def test_keys_that_do_not_fit_are_omitted(self):
+        """Test that values too small to cut are left out and listed."""
+        data = {"a": "x" * 150, "b": 1, "c": 2}
+
+        shaped, elided = fit(data, 100)
+
+        assert set(shaped) == {"a"}
+        assert {"path": "", "omitted_keys": ["b", "c"]} in elided
+
+
+class TestResolvePath:
+    """Test resolve_path."""
+
+    def test_paths(self):
+        """Test key and index segments, and the empty path."""
+        data = {"automations": [automation(0, 3)]}
+
+        assert resolve_path(data, "") is data
+        assert resolve_path(data, "automations[0].action[2].choose[0].sequence") == [
+            {"service": "light.turn_on", "data": {"n": 2}}
+        ]
+
+    @pytest.mark.parametrize("path", ["automations[5]", "missing", "automations.id", "[x]"])
+    def test_bad_paths(self, path):
+        """Test that missing or malformed paths raise ValueError."""
+        with pytest.raises(ValueError):
+            resolve_path({"automations": [{"id": "1"}]}, path)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Tests for the in-process cache helpers."""
+
+from mcp_ha_extended.cache import MISSING, TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Test the TTLCache class."""
+
+    def test_get_miss_and_hit(self):
+        """Test that misses and hits are counted."""
+        cache = TTLCache(ttl=10, max_entries=4)
+
+        assert cache.get("a") is MISSING
+        cache.set("a", {"id": "a"})
+        assert cache.get("a") == {"id": "a"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    def test_entries_expire(self):
+        """Test that entries expire after the TTL."""
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, max_entries=4, clock=clock)
+        cache.set("a", 1)
+
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10.0
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted when full."""
+        cache = TTLCache(ttl=None, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_and_clear(self):
+        """Test explicit invalidation."""
+        cache = TTLCache(ttl=None, max_entries=4)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a", "missing")
+        assert "a" not in cache
+        assert "b" in cache
+
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a TTL of zero stores nothing."""
+        cache = TTLCache(ttl=0, max_entries=4)
+        cache.set("a", 1)
+
+        assert not cache.enabled
+        assert cache.get("a") is MISSING
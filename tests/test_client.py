@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Tests for the shared Home Assistant HTTP client."""
+
+from unittest.mock import patch
+
+import pytest
+
+from mcp_ha_extended import client
+
+
+class TestSharedSession:
+    """Test the pooled session lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_open_session_is_reused(self):
+        """Test that opening twice returns the same pooled session."""
+        try:
+            first = await client.open_session()
+            second = await client.open_session()
+
+            assert first is second
+            assert client.get_session() is first
+        finally:
+            await client.close_session()
+
+    @pytest.mark.asyncio
+    async def test_close_session(self):
+        """Test that closing releases the shared session."""
+        session = await client.open_session()
+        await client.close_session()
+
+        assert session.closed
+        assert client.get_session() is None
+
+    @pytest.mark.asyncio
+    async def test_get_session_without_open(self):
+        """Test that no session is returned before one is opened."""
+        assert client.get_session() is None
+
+    @pytest.mark.asyncio
+    async def test_acquire_session_opens_on_demand(self):
+        """Test that the session is only opened on first use once on-demand opening is enabled."""
+        assert await client.acquire_session() is None
+
+        client.open_session_on_demand()
+        try:
+            session = await client.acquire_session()
+
+            assert session is not None
+            assert await client.acquire_session() is session
+        finally:
+            await client.close_session()
+
+        # Closing turns on-demand opening off again
+        assert await client.acquire_session() is None
+
+    @pytest.mark.asyncio
+    async def test_connector_settings(self):
+        """Test that the connector honours the pool configuration."""
+        with (
+            patch("mcp_ha_extended.client.HA_POOL_LIMIT", 42),
+            patch("mcp_ha_extended.client.HA_POOL_LIMIT_PER_HOST", 7),
+            patch("mcp_ha_extended.client.HA_DNS_CACHE_TTL", 120),
+        ):
+            connector = client.create_connector()
+            try:
+                assert connector.limit == 42
+                assert connector.limit_per_host == 7
+                assert connector.use_dns_cache is True
+            finally:
+                await connector.close()
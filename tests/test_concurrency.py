@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""Tests for the concurrency primitives."""
+
+import asyncio
+
+import pytest
+
+from mcp_ha_extended.concurrency import (
+    ConcurrencyLimit,
+    KeyedLock,
+    RateLimiter,
+    SingleFlight,
+    ordered_map,
+)
+
+
+class TestSingleFlight:
+    """Test the SingleFlight class."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """Test that concurrent calls with one key run the function once."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": "123"}
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+        assert calls == 1
+        assert all(result == {"id": "123"} for result in results)
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_forget_starts_a_new_call(self):
+        """Test that callers after forget() do not join the call already in flight."""
+        flight = SingleFlight()
+        values = iter(["old", "new"])
+        release = asyncio.Event()
+
+        async def fetch():
+            value = next(values)
+            await release.wait()
+            return value
+
+        first = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        flight.forget("key")
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(first, second) == ["old", "new"]
+        assert flight.stats() == {"calls": 2, "coalesced": 0, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Test that different keys do not share calls."""
+        flight = SingleFlight()
+
+        async def fetch(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b"))
+        )
+
+        assert results == ["a", "b"]
+        assert flight.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_shared(self):
+        """Test that a finished call is not reused by later callers."""
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.do("key", fetch) == 1
+        assert await flight.do("key", fetch) == 2
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """Test that every waiter sees the shared call's exception."""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling the first caller leaves the shared call running."""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+
+
+class TestKeyedLock:
+    """Test the KeyedLock class."""
+
+    @pytest.mark.asyncio
+    async def test_same_key_is_serialized(self):
+        """Test that holders of one key never overlap and run in arrival order."""
+        locks = KeyedLock()
+        events = []
+
+        async def hold(i):
+            async with locks.lock("a"):
+                events.append(("start", i))
+                await asyncio.sleep(0.01)
+                events.append(("end", i))
+
+        await asyncio.gather(*(hold(i) for i in range(3)))
+
+        assert events == [
+            ("start", 0),
+            ("end", 0),
+            ("start", 1),
+            ("end", 1),
+            ("start", 2),
+            ("end", 2),
+        ]
+        assert locks.stats() == {"acquisitions": 3, "contended": 2, "active_keys": 0}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_concurrently(self):
+        """Test that different keys do not wait for each other."""
+        locks = KeyedLock()
+        inside = asyncio.Event()
+
+        async def first():
+            async with locks.lock("a"):
+                await inside.wait()
+
+        async def second():
+            async with locks.lock("b"):
+                inside.set()
+
+        await asyncio.wait_for(asyncio.gather(first(), second()), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_overlapping_key_sets_do_not_deadlock(self):
+        """Test that multi-key holders acquire in a consistent order."""
+        locks = KeyedLock()
+
+        async def hold(*keys):
+            async with locks.lock(*keys):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(asyncio.gather(hold("a", "b"), hold("b", "a"), hold("b")), timeout=1)
+        assert len(locks) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_releases_key(self):
+        """Test that a waiter cancelled before acquiring leaves no state behind."""
+        locks = KeyedLock()
+        release = asyncio.Event()
+
+        async def holder():
+            async with locks.lock("a"):
+                await release.wait()
+
+        async def waiter():
+            async with locks.lock("a"):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        release.set()
+        await holding
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert not locks.locked("a")
+        assert len(locks) == 0
+
+
+class TestConcurrencyLimit:
+    """Test the ConcurrencyLimit class."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        """Test that no more than the limit run at once."""
+        limit = ConcurrencyLimit(2)
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with limit:
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work() for _ in range(6)))
+
+        assert peak == 2
+        assert limit.stats() == {
+            "limit": 2,
+            "in_flight": 0,
+            "waiting": 0,
+            "peak_in_flight": 2,
+            "queued_total": 4,
+        }
+
+    @pytest.mark.asyncio
+    async def test_unlimited(self):
+        """Test that a limit of 0 never queues."""
+        limit = ConcurrencyLimit(0)
+
+        async def work():
+            async with limit:
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work() for _ in range(20)))
+
+        assert limit.peak == 20
+        assert limit.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Test that cancelling a queued caller keeps the slot count right."""
+        limit = ConcurrencyLimit(1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with limit:
+                await release.wait()
+
+        async def waiter():
+            async with limit:
+                pass
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert limit.waiting == 1
+        queued.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await holding
+
+        assert limit.in_flight == 0
+        assert limit.waiting == 0
+        async with limit:
+            assert limit.in_flight == 1
+
+
+class TestRateLimiter:
+    """Test the RateLimiter class."""
+
+    async def admission_order(self, limiter, requests):
+        """Queue ``(client, lane, name)`` requests on an empty bucket; return admission order."""
+        await limiter.acquire()
+        order = []
+
+        async def request(client, lane, name):
+            await limiter.acquire(client, lane)
+            order.append(name)
+
+        tasks = []
+        for client, lane, name in requests:
+            tasks.append(asyncio.create_task(request(client, lane, name)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    @pytest.mark.asyncio
+    async def test_burst_then_rate(self):
+        """Test that a burst is admitted at once and later requests wait for the rate."""
+        limiter = RateLimiter(rate=50, burst=3)
+        loop = asyncio.get_running_loop()
+
+        started = loop.time()
+        for _ in range(3):
+            await limiter.acquire()
+        burst_time = loop.time() - started
+        for _ in range(2):
+            await limiter.acquire()
+        total_time = loop.time() - started
+
+        assert burst_time < 0.01
+        assert 0.03 <= total_time < 0.2
+        assert limiter.stats()["lanes"]["read"]["admitted"] == 5
+        assert limiter.stats()["lanes"]["read"]["queued_total"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reads_before_writes(self):
+        """Test that a waiting read is admitted before writes queued earlier."""
+        limiter = RateLimiter(rate=200, burst=1)
+
+        order = await self.admission_order(
+            limiter, [("a", "write", "w1"), ("a", "write", "w2"), ("b", "read", "r1")]
+        )
+
+        assert order == ["r1", "w1", "w2"]
+
+    @pytest.mark.asyncio
+    async def test_continuous_reads_let_writes_through(self):
+        """Test that writes get their share of tokens while reads keep queueing."""
+        limiter = RateLimiter(rate=500, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def reader(name):
+            while True:
+                await limiter.acquire(name, "read")
+                order.append("r")
+
+        async def write():
+            await limiter.acquire("w", "write")
+            order.append("w")
+
+        readers = [asyncio.create_task(reader(f"r{n}")) for n in range(3)]
+        await asyncio.sleep(0)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(write() for _ in range(3))), 1)
+        finally:
+            for task in readers:
+                task.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
+
+        last_write = max(i for i, name in enumerate(order) if name == "w")
+        assert order.count("w") == 3
+        assert order[: last_write + 1].count("r") <= 3 * limiter.LANE_WEIGHTS["read"]
+
+    @pytest.mark.asyncio
+    async def test_clients_take_turns(self):
+        """Test that a client with many queued requests cannot starve another client."""
+        limiter = RateLimiter(rate=200, burst=1)
+        requests = [("a", "write", f"a{n}") for n in range(4)] + [("b", "write", "b0")]
+
+        order = await self.admission_order(limiter, requests)
+
+        assert order == ["a0", "b0", "a1", "a2", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled waiter is removed and its place goes to the next caller."""
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire("a", "write"))
+        await asyncio.sleep(0)
+        assert limiter.depth("write") == 1
+
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        await limiter.acquire("b", "read")
+
+        stats = limiter.stats()["lanes"]
+        assert stats["write"]["waiting"] == 0
+        assert stats["write"]["admitted"] == 0
+        assert stats["read"]["max_wait_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test that a rate of 0 never waits."""
+        limiter = RateLimiter(rate=0, burst=1)
+
+        await asyncio.wait_for(asyncio.gather(*(limiter.acquire() for _ in range(100))), 0.1)
+
+        assert limiter.stats()["lanes"]["read"]["queued_total"] == 0
+
+
+class TestOrderedMap:
+    """Test the ordered_map helper."""
+
+    @pytest.mark.asyncio
+    async def test_yields_in_input_order_within_limit(self):
+        """Test that results keep input order while at most ``limit`` calls run."""
+        running = 0
+        peak = 0
+
+        async def work(i):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001 * (5 - i % 5))
+            running -= 1
+            return i * 2
+
+        results = [result async for result in ordered_map(work, range(12), 3)]
+
+        assert results == [i * 2 for i in range(12)]
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_consumes_items_lazily(self):
+        """Test that items are pulled from the iterable only as slots free up."""
+        pulled = []
+
+        def items():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+
+        async def work(i):
+            return i
+
+        stream = ordered_map(work, items(), 2)
+        assert await anext(stream) == 0
+        assert len(pulled) == 2
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_error_cancels_pending_calls(self):
+        """Test that a failure propagates and cancels the calls still in flight."""
+        cancelled = []
+
+        async def work(i):
+            if i == 0:
+                raise RuntimeError("boom")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+
+        with pytest.raises(RuntimeError, match="boom"):
+            async for _ in ordered_map(work, range(4), 4):
+                pass
+
+        assert sorted(cancelled) == [1, 2, 3]
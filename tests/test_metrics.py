@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Tests for the metrics registry."""
+
+import aiohttp
+import pytest
+
+from mcp_ha_extended.metrics import (
+    MetricsRegistry,
+    OperationStats,
+    endpoint_label,
+    percentile,
+    start_metrics_server,
+)
+
+
+class TestEndpointLabel:
+    """Test the endpoint_label helper."""
+
+    def test_collapses_ids(self):
+        """Test that IDs are replaced by placeholders."""
+        assert endpoint_label("GET", "/automation/123") == "GET /automation/{id}"
+        assert endpoint_label("GET", "/states/light.kitchen") == "GET /states/{entity_id}"
+        assert (
+            endpoint_label("GET", "/history/period/2024-01-01T00:00:00?filter_entity_id=a")
+            == "GET /history/period/{start}"
+        )
+
+    def test_keeps_static_endpoints(self):
+        """Test that endpoints without IDs are unchanged."""
+        assert endpoint_label("POST", "/services/automation/trigger") == (
+            "POST /services/automation/trigger"
+        )
+
+
+class TestOperationStats:
+    """Test the per-operation statistics."""
+
+    def test_percentiles(self):
+        """Test nearest-rank percentiles over recorded samples."""
+        stats = OperationStats()
+        for ms in range(1, 101):
+            stats.observe(ms / 1000, False)
+
+        snapshot = stats.snapshot()
+
+        assert snapshot["calls"] == 100
+        assert snapshot["p50_ms"] == 50.0
+        assert snapshot["p95_ms"] == 95.0
+        assert snapshot["p99_ms"] == 99.0
+        assert snapshot["max_ms"] == 100.0
+
+    def test_window_limits_samples(self):
+        """Test that percentiles only consider the most recent samples."""
+        stats = OperationStats(window=10)
+        for _ in range(100):
+            stats.observe(1.0, False)
+        for _ in range(10):
+            stats.observe(0.001, False)
+
+        assert stats.snapshot()["p99_ms"] == 1.0
+        assert stats.calls == 110
+
+    def test_empty(self):
+        """Test the snapshot of an operation with no calls."""
+        assert OperationStats().snapshot()["p50_ms"] == 0.0
+        assert percentile([], 0.5) == 0.0
+
+
+class TestMetricsRegistry:
+    """Test the metrics registry."""
+
+    def test_track_counts_calls_and_errors(self):
+        """Test that tracked blocks are counted, with exceptions as errors."""
+        registry = MetricsRegistry()
+        with registry.track("tool", "a"):
+            pass
+        with pytest.raises(ValueError):
+            with registry.track("tool", "a"):
+                raise ValueError("boom")
+        with registry.track("tool", "a") as span:
+            span.error = True
+
+        stats = registry.stats("tool", "a")
+        assert stats.calls == 3
+        assert stats.errors == 2
+        assert stats.in_flight == 0
+
+    def test_in_flight(self):
+        """Test that a running block is reported as in flight."""
+        registry = MetricsRegistry()
+        with registry.track("ha_request", "GET /config"):
+            assert registry.stats("ha_request", "GET /config").in_flight == 1
+
+    def test_snapshot_and_reset(self):
+        """Test the snapshot layout and that reset drops metrics."""
+        registry = MetricsRegistry()
+        with registry.track("tool", "a"):
+            pass
+
+        assert registry.snapshot()["tool"]["a"]["calls"] == 1
+
+        registry.reset()
+        assert "tool" not in registry.snapshot()
+
+    def test_render_prometheus(self):
+        """Test the Prometheus text exposition."""
+        registry = MetricsRegistry()
+        with registry.track("ha_request", 'GET "x"'):
+            pass
+
+        text = registry.render_prometheus({"cache_entries": 3})
+
+        assert "# TYPE mcp_ha_ha_request_duration_seconds histogram" in text
+        assert 'mcp_ha_ha_request_calls_total{endpoint="GET \\"x\\""} 1' in text
+        assert 'le="+Inf"} 1' in text
+        assert "mcp_ha_cache_entries 3" in text
+
+
+class TestMetricsServer:
+    """Test the Prometheus HTTP endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_serves_metrics(self, unused_tcp_port):
+        """Test that /metrics returns the rendered text."""
+        runner = await start_metrics_server(lambda: "mcp_ha_up 1\n", "127.0.0.1", unused_tcp_port)
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{unused_tcp_port}/metrics") as response:
+                    assert response.status == 200
+                    assert await response.text() == "mcp_ha_up 1\n"
+        finally:
+            await runner.cleanup()
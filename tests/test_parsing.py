@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Tests for automation config parsing."""
+
+import json
+
+import yaml
+
+from mcp_ha_extended.cache import MISSING
+from mcp_ha_extended.parsing import (
+    ParseCache,
+    canonical_hash,
+    content_hash,
+    detect_format,
+    dump_yaml,
+    libyaml_available,
+    load_yaml,
+    parse_config,
+    yaml_classes,
+)
+
+AUTOMATION_YAML = """
+alias: Kitchen lights
+trigger:
+  - platform: state
+    entity_id: binary_sensor.kitchen_motion
+    to: "on"
+action:
+  - service: light.turn_on
+    target:
+      entity_id: light.kitchen
+"""
+
+
+class TestLoaders:
+    """Test the YAML loader selection and helpers."""
+
+    def test_uses_libyaml_when_available(self):
+        """Test that the C loader is picked when PyYAML was built with libyaml."""
+        assert libyaml_available() == yaml.__with_libyaml__
+        if yaml.__with_libyaml__:
+            assert yaml_classes() == (yaml.CSafeLoader, yaml.CSafeDumper)
+
+    def test_load_matches_safe_load(self):
+        """Test that the fast loader gives the same result as yaml.safe_load."""
+        assert load_yaml(AUTOMATION_YAML) == yaml.safe_load(AUTOMATION_YAML)
+
+    def test_load_is_safe(self):
+        """Test that arbitrary Python objects are refused."""
+        try:
+            load_yaml("!!python/object/apply:os.system ['true']")
+        except yaml.YAMLError:
+            pass
+        else:
+            raise AssertionError("unsafe tag was accepted")
+
+    def test_dump_round_trips(self):
+        """Test that dumped YAML loads back unchanged and keeps key order."""
+        data = load_yaml(AUTOMATION_YAML)
+        text = dump_yaml(data)
+
+        assert load_yaml(text) == data
+        assert text.startswith("alias: Kitchen lights")
+
+
+class TestParseConfig:
+    """Test the JSON fast path."""
+
+    def test_detect_format(self):
+        """Test format detection on leading characters."""
+        assert detect_format('  {"alias": "x"}') == "json"
+        assert detect_format("alias: x") == "yaml"
+
+    def test_json_input(self):
+        """Test that a JSON object is parsed."""
+        assert parse_config('{"alias": "x", "enabled": true}') == {"alias": "x", "enabled": True}
+
+    def test_yaml_flow_mapping_falls_back(self):
+        """Test that YAML which only looks like JSON still parses."""
+        assert parse_config("{alias: x}") == {"alias": "x"}
+
+
+class TestParseCache:
+    """Test the parsed config cache."""
+
+    def test_hit_returns_independent_copy(self):
+        """Test that mutating a cached result does not change the cache."""
+        cache = ParseCache()
+        cache.set(AUTOMATION_YAML, load_yaml(AUTOMATION_YAML))
+
+        first = cache.get(AUTOMATION_YAML)
+        first["alias"] = "Changed"
+        first["trigger"].clear()
+
+        second = cache.get(AUTOMATION_YAML)
+        assert second["alias"] == "Kitchen lights"
+        assert len(second["trigger"]) == 1
+        assert cache.stats()["hits"] == 2
+
+    def test_miss(self):
+        """Test that unknown text is a miss."""
+        cache = ParseCache()
+
+        assert cache.get("alias: other") is MISSING
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_bound(self):
+        """Test that the cache keeps at most max_entries results."""
+        cache = ParseCache(max_entries=2)
+        for i in range(3):
+            cache.set(f"alias: {i}", {"alias": i})
+
+        assert cache.get("alias: 0") is MISSING
+        assert cache.get("alias: 2") == {"alias": 2}
+
+    def test_disabled(self):
+        """Test that a size of 0 disables caching."""
+        cache = ParseCache(max_entries=0)
+        cache.set("alias: x", {"alias": "x"})
+
+        assert cache.get("alias: x") is MISSING
+
+    def test_content_hash_is_stable(self):
+        """Test that the same text always hashes the same."""
+        assert content_hash(AUTOMATION_YAML) == content_hash(AUTOMATION_YAML)
+        assert content_hash("a: 1") != content_hash("a: 2")
+
+    def test_canonical_hash_ignores_key_order(self):
+        """Test that configs equal as data hash the same regardless of source formatting."""
+        from_yaml = parse_config(AUTOMATION_YAML)
+        from_json = parse_config(json.dumps(dict(reversed(list(from_yaml.items())))))
+
+        assert canonical_hash(from_yaml) == canonical_hash(from_json)
+        assert canonical_hash(from_yaml) != canonical_hash({**from_yaml, "mode": "restart"})
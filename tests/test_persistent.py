@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Tests for the on-disk automation cache."""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from mcp_ha_extended.cache import MISSING
+from mcp_ha_extended.persistent import PersistentCache
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    """Return a path for a cache database in a directory that does not exist yet."""
+    return str(tmp_path / "cache" / "automations.sqlite3")
+
+
+async def restart(cache: PersistentCache) -> PersistentCache:
+    """Close ``cache`` after its pending writes and open the same file again."""
+    await asyncio.to_thread(cache.close)
+    return PersistentCache(cache.path)
+
+
+class TestPersistentCache:
+    """Test the PersistentCache class."""
+
+    @pytest.mark.asyncio
+    async def test_entries_survive_restart(self, cache_file):
+        """Test that stored entries are loaded by a new instance."""
+        cache = PersistentCache(cache_file)
+        cache.store("/automation/1", {"id": "1", "alias": "Kitchen"})
+        cache.store("/automation", [{"id": "1"}])
+
+        cache = await restart(cache)
+
+        assert await cache.load("/automation/1") == {"id": "1", "alias": "Kitchen"}
+        assert await cache.load("/automation") == [{"id": "1"}]
+        assert await cache.load("/automation/2") is MISSING
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_each_key_is_served_once(self, cache_file):
+        """Test that a key is read from disk only on its first load."""
+        cache = PersistentCache(cache_file)
+        cache.store("/automation/1", {"id": "1"})
+        cache = await restart(cache)
+
+        assert await cache.load("/automation/1") == {"id": "1"}
+        assert await cache.load("/automation/1") is MISSING
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_delete_and_clear(self, cache_file):
+        """Test that deleted and cleared entries are not served after a restart."""
+        cache = PersistentCache(cache_file)
+        for key in ("/automation", "/automation/1", "/automation/2"):
+            cache.store(key, {"key": key})
+        cache.delete("/automation/1")
+        cache = await restart(cache)
+
+        assert await cache.load("/automation/1") is MISSING
+        assert await cache.load("/automation/2") == {"key": "/automation/2"}
+
+        cache.clear()
+        cache = await restart(cache)
+
+        assert await cache.load("/automation") is MISSING
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_unchanged_content_is_not_rewritten(self, cache_file):
+        """Test that storing equal content keeps the original row."""
+        cache = PersistentCache(cache_file)
+        cache.store("/automation/1", {"a": 1, "b": 2})
+        await asyncio.wrap_future(cache.store("/automation/1", {"b": 2, "a": 1}))
+        first = sqlite3.connect(cache_file).execute("SELECT stored_at FROM entries").fetchall()
+        await asyncio.wrap_future(cache.store("/automation/1", {"a": 1, "b": 3}))
+        second = sqlite3.connect(cache_file).execute("SELECT stored_at FROM entries").fetchall()
+
+        assert len(first) == 1
+        assert first != second
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_corrupt_entry_is_ignored(self, cache_file):
+        """Test that an entry whose content no longer matches its hash is not served."""
+        cache = PersistentCache(cache_file)
+        cache.store("/automation/1", {"id": "1"})
+        cache = await restart(cache)
+        with sqlite3.connect(cache_file) as db:
+            db.execute('UPDATE entries SET value = \'{"id": "2"}\'')
+
+        assert await cache.load("/automation/1") is MISSING
+        assert cache.stats()["errors"] == 1
+        cache.close()
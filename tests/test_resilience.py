@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Tests for the retry and circuit breaker policies."""
+
+import pytest
+
+from mcp_ha_extended.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestParseRetryAfter:
+    """Test the parse_retry_after helper."""
+
+    def test_seconds(self):
+        """Test delta-seconds values."""
+        assert parse_retry_after("120") == 120.0
+
+    def test_http_date(self):
+        """Test HTTP-date values relative to now."""
+        assert parse_retry_after("Thu, 01 Jan 1970 00:01:40 GMT", now=40) == 60.0
+
+    def test_missing_or_invalid(self):
+        """Test that absent or malformed values are ignored."""
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryPolicy:
+    """Test the RetryPolicy class."""
+
+    def test_idempotent_methods_retry_transient_failures(self):
+        """Test that GET/PUT/DELETE retry connection errors and retryable statuses."""
+        policy = RetryPolicy(retries=2)
+
+        assert policy.should_retry("GET", 0, None)
+        assert policy.should_retry("PUT", 1, 503)
+        assert not policy.should_retry("DELETE", 2, 503)
+        assert not policy.should_retry("GET", 0, 404)
+
+    def test_post_only_retries_429(self):
+        """Test that non-idempotent requests are only retried when refused."""
+        policy = RetryPolicy(retries=2)
+
+        assert policy.should_retry("POST", 0, 429)
+        assert not policy.should_retry("POST", 0, 503)
+        assert not policy.should_retry("POST", 0, None)
+
+    def test_delay_is_jittered_and_capped(self):
+        """Test full-jitter exponential backoff bounds."""
+        bounds = []
+        policy = RetryPolicy(
+            base_delay=0.5, max_delay=3.0, rng=lambda low, high: bounds.append((low, high)) or high
+        )
+
+        assert [policy.delay(attempt) for attempt in range(4)] == [0.5, 1.0, 2.0, 3.0]
+        assert all(low == 0 for low, _ in bounds)
+
+    def test_retry_after_overrides_backoff(self):
+        """Test that Retry-After is honoured up to max_delay."""
+        policy = RetryPolicy(max_delay=10.0)
+
+        assert policy.delay(0, retry_after=4.0) == 4.0
+        assert policy.delay(0, retry_after=60.0) == 10.0
+
+
+class TestCircuitBreaker:
+    """Test the CircuitBreaker class."""
+
+    def test_opens_after_threshold(self):
+        """Test that consecutive failures open the breaker."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=FakeClock())
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_failures(self):
+        """Test that a success clears the failure count."""
+        breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe(self):
+        """Test that one probe is allowed after the cool-down."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+
+        clock.now = 10
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        """Test that a failed probe re-opens the breaker for another cool-down."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now = 15
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.stats()["times_opened"] == 2
+
+    def test_lost_probe_is_replaced(self):
+        """Test that a probe that never reports back does not wedge the breaker."""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.before_call()
+
+        clock.now = 20
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
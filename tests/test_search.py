@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Tests for the automation search index."""
+
+import time
+
+from mcp_ha_extended.search import AutomationIndex, extract_terms
+
+MORNING = {
+    "id": "morning",
+    "alias": "Morning Routine",
+    "description": "Turn on kitchen lights",
+    "trigger": [{"platform": "time", "at": "07:00:00"}],
+    "condition": [{"condition": "state", "entity_id": "binary_sensor.workday", "state": "on"}],
+    "action": [
+        {"service": "light.turn_on", "target": {"entity_id": ["light.kitchen", "light.hall"]}},
+    ],
+}
+
+MOTION = {
+    "id": "motion",
+    "alias": "Hallway Motion",
+    "triggers": [{"trigger": "state", "entity_id": "binary_sensor.hall_motion", "to": "on"}],
+    "actions": [
+        {
+            "choose": [
+                {
+                    "conditions": [{"condition": "sun", "after": "sunset"}],
+                    "sequence": [{"action": "light.turn_on", "entity_id": "light.hall"}],
+                }
+            ]
+        }
+    ],
+}
+
+
+class TestExtractTerms:
+    """Test term extraction from automation configs."""
+
+    def test_classic_syntax(self):
+        """Test extraction from trigger/condition/action configs."""
+        terms = extract_terms(MORNING)
+
+        assert terms["entity"] == {"binary_sensor.workday", "light.kitchen", "light.hall"}
+        assert terms["service"] == {"light.turn_on"}
+        assert terms["trigger"] == {"time"}
+        assert terms["condition"] == {"state"}
+        assert {"morning", "routine", "kitchen"} <= terms["text"]
+
+    def test_new_syntax_and_nesting(self):
+        """Test extraction from triggers/actions configs with nested choose blocks."""
+        terms = extract_terms(MOTION)
+
+        assert terms["entity"] == {"binary_sensor.hall_motion", "light.hall"}
+        assert terms["service"] == {"light.turn_on"}
+        assert terms["trigger"] == {"state"}
+        assert terms["condition"] == {"sun"}
+
+
+class TestAutomationIndex:
+    """Test the AutomationIndex class."""
+
+    def _index(self) -> AutomationIndex:
+        index = AutomationIndex()
+        index.rebuild([MORNING, MOTION])
+        return index
+
+    def test_search_by_entity(self):
+        """Test lookups by referenced entity."""
+        index = self._index()
+
+        assert [a["id"] for a in index.search(entity_id="light.hall")] == ["morning", "motion"]
+        assert [a["id"] for a in index.search(entity_id="light.kitchen")] == ["morning"]
+        assert index.search(entity_id="light.garage") == []
+
+    def test_search_combines_criteria(self):
+        """Test that all criteria must match."""
+        index = self._index()
+
+        result = index.search(service="light.turn_on", trigger_platform="state")
+        assert [a["id"] for a in result] == ["motion"]
+        assert index.search(trigger_platform="time", condition_type="sun") == []
+
+    def test_search_text(self):
+        """Test whole-word and prefix alias matching."""
+        index = self._index()
+
+        assert [a["id"] for a in index.search(text="routine")] == ["morning"]
+        assert [a["id"] for a in index.search(text="HALL mot")] == ["motion"]
+        assert index.search(text="garage") == []
+        assert index.search(text="outine") == []
+
+    def test_search_text_does_not_depend_on_other_automations(self):
+        """Test that a token matching one alias exactly still matches longer words elsewhere."""
+        index = AutomationIndex()
+        index.rebuild(
+            [
+                {"id": "kitchen", "alias": "Kitchen lights on", "action": []},
+                {"id": "porch", "alias": "Porch light", "action": []},
+            ]
+        )
+
+        assert [a["id"] for a in index.search(text="light")] == ["kitchen", "porch"]
+        assert [a["id"] for a in index.search(text="ligh")] == ["kitchen", "porch"]
+        assert [a["id"] for a in index.search(text="lights")] == ["kitchen"]
+
+        index.remove("kitchen")
+        assert [a["id"] for a in index.search(text="lights")] == []
+        assert [a["id"] for a in index.search(text="light")] == ["porch"]
+
+    def test_summaries(self):
+        """Test that results carry summary fields."""
+        index = self._index()
+
+        assert index.search(text="morning") == [
+            {
+                "id": "morning",
+                "alias": "Morning Routine",
+                "enabled": True,
+                "description": "Turn on kitchen lights",
+            }
+        ]
+
+    def test_incremental_updates(self):
+        """Test that add replaces and remove drops postings."""
+        index = self._index()
+
+        index.add({**MORNING, "action": [{"service": "switch.turn_on", "entity_id": "switch.fan"}]})
+        assert [a["id"] for a in index.search(entity_id="light.kitchen")] == []
+        assert [a["id"] for a in index.search(service="switch.turn_on")] == ["morning"]
+
+        index.remove("motion")
+        assert index.search(entity_id="light.hall") == []
+        assert len(index) == 1
+
+        index.set_enabled("morning", False)
+        assert index.search(text="morning")[0]["enabled"] is False
+
+    def test_lookup_speed(self):
+        """Test that lookups stay sub-millisecond with thousands of automations."""
+        index = AutomationIndex()
+        index.rebuild(
+            {
+                **MORNING,
+                "id": str(i),
+                "alias": f"Automation {i}",
+                "action": [{"service": "light.turn_on", "entity_id": f"light.l{i}"}],
+            }
+            for i in range(5000)
+        )
+
+        start = time.perf_counter()
+        for i in range(100):
+            assert len(index.search(entity_id=f"light.l{i}", service="light.turn_on")) == 1
+        assert (time.perf_counter() - start) / 100 < 0.001
@@ -6,17 +6,37 @@ import json
 import os
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiohttp
 import pytest
 import yaml
 from mcp.types import TextContent
 
+from mcp_ha_extended.cache import MISSING
+from mcp_ha_extended.concurrency import ConcurrencyLimit, RateLimiter
+from mcp_ha_extended.persistent import PersistentCache
+from mcp_ha_extended.resilience import CircuitOpenError
 from mcp_ha_extended.server import (
+    _revalidations,
+    automation_cache,
+    automation_entity_ids,
+    automation_index,
+    cached_get,
     call_tool,
+    circuit_breaker,
     ha_api_call,
+    handle_automation_event,
     list_tools,
+    main,
+    metrics,
+    parse_cache,
+    put_automation,
+    render_prometheus,
     server,
 )
 
+# Smallest automation config that passes offline validation
+VALID_YAML = "alias: New\ntrigger: []\naction:\n  - service: light.turn_on\n"
+
 
 class TestHAAPICall:
     """Test the ha_api_call function."""
@@ -45,7 +65,7 @@ class TestHAAPICall:
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
             mock_session.__aexit__ = AsyncMock(return_value=None)
 
-            with patch("mcp_ha_extended.server.aiohttp.ClientSession", return_value=mock_session):
+            with patch("aiohttp.ClientSession", return_value=mock_session):
                 result = await ha_api_call("GET", "/test")
 
                 assert result == {"status": "ok"}
@@ -73,7 +93,7 @@ class TestHAAPICall:
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
             mock_session.__aexit__ = AsyncMock(return_value=None)
 
-            with patch("mcp_ha_extended.server.aiohttp.ClientSession", return_value=mock_session):
+            with patch("aiohttp.ClientSession", return_value=mock_session):
                 result = await ha_api_call("POST", "/test", {"key": "value"})
 
                 assert result == {"id": "123"}
@@ -103,12 +123,149 @@ class TestHAAPICall:
             mock_session.__aenter__ = AsyncMock(return_value=mock_session)
             mock_session.__aexit__ = AsyncMock(return_value=None)
 
-            with patch("mcp_ha_extended.server.aiohttp.ClientSession", return_value=mock_session):
+            with patch("aiohttp.ClientSession", return_value=mock_session):
                 result = await ha_api_call("DELETE", "/test")
 
                 assert result == {"status": "success", "status_code": 204}
 
 
+    @pytest.mark.asyncio
+    async def test_ha_api_call_uses_shared_session(self):
+        """Test that the shared session is reused instead of opening a new one."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            mock_response = AsyncMock()
+            mock_response.status = 200
+            mock_response.content_type = "application/json"
+            mock_response.json = AsyncMock(return_value={"status": "ok"})
+            mock_response.raise_for_status = MagicMock()
+            mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_response.__aexit__ = AsyncMock(return_value=None)
+
+            shared_session = MagicMock()
+            shared_session.request = MagicMock(return_value=mock_response)
+
+            with patch(
+                "mcp_ha_extended.server.client.get_session", return_value=shared_session
+            ), patch("aiohttp.ClientSession") as mock_client_session:
+                await ha_api_call("GET", "/test")
+                await ha_api_call("GET", "/test")
+
+                assert shared_session.request.call_count == 2
+                mock_client_session.assert_not_called()
+
+
+    @pytest.mark.asyncio
+    async def test_ha_api_call_coalesces_concurrent_gets(self):
+        """Test that identical in-flight GETs share one request while writes do not."""
+        calls = []
+
+        async def fake_send(method, endpoint, data):
+            calls.append((method, endpoint))
+            await asyncio.sleep(0.01)
+            return {"endpoint": endpoint}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server._send", side_effect=fake_send):
+                results = await asyncio.gather(
+                    ha_api_call("GET", "/automation/1"),
+                    ha_api_call("GET", "/automation/1"),
+                    ha_api_call("GET", "/automation/2"),
+                    ha_api_call("DELETE", "/automation/1"),
+                    ha_api_call("DELETE", "/automation/1"),
+                )
+
+                assert results[0] == results[1] == {"endpoint": "/automation/1"}
+                assert calls.count(("GET", "/automation/1")) == 1
+                assert calls.count(("GET", "/automation/2")) == 1
+                assert calls.count(("DELETE", "/automation/1")) == 2
+
+
+class TestResilience:
+    """Test retries, timeouts and the circuit breaker around Home Assistant requests."""
+
+    @staticmethod
+    def _status_error(status: int, retry_after: str | None = None) -> aiohttp.ClientResponseError:
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        return aiohttp.ClientResponseError(
+            MagicMock(), (), status=status, message="error", headers=headers
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_retried_after_503(self):
+        """Test that GETs are retried and Retry-After is honoured."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server._send_once",
+            side_effect=[self._status_error(503, "2"), {"id": "1"}],
+        ) as mock_send, patch("mcp_ha_extended.server.asyncio.sleep") as mock_sleep:
+            result = await ha_api_call("GET", "/automation/1")
+
+            assert result == {"id": "1"}
+            assert mock_send.call_count == 2
+            mock_sleep.assert_awaited_once_with(2.0)
+
+    @pytest.mark.asyncio
+    async def test_post_not_retried_after_timeout(self):
+        """Test that a non-idempotent request is not repeated after a timeout."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server._send_once", side_effect=asyncio.TimeoutError()
+        ) as mock_send, patch("mcp_ha_extended.server.asyncio.sleep"):
+            with pytest.raises(asyncio.TimeoutError):
+                await ha_api_call("POST", "/automation", {"alias": "Test"})
+
+            mock_send.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self):
+        """Test that 4xx responses are raised immediately and keep the breaker closed."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server._send_once", side_effect=self._status_error(404)
+        ) as mock_send:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await ha_api_call("GET", "/automation/missing")
+
+            mock_send.assert_called_once()
+            assert circuit_breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_and_fails_fast(self):
+        """Test that repeated connection failures open the breaker and stop requests."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server._send_once",
+            side_effect=aiohttp.ClientConnectionError("refused"),
+        ) as mock_send, patch("mcp_ha_extended.server.asyncio.sleep"):
+            for _ in range(2):
+                with pytest.raises((aiohttp.ClientConnectionError, CircuitOpenError)):
+                    await ha_api_call("GET", "/automation")
+            assert circuit_breaker.state == "open"
+            calls = mock_send.call_count
+
+            with pytest.raises(CircuitOpenError):
+                await ha_api_call("GET", "/automation")
+
+            assert mock_send.call_count == calls
+
+    @pytest.mark.asyncio
+    async def test_request_timeout_is_set(self):
+        """Test that every request carries a total timeout."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_REQUEST_TIMEOUT", 5
+        ):
+            mock_response = AsyncMock()
+            mock_response.status = 200
+            mock_response.content_type = "application/json"
+            mock_response.json = AsyncMock(return_value={})
+            mock_response.raise_for_status = MagicMock()
+            mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+            mock_response.__aexit__ = AsyncMock(return_value=None)
+            shared_session = MagicMock()
+            shared_session.request = MagicMock(return_value=mock_response)
+
+            with patch("mcp_ha_extended.server.client.get_session", return_value=shared_session):
+                await ha_api_call("GET", "/test")
+
+                assert shared_session.request.call_args[1]["timeout"].total == 5
+
+
 class TestListTools:
     """Test the list_tools function."""
 
@@ -117,7 +274,7 @@ class TestListTools:
         """Test that all expected tools are listed."""
         tools = await list_tools()
 
-        assert len(tools) == 8
+        assert len(tools) == 23
 
         tool_names = [tool.name for tool in tools]
         expected_tools = [
@@ -129,6 +286,21 @@ class TestListTools:
             "trigger_automation",
             "enable_automation",
             "disable_automation",
+            "batch_automations",
+            "search_automations",
+            "get_server_metrics",
+            "get_cache_stats",
+            "export_automations",
+            "import_automations",
+            "sync_automations",
+            "list_entities",
+            "get_states",
+            "search_entities",
+            "get_automation_traces",
+            "get_automation_history",
+            "validate_automation",
+            "call_services",
+            "get_continuation",
         ]
 
         for expected_tool in expected_tools:
@@ -238,6 +410,8 @@ class TestCallTool:
         trigger:
           - platform: time
             at: "13:00:00"
+        action:
+          - service: light.turn_on
         """
 
         mock_response = {"id": "123", "alias": "Updated Automation"}
@@ -276,47 +450,96 @@ class TestCallTool:
                 assert data["status"] == "triggered"
                 assert data["automation_id"] == "123"
 
+    @staticmethod
+    def states_api(calls, *automations):
+        """Fake API recording ``(method, endpoint)`` with ``(config_id, entity_id)`` entities."""
+
+        async def api(method, endpoint, data=None):
+            calls.append((method, endpoint))
+            if endpoint == "/states":
+                return [
+                    {"entity_id": entity_id, "state": "on", "attributes": {"id": config_id}}
+                    for config_id, entity_id in automations
+                ]
+            return {}
+
+        return api
+
     @pytest.mark.asyncio
     async def test_enable_automation(self):
-        """Test enabling an automation."""
-        mock_current = {"id": "123", "alias": "Test", "enabled": False}
+        """Test that enabling resolves the entity once, then takes one service call each."""
+        calls = []
+        api = self.states_api(calls, ("123", "automation.test"), ("456", "automation.other"))
 
         with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
-            with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
-                mock_call.side_effect = [mock_current, {"id": "123", "enabled": True}]
-
+            with patch("mcp_ha_extended.server.ha_api_call", new=api):
                 result = await call_tool("enable_automation", {"automation_id": "123"})
+                await call_tool("enable_automation", {"automation_id": "456"})
 
-                assert len(result) == 1
-                data = json.loads(result[0].text)
-                assert data["status"] == "enabled"
+        assert json.loads(result[0].text)["status"] == "enabled"
+        assert calls == [
+            ("GET", "/states"),
+            ("POST", "/services/automation/turn_on"),
+            ("POST", "/services/automation/turn_on"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_disable_automation(self):
+        """Test disabling an automation with a cold cache never reads or writes its config."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call",
+                side_effect=[[{"entity_id": "automation.test", "attributes": {"id": "123"}}], {}],
+            ) as mock_call:
+                result = await call_tool("disable_automation", {"automation_id": "123"})
 
-                # Verify it was called twice: GET then PUT
+                assert json.loads(result[0].text)["status"] == "disabled"
+                mock_call.assert_called_with(
+                    "POST", "/services/automation/turn_off", {"entity_id": ["automation.test"]}
+                )
                 assert mock_call.call_count == 2
-                # Check PUT call had enabled=True (third positional arg)
-                put_call = mock_call.call_args_list[1]
-                assert put_call[0][0] == "PUT"  # method
-                assert put_call[0][2]["enabled"] is True  # data dict
 
     @pytest.mark.asyncio
-    async def test_disable_automation(self):
-        """Test disabling an automation."""
-        mock_current = {"id": "123", "alias": "Test", "enabled": True}
+    async def test_enable_automation_by_entity_id(self):
+        """Test that an entity ID is toggled directly and its config's cache entry dropped."""
+        automation_cache.set("/automation/morning", {"id": "morning", "enabled": False})
+        calls = []
+        api = self.states_api(calls, ("morning", "automation.morning_routine"))
 
         with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
-            with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
-                mock_call.side_effect = [mock_current, {"id": "123", "enabled": False}]
+            with patch("mcp_ha_extended.server.ha_api_call", new=api):
+                result = await call_tool(
+                    "enable_automation", {"automation_id": "automation.morning_routine"}
+                )
 
-                result = await call_tool("disable_automation", {"automation_id": "123"})
+        assert json.loads(result[0].text)["status"] == "enabled"
+        assert calls == [("GET", "/states"), ("POST", "/services/automation/turn_on")]
+        assert "/automation/morning" not in automation_cache
 
-                assert len(result) == 1
-                data = json.loads(result[0].text)
-                assert data["status"] == "disabled"
+    @pytest.mark.asyncio
+    async def test_disable_automation_learned_entity_id(self):
+        """Test that entity IDs learned from state events are used for config IDs."""
+        automation_entity_ids["123"] = "automation.test"
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={}) as mock_call:
+                await call_tool("disable_automation", {"automation_id": "123"})
 
-                # Verify PUT call had enabled=False (third positional arg)
-                put_call = mock_call.call_args_list[1]
-                assert put_call[0][0] == "PUT"  # method
-                assert put_call[0][2]["enabled"] is False  # data dict
+                mock_call.assert_called_once_with(
+                    "POST", "/services/automation/turn_off", {"entity_id": ["automation.test"]}
+                )
+
+    @pytest.mark.asyncio
+    async def test_enable_unknown_automation(self):
+        """Test that an automation without an entity is reported instead of rewritten."""
+        calls = []
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", new=self.states_api(calls)):
+                result = await call_tool("enable_automation", {"automation_id": "123"})
+
+        assert "No automation entity found for 123" in json.loads(result[0].text)["error"]
+        assert calls == [("GET", "/states")]
 
     @pytest.mark.asyncio
     async def test_unknown_tool(self):
@@ -342,6 +565,1433 @@ class TestCallTool:
                 assert "API Error" in data["error"]
 
 
+class TestResponseEncoding:
+    """Test output format, field projection and pagination."""
+
+    MOCK_AUTOMATIONS = [
+        {"id": str(i), "alias": f"Auto {i}", "mode": "single", "trigger": []} for i in range(5)
+    ]
+
+    @pytest.mark.asyncio
+    async def test_list_automations_fields(self):
+        """Test that fields selects the returned keys."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS):
+                result = await call_tool("list_automations", {"fields": ["id", "mode"]})
+
+                data = json.loads(result[0].text)
+                assert data["automations"][0] == {"id": "0", "mode": "single"}
+
+    @pytest.mark.asyncio
+    async def test_list_automations_pagination(self):
+        """Test that limit and next_cursor page through the list."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS):
+                pages = []
+                arguments = {"limit": 2}
+                while True:
+                    result = await call_tool("list_automations", arguments)
+                    data = json.loads(result[0].text)
+                    assert data["count"] == 5
+                    pages.append([auto["id"] for auto in data["automations"]])
+                    if "next_cursor" not in data:
+                        break
+                    arguments = {"limit": 2, "cursor": data["next_cursor"]}
+
+                assert pages == [["0", "1"], ["2", "3"], ["4"]]
+
+    @pytest.mark.asyncio
+    async def test_list_automations_offset(self):
+        """Test that offset skips automations."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS):
+                result = await call_tool("list_automations", {"offset": 3})
+
+                data = json.loads(result[0].text)
+                assert [auto["id"] for auto in data["automations"]] == ["3", "4"]
+                assert "next_cursor" not in data
+
+    @pytest.mark.asyncio
+    async def test_list_automations_invalid_cursor(self):
+        """Test that a malformed cursor is reported as an error."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS):
+                result = await call_tool("list_automations", {"cursor": "not-a-cursor"})
+
+                assert "Invalid cursor" in json.loads(result[0].text)["error"]
+
+    @pytest.mark.asyncio
+    async def test_get_automation_fields(self):
+        """Test field projection on get_automation."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS[0]
+            ):
+                result = await call_tool(
+                    "get_automation", {"automation_id": "0", "fields": ["alias"]}
+                )
+
+                assert json.loads(result[0].text) == {"alias": "Auto 0"}
+
+    @pytest.mark.asyncio
+    async def test_compact_output(self):
+        """Test that the compact format has no whitespace."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_OUTPUT_FORMAT", "compact"
+        ):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.MOCK_AUTOMATIONS):
+                result = await call_tool("list_automations", {"limit": 1})
+
+                assert result[0].text == (
+                    '{"count":5,"offset":0,"automations":[{"id":"0","alias":"Auto 0",'
+                    '"enabled":true,"description":null}],"next_cursor":"'
+                    + json.loads(result[0].text)["next_cursor"]
+                    + '"}'
+                )
+
+
+class TestAutomationCache:
+    """Test the read-through automation cache in call_tool."""
+
+    @pytest.mark.asyncio
+    async def test_get_automation_is_cached(self):
+        """Test that repeated reads are served from the cache."""
+        mock_automation = {"id": "123", "alias": "Test"}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", return_value=mock_automation
+            ) as mock_call:
+                await call_tool("get_automation", {"automation_id": "123"})
+                result = await call_tool("get_automation", {"automation_id": "123"})
+
+                assert json.loads(result[0].text)["alias"] == "Test"
+                mock_call.assert_called_once_with("GET", "/automation/123")
+
+    @pytest.mark.asyncio
+    async def test_list_automations_is_cached(self):
+        """Test that the automation list is served from the cache."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=[]) as mock_call:
+                await call_tool("list_automations", {})
+                await call_tool("list_automations", {})
+
+                mock_call.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_update_invalidates_cache(self):
+        """Test that a successful update drops the cached list and entry."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
+                mock_call.side_effect = [
+                    {"id": "123", "alias": "Old"},
+                    {"id": "123"},
+                    {"id": "123", "alias": "New"},
+                ]
+
+                await call_tool("get_automation", {"automation_id": "123"})
+                await call_tool(
+                    "update_automation", {"automation_id": "123", "automation_yaml": VALID_YAML}
+                )
+                result = await call_tool("get_automation", {"automation_id": "123"})
+
+                assert json.loads(result[0].text)["alias"] == "New"
+                assert mock_call.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_read_after_write_does_not_join_older_get(self):
+        """Test that a GET made after a write never shares a GET started before it."""
+        stored = {"id": "a", "alias": "Old"}
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def fake_send(method, endpoint, data):
+            nonlocal stored
+            if method == "PUT":
+                stored = {**data, "id": "a"}
+                return {"result": "ok"}
+            snapshot = stored
+            started.set()
+            await release.wait()
+            return snapshot
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server._send", side_effect=fake_send):
+                early = asyncio.create_task(cached_get("/automation/a"))
+                await started.wait()
+                await put_automation("a", {"alias": "New"})
+                late = asyncio.create_task(cached_get("/automation/a"))
+                await asyncio.sleep(0)
+                release.set()
+
+                assert (await early)["alias"] == "Old"
+                assert (await late)["alias"] == "New"
+                assert automation_cache.peek("/automation/a")["alias"] == "New"
+
+    @pytest.mark.asyncio
+    async def test_failed_write_keeps_cache(self):
+        """Test that a failed delete does not invalidate the cache."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
+                mock_call.side_effect = [{"id": "123"}, Exception("API Error")]
+
+                await call_tool("get_automation", {"automation_id": "123"})
+                await call_tool("delete_automation", {"automation_id": "123"})
+
+                assert "/automation/123" in automation_cache
+
+    @pytest.mark.asyncio
+    async def test_get_cache_stats(self):
+        """Test that cache statistics are exposed."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "123"}):
+                await call_tool("get_automation", {"automation_id": "123"})
+                await call_tool("get_automation", {"automation_id": "123"})
+
+            result = await call_tool("get_cache_stats", {})
+            stats = json.loads(result[0].text)["automation_cache"]
+
+            assert stats["hits"] == 1
+            assert stats["misses"] == 1
+            assert stats["size"] == 1
+
+
+class TestServerMetrics:
+    """Test per-tool and per-endpoint latency metrics."""
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_are_tracked(self):
+        """Test that tool calls and errors are counted per tool."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "123"}):
+                await call_tool("get_automation", {"automation_id": "123"})
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=Exception("API Error")):
+                await call_tool("trigger_automation", {"automation_id": "123"})
+
+        assert metrics.stats("tool", "get_automation").calls == 1
+        assert metrics.stats("tool", "get_automation").errors == 0
+        assert metrics.stats("tool", "trigger_automation").errors == 1
+
+    @pytest.mark.asyncio
+    async def test_requests_are_tracked_per_endpoint(self):
+        """Test that Home Assistant requests are grouped by endpoint template."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server._send_once", new=AsyncMock(return_value={"id": "1"})
+            ):
+                await ha_api_call("GET", "/automation/1")
+                await ha_api_call("GET", "/automation/2")
+
+        assert metrics.stats("ha_request", "GET /automation/{id}").calls == 2
+
+    @pytest.mark.asyncio
+    async def test_yaml_parsing_is_tracked(self):
+        """Test that parsing automation YAML is timed."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"result": "ok"}):
+                await call_tool("create_automation", {"automation_yaml": VALID_YAML})
+
+        assert metrics.stats("parse", "yaml").calls == 1
+
+    @pytest.mark.asyncio
+    async def test_get_server_metrics(self):
+        """Test that the metrics tool reports latency, cache and breaker state."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "123"}):
+                await call_tool("get_automation", {"automation_id": "123"})
+
+            result = await call_tool("get_server_metrics", {})
+            data = json.loads(result[0].text)
+
+        assert data["tool"]["get_automation"]["calls"] == 1
+        assert "p95_ms" in data["tool"]["get_automation"]
+        assert data["automation_cache"]["misses"] == 1
+        assert data["circuit_breaker"]["state"] == "closed"
+        assert "request_coalescing" in data
+
+    def test_render_prometheus_includes_gauges(self):
+        """Test the Prometheus rendering of server gauges."""
+        text = render_prometheus()
+
+        assert "mcp_ha_cache_hits_total 0" in text
+        assert "mcp_ha_circuit_breaker_open 0" in text
+
+
+class TestConcurrentCalls:
+    """Test per-automation write ordering and the in-flight request cap."""
+
+    @staticmethod
+    def recording_api(calls, delay=0.01):
+        async def api(method, endpoint, data=None):
+            calls.append(("start", method, endpoint))
+            await asyncio.sleep(delay)
+            calls.append(("end", method, endpoint))
+            return {"id": "1", "alias": "Test"}
+
+        return api
+
+    @pytest.mark.asyncio
+    async def test_writes_to_same_automation_are_serialized(self):
+        """Test that a disable never interleaves with an update of the same ID."""
+        automation_entity_ids["1"] = "automation.one"
+        calls = []
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", new=self.recording_api(calls)):
+                update = {"automation_id": "1", "automation_yaml": VALID_YAML}
+                await asyncio.gather(
+                    call_tool("disable_automation", {"automation_id": "1"}),
+                    call_tool("update_automation", update),
+                )
+
+        # Every request finishes before the next one starts
+        assert [event for event, _, _ in calls] == ["start", "end"] * 2
+        assert [method for event, method, _ in calls if event == "start"] == ["POST", "PUT"]
+
+    @pytest.mark.asyncio
+    async def test_slow_call_does_not_block_other_automations(self):
+        """Test that a pending write on one automation does not hold up another."""
+        release = asyncio.Event()
+
+        async def api(method, endpoint, data=None):
+            if endpoint == "/automation/slow":
+                await release.wait()
+            return {}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", new=api):
+                update = {"automation_id": "slow", "automation_yaml": VALID_YAML}
+                slow = asyncio.create_task(call_tool("update_automation", update))
+                await asyncio.wait_for(
+                    call_tool("delete_automation", {"automation_id": "fast"}), timeout=1
+                )
+                assert not slow.done()
+                release.set()
+                await slow
+
+    @pytest.mark.asyncio
+    async def test_in_flight_requests_are_capped(self):
+        """Test that at most HA_MAX_INFLIGHT requests are on the wire at once."""
+        limit = ConcurrencyLimit(2)
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_request_limit", limit):
+                with patch("mcp_ha_extended.server._send_once", new=self.recording_api([])):
+                    await asyncio.gather(
+                        *(ha_api_call("POST", f"/automation/{i}/trigger") for i in range(5))
+                    )
+
+        assert limit.peak == 2
+        assert limit.queued == 3
+
+
+class TestBatchAutomations:
+    """Test the batch_automations tool."""
+
+    @pytest.mark.asyncio
+    async def test_batch_results_in_order(self):
+        """Test that every operation gets a result in input order."""
+        operations = [
+            {"action": "create", "automation_yaml": VALID_YAML},
+            {"action": "update", "automation_id": "1", "automation_yaml": VALID_YAML},
+            {"action": "delete", "automation_id": "2"},
+        ]
+
+        async def fake_call(method, endpoint, data=None):
+            return {"id": "new_1"} if method == "POST" else {}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call):
+                result = await call_tool("batch_automations", {"operations": operations})
+
+                data = json.loads(result[0].text)
+                assert data["total"] == 3
+                assert data["ok"] == 3
+                assert [item["index"] for item in data["results"]] == [0, 1, 2]
+                assert data["results"][0]["automation_id"] == "new_1"
+                assert data["results"][2]["action"] == "delete"
+
+    @pytest.mark.asyncio
+    async def test_batch_coalesces_toggles(self):
+        """Test that toggles share one service call per direction after one entity lookup."""
+        operations = [
+            {"action": "enable", "automation_id": "automation.a"},
+            {"action": "disable", "automation_id": "automation.b"},
+            {"action": "enable", "automation_id": "automation.c"},
+            {"action": "enable", "automation_id": "123"},
+        ]
+        states = [
+            {"entity_id": "automation.a", "attributes": {"id": "a"}},
+            {"entity_id": "automation.b", "attributes": {"id": "b"}},
+            # Defined in YAML without an id
+            {"entity_id": "automation.c", "attributes": {}},
+            {"entity_id": "automation.x", "attributes": {"id": "123"}},
+        ]
+
+        async def fake_call(method, endpoint, data=None):
+            return states if endpoint == "/states" else {}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call) as mock_call:
+                result = await call_tool("batch_automations", {"operations": operations})
+
+                data = json.loads(result[0].text)
+                assert data["ok"] == 4
+                assert [item["automation_id"] for item in data["results"]] == [
+                    "automation.a",
+                    "automation.b",
+                    "automation.c",
+                    "123",
+                ]
+                calls = [c.args for c in mock_call.call_args_list]
+                assert calls.count(("GET", "/states")) == 1
+                assert (
+                    "POST",
+                    "/services/automation/turn_on",
+                    {"entity_id": ["automation.a", "automation.c", "automation.x"]},
+                ) in calls
+                assert (
+                    "POST",
+                    "/services/automation/turn_off",
+                    {"entity_id": ["automation.b"]},
+                ) in calls
+                assert mock_call.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_batch_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency operations run at once."""
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(method, endpoint, data=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {}
+
+        operations = [{"action": "delete", "automation_id": str(i)} for i in range(20)]
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call):
+                result = await call_tool(
+                    "batch_automations", {"operations": operations, "max_concurrency": 3}
+                )
+
+                assert json.loads(result[0].text)["ok"] == 20
+                assert 1 < peak <= 3
+
+    @pytest.mark.asyncio
+    async def test_batch_stop_on_error(self):
+        """Test that stop_on_error skips operations not yet started."""
+
+        async def fake_call(method, endpoint, data=None):
+            if endpoint == "/automation/bad":
+                raise Exception("API Error")
+            return {}
+
+        operations = [
+            {"action": "delete", "automation_id": "bad"},
+            {"action": "delete", "automation_id": "2"},
+            {"action": "delete", "automation_id": "3"},
+        ]
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call) as mock_call:
+                result = await call_tool(
+                    "batch_automations",
+                    {"operations": operations, "max_concurrency": 1, "stop_on_error": True},
+                )
+
+                data = json.loads(result[0].text)
+                assert [item["status"] for item in data["results"]] == ["error", "skipped", "skipped"]
+                assert data["results"][0]["error"] == "API Error"
+                mock_call.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_batch_continues_after_error(self):
+        """Test that failures are reported per item without stopping the batch."""
+        operations = [
+            {"action": "rename", "automation_id": "1"},
+            {"action": "update", "automation_id": "1"},
+            {"action": "delete"},
+            {"action": "delete", "automation_id": "4"},
+        ]
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={}):
+                result = await call_tool("batch_automations", {"operations": operations})
+
+                data = json.loads(result[0].text)
+                assert [item["status"] for item in data["results"]] == [
+                    "error",
+                    "error",
+                    "error",
+                    "ok",
+                ]
+                assert "Unknown batch action" in data["results"][0]["error"]
+                assert "automation_yaml is required" in data["results"][1]["error"]
+                assert "automation_id is required" in data["results"][2]["error"]
+
+
+class TestSearchAutomations:
+    """Test the search_automations tool."""
+
+    CONFIGS = {
+        "1": {
+            "id": "1",
+            "alias": "Kitchen Lights",
+            "trigger": [{"platform": "sun", "event": "sunset"}],
+            "action": [{"service": "light.turn_on", "entity_id": "light.kitchen"}],
+        },
+        "2": {
+            "id": "2",
+            "alias": "Garage Door",
+            "trigger": [{"platform": "state", "entity_id": "cover.garage"}],
+            "action": [{"service": "notify.mobile_app"}],
+        },
+    }
+
+    async def fake_call(self, method, endpoint, data=None):
+        if method != "GET":
+            return {"id": "3"}
+        if endpoint == "/automation":
+            return [{"id": i, "alias": c["alias"]} for i, c in self.CONFIGS.items()]
+        return self.CONFIGS[endpoint.rsplit("/", 1)[1]]
+
+    @pytest.mark.asyncio
+    async def test_search_fetches_full_configs(self):
+        """Test that summaries from the list are completed with full configs."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call
+            ) as mock_call:
+                result = await call_tool("search_automations", {"entity_id": "light.kitchen"})
+
+                data = json.loads(result[0].text)
+                assert data["count"] == 1
+                assert data["automations"][0]["id"] == "1"
+                assert mock_call.call_count == 3
+
+                # The index is reused for later searches
+                await call_tool("search_automations", {"trigger_platform": "state"})
+                assert mock_call.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_search_updates_incrementally(self):
+        """Test that writes through call_tool update the index without a rebuild."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call
+            ) as mock_call:
+                await call_tool("search_automations", {})
+                await call_tool(
+                    "create_automation",
+                    {
+                        "automation_yaml": "alias: Porch\ntrigger: []\n"
+                        "action:\n  - service: light.turn_on\n    entity_id: light.porch"
+                    },
+                )
+                await call_tool("delete_automation", {"automation_id": "1"})
+                calls_before = mock_call.call_count
+
+                result = await call_tool("search_automations", {"service": "light.turn_on"})
+
+                data = json.loads(result[0].text)
+                assert [auto["id"] for auto in data["automations"]] == ["3"]
+                assert mock_call.call_count == calls_before
+                assert automation_index.loaded
+
+    @pytest.mark.asyncio
+    async def test_expired_index_follows_remote_edits(self):
+        """Test that an expired index re-reads expired configs and drops removed automations."""
+        configs = {
+            "2": {
+                **self.CONFIGS["2"],
+                "trigger": [{"platform": "state", "entity_id": "cover.shed"}],
+            },
+            "4": {"id": "4", "alias": "Porch", "trigger": [], "action": []},
+        }
+
+        async def changed_call(method, endpoint, data=None):
+            if endpoint == "/automation":
+                return [{"id": i, "alias": c["alias"]} for i, c in configs.items()]
+            return configs[endpoint.rsplit("/", 1)[1]]
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call):
+                await call_tool("search_automations", {})
+
+            # Every cache entry from the first build has expired by the time the index has
+            automation_cache.clear()
+            automation_index.built_at -= automation_cache.ttl + 1
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", side_effect=changed_call
+            ) as mock_call:
+                # Automation 2 kept its list entry; only its trigger was edited
+                result = await call_tool("search_automations", {"entity_id": "cover.shed"})
+                stale = await call_tool("search_automations", {"entity_id": "cover.garage"})
+
+                fetched = [c.args[1] for c in mock_call.call_args_list]
+                assert fetched == ["/automation", "/automation/2", "/automation/4"]
+                assert [a["id"] for a in json.loads(result[0].text)["automations"]] == ["2"]
+                assert json.loads(stale[0].text)["count"] == 0
+                assert automation_index.search(text="kitchen") == []
+
+    @pytest.mark.asyncio
+    async def test_expired_index_reuses_cached_configs(self):
+        """Test that configs still in the automation cache are not fetched again."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call):
+                await call_tool("search_automations", {})
+
+            automation_cache.invalidate("/automation")
+            automation_index.built_at -= automation_cache.ttl + 1
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call
+            ) as mock_call:
+                result = await call_tool("search_automations", {"trigger_platform": "sun"})
+
+                mock_call.assert_called_once_with("GET", "/automation")
+                assert [a["id"] for a in json.loads(result[0].text)["automations"]] == ["1"]
+
+    @pytest.mark.asyncio
+    async def test_search_limit(self):
+        """Test that limit caps the returned automations but not the count."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=self.fake_call):
+                result = await call_tool("search_automations", {"limit": 1})
+
+                data = json.loads(result[0].text)
+                assert data["count"] == 2
+                assert len(data["automations"]) == 1
+
+
+class TestBackupTools:
+    """Test the export_automations and import_automations tools."""
+
+    @pytest.fixture
+    def home_assistant(self, tmp_path):
+        """Patch the API with a dict of automations and the backup dir with ``tmp_path``."""
+        automations = {
+            str(i): {"id": str(i), "alias": f"Automation {i}", "trigger": [], "action": []}
+            for i in range(3)
+        }
+        writes = []
+
+        async def fake_call(method, endpoint, data=None):
+            automation_id = endpoint.rsplit("/", 1)[1]
+            if method == "GET" and endpoint == "/automation":
+                return [{"id": i, "alias": c["alias"]} for i, c in automations.items()]
+            if method == "GET":
+                return dict(automations[automation_id])
+            writes.append(automation_id)
+            automations[automation_id] = dict(data)
+            return {"result": "ok"}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.HA_BACKUP_DIR", str(tmp_path)):
+                with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call):
+                    yield automations, writes
+
+    @pytest.mark.asyncio
+    async def test_export_writes_compressed_backup(self, home_assistant, tmp_path):
+        """Test that every automation's full config is exported in order."""
+        result = await call_tool("export_automations", {"filename": "nightly"})
+
+        data = json.loads(result[0].text)
+        assert data["file"] == "nightly.jsonl.gz"
+        assert data["count"] == 3
+        assert data["bytes"] == (tmp_path / "nightly.jsonl.gz").stat().st_size
+
+    @pytest.mark.asyncio
+    async def test_export_rejects_path_outside_backup_dir(self, home_assistant):
+        """Test that file names cannot escape the backup directory."""
+        result = await call_tool("export_automations", {"filename": "../nightly"})
+
+        assert json.loads(result[0].text)["type"] == "ValueError"
+
+    @pytest.mark.asyncio
+    async def test_import_only_writes_changes(self, home_assistant):
+        """Test that unchanged automations are skipped and changed or deleted ones restored."""
+        automations, writes = home_assistant
+        await call_tool("export_automations", {"filename": "nightly"})
+        automations["1"]["alias"] = "Renamed"
+        del automations["2"]
+
+        result = await call_tool("import_automations", {"filename": "nightly"})
+
+        data = json.loads(result[0].text)
+        assert (data["total"], data["created"], data["updated"], data["unchanged"]) == (3, 1, 1, 1)
+        assert data["failed"] == 0
+        assert sorted(writes) == ["1", "2"]
+        assert automations["1"]["alias"] == "Automation 1"
+        assert automations["2"]["alias"] == "Automation 2"
+
+    @pytest.mark.asyncio
+    async def test_import_dry_run(self, home_assistant):
+        """Test that a dry run reports changes without writing."""
+        automations, writes = home_assistant
+        await call_tool("export_automations", {"filename": "nightly"})
+        automations["0"]["alias"] = "Renamed"
+
+        result = await call_tool("import_automations", {"filename": "nightly", "dry_run": True})
+
+        data = json.loads(result[0].text)
+        assert data["updated"] == 1
+        assert data["unchanged"] == 2
+        assert writes == []
+
+    @pytest.mark.asyncio
+    async def test_import_missing_file(self, home_assistant):
+        """Test that importing a missing backup reports an error."""
+        result = await call_tool("import_automations", {"filename": "missing"})
+
+        assert json.loads(result[0].text)["type"] == "FileNotFoundError"
+
+
+class TestSyncAutomations:
+    """Test the sync_automations tool."""
+
+    @pytest.fixture
+    def home_assistant(self):
+        """Patch the API with a dict of automations, recording every write."""
+        automations = {
+            str(i): {"id": str(i), "alias": f"Automation {i}", "trigger": [], "action": []}
+            for i in range(3)
+        }
+        writes = []
+
+        async def fake_call(method, endpoint, data=None):
+            automation_id = endpoint.rsplit("/", 1)[1]
+            if method == "GET" and endpoint == "/automation":
+                return [{"id": i, "alias": c["alias"]} for i, c in automations.items()]
+            if method == "GET":
+                return dict(automations[automation_id])
+            writes.append((method, automation_id))
+            if method == "DELETE":
+                del automations[automation_id]
+            else:
+                automations[automation_id] = dict(data)
+            return {"result": "ok"}
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", side_effect=fake_call):
+                yield automations, writes
+
+    def desired(self, automations):
+        return [json.dumps(config) for config in automations.values()]
+
+    @pytest.mark.asyncio
+    async def test_only_changed_automations_are_written(self, home_assistant):
+        """Test that unchanged automations are skipped, even when given as reordered YAML."""
+        automations, writes = home_assistant
+        desired = [
+            "id: '0'\naction: []\ntrigger: []\nalias: Automation 0",
+            json.dumps({**automations["1"], "alias": "Renamed"}),
+            json.dumps({"id": "3", "alias": "New", "trigger": [], "action": []}),
+        ]
+
+        result = await call_tool("sync_automations", {"automations": desired})
+
+        data = json.loads(result[0].text)
+        assert data["created"] == ["3"]
+        assert data["updated"] == ["1"]
+        assert data["deleted"] == []
+        assert data["unchanged"] == 1
+        assert sorted(writes) == [("PUT", "1"), ("PUT", "3")]
+        assert "2" in automations
+
+    @pytest.mark.asyncio
+    async def test_delete_missing(self, home_assistant):
+        """Test that automations absent from the desired set are deleted when asked."""
+        automations, writes = home_assistant
+        desired = self.desired({"0": automations["0"]})
+
+        result = await call_tool(
+            "sync_automations", {"automations": desired, "delete_missing": True}
+        )
+
+        data = json.loads(result[0].text)
+        assert data["deleted"] == ["1", "2"]
+        assert sorted(automations) == ["0"]
+
+    @pytest.mark.asyncio
+    async def test_dry_run_writes_nothing(self, home_assistant):
+        """Test that a dry run reports the plan without writing."""
+        automations, writes = home_assistant
+        desired = [json.dumps({**automations["0"], "mode": "restart"})]
+
+        result = await call_tool(
+            "sync_automations",
+            {"automations": desired, "delete_missing": True, "dry_run": True},
+        )
+
+        data = json.loads(result[0].text)
+        assert (data["updated"], data["deleted"]) == (["0"], ["1", "2"])
+        assert writes == []
+
+    @pytest.mark.asyncio
+    async def test_second_sync_is_served_from_cache(self, home_assistant):
+        """Test that a repeated sync of an unchanged set reads state from the cache."""
+        automations, writes = home_assistant
+        desired = self.desired(automations)
+
+        await call_tool("sync_automations", {"automations": desired})
+        with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
+            result = await call_tool("sync_automations", {"automations": desired})
+
+        assert json.loads(result[0].text)["unchanged"] == 3
+        mock_call.assert_not_called()
+        assert writes == []
+
+    @pytest.mark.asyncio
+    async def test_invalid_desired_set_writes_nothing(self, home_assistant):
+        """Test that a config without an ID fails the whole sync before any write."""
+        automations, writes = home_assistant
+        desired = [
+            json.dumps({"id": "9", "alias": "Ok", "trigger": [], "action": []}),
+            "alias: No ID",
+        ]
+
+        result = await call_tool("sync_automations", {"automations": desired})
+
+        assert json.loads(result[0].text)["type"] == "ValueError"
+        assert writes == []
+
+
+class TestEntityTools:
+    """Test the list_entities, get_states and search_entities tools."""
+
+    STATES = [
+        {"entity_id": "light.kitchen", "state": "on", "attributes": {"friendly_name": "Kitchen"}},
+        {"entity_id": "light.porch", "state": "off", "attributes": {"friendly_name": "Porch"}},
+        {
+            "entity_id": "binary_sensor.hall_motion",
+            "state": "off",
+            "attributes": {"friendly_name": "Hall Motion", "device_class": "motion"},
+        },
+    ]
+
+    @pytest.mark.asyncio
+    async def test_list_entities_is_answered_from_the_mirror(self):
+        """Test that one /states load answers repeated, paginated listings."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", return_value=self.STATES
+            ) as mock_call:
+                result = await call_tool("list_entities", {"domain": "light", "limit": 1})
+                first = json.loads(result[0].text)
+                result = await call_tool("list_entities", {"cursor": first["next_cursor"]})
+                second = json.loads(result[0].text)
+
+                assert first["count"] == 2
+                assert first["entities"] == [
+                    {"entity_id": "light.kitchen", "state": "on", "name": "Kitchen"}
+                ]
+                assert second["count"] == 3
+                assert [e["entity_id"] for e in second["entities"]] == [
+                    "light.kitchen",
+                    "light.porch",
+                ]
+                mock_call.assert_called_once_with("GET", "/states")
+
+    @pytest.mark.asyncio
+    async def test_mirror_reloads_after_ttl(self):
+        """Test that without events the mirror is reloaded once it is older than the TTL."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", return_value=self.STATES
+            ) as mock_call:
+                await call_tool("list_entities", {})
+                with patch("mcp_ha_extended.server.HA_CACHE_TTL", 0):
+                    await call_tool("list_entities", {})
+
+                assert mock_call.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_states(self):
+        """Test that full state objects are returned and unknown entities reported."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.STATES):
+                result = await call_tool(
+                    "get_states", {"entity_ids": ["light.porch", "light.attic"]}
+                )
+
+                data = json.loads(result[0].text)
+                assert data["states"] == [self.STATES[1]]
+                assert data["missing"] == ["light.attic"]
+
+    @pytest.mark.asyncio
+    async def test_search_entities(self):
+        """Test that search filters combine text, state and attributes."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=self.STATES):
+                result = await call_tool(
+                    "search_entities",
+                    {"text": "motion", "state": "off", "attributes": {"device_class": "motion"}},
+                )
+
+                data = json.loads(result[0].text)
+                assert [e["entity_id"] for e in data["entities"]] == ["binary_sensor.hall_motion"]
+
+    @pytest.mark.asyncio
+    async def test_failed_load_is_retried(self):
+        """Test that a failed /states load leaves nothing behind and is retried."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call",
+                side_effect=[aiohttp.ClientError("down"), self.STATES],
+            ):
+                result = await call_tool("list_entities", {})
+                assert json.loads(result[0].text)["type"] == "ClientError"
+
+                result = await call_tool("list_entities", {})
+                assert json.loads(result[0].text)["count"] == 3
+
+
+class TestTraceTools:
+    """Test the get_automation_traces and get_automation_history tools."""
+
+    @pytest.mark.asyncio
+    async def test_traces_are_filtered_and_paginated(self):
+        """Test that runs outside the window are dropped and the rest paged newest first."""
+        runs = [
+            {"run_id": str(i), "timestamp": {"start": f"2024-05-06T0{i}:00:00+00:00"}}
+            for i in range(5)
+        ]
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.websocket_call", return_value=runs
+            ) as mock_call:
+                result = await call_tool(
+                    "get_automation_traces",
+                    {
+                        "automation_id": "abc",
+                        "start": "2024-05-06T01:00:00Z",
+                        "end": "2024-05-06T03:30:00Z",
+                        "limit": 2,
+                    },
+                )
+
+                data = json.loads(result[0].text)
+                assert data["count"] == 3
+                assert [r["run_id"] for r in data["runs"]] == ["3", "2"]
+                assert "next_cursor" in data
+                mock_call.assert_called_once_with(
+                    {"type": "trace/list", "domain": "automation", "item_id": "abc"}
+                )
+
+    @pytest.mark.asyncio
+    async def test_trace_steps(self):
+        """Test that one run is returned as a step timeline."""
+        trace = {
+            "run_id": "r1",
+            "timestamp": {"start": "2024-05-06T01:00:00+00:00"},
+            "trace": {"action/0": [{"path": "action/0", "timestamp": "2024-05-06T01:00:01"}]},
+        }
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.websocket_call", return_value=trace):
+                result = await call_tool(
+                    "get_automation_traces", {"automation_id": "abc", "run_id": "r1"}
+                )
+
+                data = json.loads(result[0].text)
+                assert data["run_id"] == "r1"
+                assert data["steps"] == [
+                    {"path": "action/0", "timestamp": "2024-05-06T01:00:01"}
+                ]
+
+    @pytest.mark.asyncio
+    async def test_history(self):
+        """Test that history is requested for the automation's entity within the window."""
+        states = [
+            {
+                "entity_id": "automation.kitchen",
+                "state": "on",
+                "attributes": {"id": "abc", "last_triggered": None},
+            }
+        ]
+        history = [
+            [
+                {"state": "on", "attributes": {"last_triggered": "2024-05-06T01:30:00+00:00"}},
+                {"state": "on", "attributes": {"last_triggered": "2024-05-06T02:30:00+00:00"}},
+            ]
+        ]
+
+        async def fake_call(method, endpoint, data=None):
+            return states if endpoint == "/states" else history
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", side_effect=fake_call
+            ) as mock_call:
+                result = await call_tool(
+                    "get_automation_history",
+                    {
+                        "automation_id": "abc",
+                        "start": "2024-05-06T00:00:00Z",
+                        "end": "2024-05-06T03:00:00Z",
+                    },
+                )
+
+                data = json.loads(result[0].text)
+                assert data["entity_id"] == "automation.kitchen"
+                assert data["runs"] == 2
+                assert [e["event"] for e in data["events"]] == ["triggered", "triggered"]
+                assert mock_call.call_args_list[-1].args[1] == (
+                    "/history/period/2024-05-06T00%3A00%3A00%2B00%3A00"
+                    "?filter_entity_id=automation.kitchen"
+                    "&end_time=2024-05-06T03%3A00%3A00%2B00%3A00"
+                )
+
+    @pytest.mark.asyncio
+    async def test_history_unknown_automation(self):
+        """Test that an automation without an entity is reported."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value=[]):
+                result = await call_tool("get_automation_history", {"automation_id": "nope"})
+
+                assert json.loads(result[0].text)["type"] == "ValueError"
+
+
+class TestValidation:
+    """Test offline validation in create/update and the validate_automation tool."""
+
+    @pytest.mark.asyncio
+    async def test_invalid_config_is_not_sent(self):
+        """Test that a config failing validation never reaches Home Assistant."""
+        automation_yaml = "alias: Broken\ntrigger:\n  - platform: state\naction: []\n"
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call") as mock_call:
+                result = await call_tool("create_automation", {"automation_yaml": automation_yaml})
+
+                data = json.loads(result[0].text)
+                assert data["type"] == "AutomationValidationError"
+                assert "trigger[0].entity_id: Required" in data["error"]
+                mock_call.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_blueprint_automation_is_sent(self):
+        """Test that a blueprint automation passes validation and reaches Home Assistant."""
+        automation_yaml = (
+            "id: '1712345678901'\nalias: Motion light\nuse_blueprint:\n"
+            "  path: homeassistant/motion_light.yaml\n  input:\n"
+            "    motion_entity: binary_sensor.hall\n"
+        )
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={}) as mock_call:
+                result = await call_tool("create_automation", {"automation_yaml": automation_yaml})
+
+                assert json.loads(result[0].text)["status"] == "created"
+                assert mock_call.call_args.args[2]["use_blueprint"]["input"] == {
+                    "motion_entity": "binary_sensor.hall"
+                }
+
+    @pytest.mark.asyncio
+    async def test_validation_can_be_disabled(self):
+        """Test that HA_VALIDATE_AUTOMATIONS=false sends configs as they are."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.HA_VALIDATE_AUTOMATIONS", False):
+                with patch("mcp_ha_extended.server.ha_api_call", return_value={}) as mock_call:
+                    await call_tool(
+                        "update_automation", {"automation_id": "1", "automation_yaml": "a: 1"}
+                    )
+
+                    mock_call.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_validate_tool_checks_entities(self):
+        """Test that the tool reports unknown entities from the state mirror as warnings."""
+        states = [{"entity_id": "light.kitchen", "state": "on", "attributes": {}}]
+        automation_yaml = """
+        trigger:
+          - platform: state
+            entity_id: binary_sensor.hall
+        action:
+          - service: light.turn_on
+            target:
+              entity_id: [light.kitchen, light.attic]
+        """
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.ha_api_call", return_value=states
+            ) as mock_call:
+                result = await call_tool(
+                    "validate_automation", {"automation_yaml": automation_yaml}
+                )
+
+                data = json.loads(result[0].text)
+                assert data["valid"] is True
+                assert data["entities_checked"] is True
+                assert [w["message"] for w in data["warnings"]] == [
+                    "Unknown entity: binary_sensor.hall",
+                    "Unknown entity: light.attic",
+                ]
+                mock_call.assert_called_once_with("GET", "/states")
+
+
+class TestCallServices:
+    """Test the call_services tool."""
+
+    @pytest.mark.asyncio
+    async def test_calls_are_sent_over_websocket(self):
+        """Test that each call becomes a call_service command with a result in input order."""
+
+        async def respond(message):
+            if message["service"] == "get_forecasts":
+                return {"context": {}, "response": {"weather.home": {"forecast": []}}}
+            raise RuntimeError("Entity not found")
+
+        calls = [
+            {
+                "service": "weather.get_forecasts",
+                "data": {"type": "daily"},
+                "return_response": True,
+            },
+            {"service": "light.turn_on", "target": {"entity_id": "light.nowhere"}},
+            {"service": "turn on the lights"},
+        ]
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.websocket_connection"):
+                with patch(
+                    "mcp_ha_extended.server.websocket_call", side_effect=respond
+                ) as mock_call:
+                    result = await call_tool("call_services", {"calls": calls})
+
+                    data = json.loads(result[0].text)
+                    assert data["transport"] == "websocket"
+                    assert (data["total"], data["ok"], data["error"]) == (3, 1, 2)
+                    assert data["results"][0] == {
+                        "index": 0,
+                        "service": "weather.get_forecasts",
+                        "status": "ok",
+                        "response": {"weather.home": {"forecast": []}},
+                    }
+                    assert data["results"][1]["error"] == "Entity not found"
+                    assert data["results"][2]["type"] == "ValueError"
+                    assert mock_call.call_args_list[1].args[0] == {
+                        "type": "call_service",
+                        "domain": "light",
+                        "service": "turn_on",
+                        "target": {"entity_id": "light.nowhere"},
+                    }
+
+    @pytest.mark.asyncio
+    async def test_rest_fallback(self):
+        """Test that calls go to /api/services when the WebSocket API is unreachable."""
+        calls = [
+            {
+                "service": "light.turn_on",
+                "target": {"entity_id": "light.kitchen"},
+                "data": {"brightness_pct": 50},
+            }
+        ]
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch(
+                "mcp_ha_extended.server.websocket_connection", side_effect=ConnectionError("down")
+            ):
+                with patch("mcp_ha_extended.server.ha_api_call", return_value=[]) as mock_call:
+                    result = await call_tool("call_services", {"calls": calls})
+
+                    data = json.loads(result[0].text)
+                    assert data["transport"] == "rest"
+                    assert data["results"] == [
+                        {"index": 0, "service": "light.turn_on", "status": "ok"}
+                    ]
+                    mock_call.assert_called_once_with(
+                        "POST",
+                        "/services/light/turn_on",
+                        {"brightness_pct": 50, "entity_id": "light.kitchen"},
+                    )
+
+    @pytest.mark.asyncio
+    async def test_reconnecting_websocket_does_not_stall(self):
+        """Test that calls use REST at once while an open WebSocket client is not connected."""
+        disconnected = MagicMock()
+        disconnected.connected = asyncio.Event()
+        calls = [{"service": "light.turn_on", "target": {"entity_id": "light.kitchen"}}]
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.websocket_client", disconnected):
+                with patch("mcp_ha_extended.server.ha_api_call", return_value=[]):
+                    result = await asyncio.wait_for(
+                        call_tool("call_services", {"calls": calls}), 0.5
+                    )
+
+        assert json.loads(result[0].text)["transport"] == "rest"
+        disconnected.call.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_automation_services_drop_cache(self):
+        """Test that automation service calls invalidate the automation cache."""
+        automation_cache.set("/automation", [{"id": "1"}])
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.websocket_connection"):
+                with patch("mcp_ha_extended.server.websocket_call", return_value={}):
+                    await call_tool("call_services", {"calls": [{"service": "automation.reload"}]})
+
+        assert automation_cache.peek("/automation") is MISSING
+
+
+class TestWebSocketBackend:
+    """Test request routing with HA_BACKEND=websocket."""
+
+    @pytest.mark.asyncio
+    async def test_reads_fall_back_to_rest(self):
+        """Test that a read interrupted by a dropped connection is repeated over REST."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_BACKEND", "websocket"
+        ), patch("mcp_ha_extended.server.websocket_available", return_value=True), patch(
+            "mcp_ha_extended.server.websocket_call", side_effect=ConnectionError("closed")
+        ), patch(
+            "mcp_ha_extended.server._send", return_value=[]
+        ) as mock_send:
+            assert await ha_api_call("GET", "/states") == []
+
+            mock_send.assert_called_once_with("GET", "/states", None)
+
+    @pytest.mark.asyncio
+    async def test_writes_are_not_repeated(self):
+        """Test that a service call whose connection dropped is not sent again over REST."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_BACKEND", "websocket"
+        ), patch("mcp_ha_extended.server.websocket_available", return_value=True), patch(
+            "mcp_ha_extended.server.websocket_call", side_effect=ConnectionError("closed")
+        ), patch(
+            "mcp_ha_extended.server._send"
+        ) as mock_send:
+            with pytest.raises(ConnectionError):
+                await ha_api_call("POST", "/services/light/turn_on", {"entity_id": "light.a"})
+
+            mock_send.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rest_while_reconnecting(self):
+        """Test that requests use REST while the WebSocket is unavailable."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_BACKEND", "websocket"
+        ), patch("mcp_ha_extended.server.websocket_available", return_value=False), patch(
+            "mcp_ha_extended.server.websocket_call"
+        ) as mock_call, patch(
+            "mcp_ha_extended.server._send", return_value=[]
+        ):
+            await ha_api_call("GET", "/states")
+
+            mock_call.assert_not_called()
+
+
+class TestPersistentCache:
+    """Test warm restarts from the on-disk automation cache."""
+
+    @pytest.mark.asyncio
+    async def test_first_read_served_from_disk_then_revalidated(self, tmp_path):
+        """Test that a restart answers from disk and refreshes the entry in the background."""
+        path = str(tmp_path / "cache.sqlite3")
+        previous = PersistentCache(path)
+        previous.store("/automation/1", {"id": "1", "alias": "Old"})
+        await asyncio.to_thread(previous.close)
+
+        disk = PersistentCache(path)
+        with patch("mcp_ha_extended.server.persistent_cache", disk), patch(
+            "mcp_ha_extended.server.HA_TOKEN", "test_token"
+        ), patch(
+            "mcp_ha_extended.server.ha_api_call", return_value={"id": "1", "alias": "New"}
+        ) as mock_call:
+            first = await call_tool("get_automation", {"automation_id": "1"})
+            await asyncio.gather(*_revalidations)
+            second = await call_tool("get_automation", {"automation_id": "1"})
+
+            assert json.loads(first[0].text)["alias"] == "Old"
+            assert json.loads(second[0].text)["alias"] == "New"
+            mock_call.assert_called_once_with("GET", "/automation/1")
+        await asyncio.to_thread(disk.close)
+
+        restarted = PersistentCache(path)
+        assert await restarted.load("/automation/1") == {"id": "1", "alias": "New"}
+        restarted.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_remove_entries_from_disk(self, tmp_path):
+        """Test that updating an automation drops its stored config."""
+        path = str(tmp_path / "cache.sqlite3")
+        disk = PersistentCache(path)
+        disk.store("/automation/1", {"id": "1"})
+        with patch("mcp_ha_extended.server.persistent_cache", disk), patch(
+            "mcp_ha_extended.server.HA_TOKEN", "test_token"
+        ), patch("mcp_ha_extended.server.ha_api_call", return_value={}):
+            await call_tool(
+                "update_automation", {"automation_id": "1", "automation_yaml": VALID_YAML}
+            )
+        await asyncio.to_thread(disk.close)
+
+        restarted = PersistentCache(path)
+        assert await restarted.load("/automation/1") is MISSING
+        restarted.close()
+
+
+class TestResponseBudget:
+    """Test cutting large responses to HA_RESPONSE_MAX_BYTES and fetching the rest."""
+
+    @pytest.mark.asyncio
+    async def test_large_response_is_cut_and_continued(self):
+        """Test that a large automation is cut and the rest is fetched by handle and path."""
+        actions = [
+            {"service": "notify.notify", "data": {"message": f"Step {n}"}} for n in range(200)
+        ]
+        config = {"id": "big", "alias": "Big", "action": actions}
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.HA_RESPONSE_MAX_BYTES", 4000
+        ), patch("mcp_ha_extended.server.ha_api_call", return_value=config):
+            result = await call_tool("get_automation", {"automation_id": "big"})
+
+            assert len(result[0].text) <= 4000
+            data = json.loads(result[0].text)
+            cut = data["continuation"]["truncated"]
+            assert data["alias"] == "Big"
+            assert cut == [{"path": "action", "shown": len(data["action"]), "total": 200}]
+
+            fetched = []
+            handle, path, offset = data["continuation"]["handle"], "action", cut[0]["shown"]
+            while True:
+                rest = json.loads(
+                    (
+                        await call_tool(
+                            "get_continuation", {"handle": handle, "path": path, "offset": offset}
+                        )
+                    )[0].text
+                )
+                fetched.extend(rest["value"])
+                if "continuation" not in rest:
+                    break
+                offset += rest["continuation"]["truncated"][0]["shown"]
+
+            assert data["action"] + fetched == actions
+
+    @pytest.mark.asyncio
+    async def test_small_response_is_untouched(self):
+        """Test that responses within the budget have no continuation."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.ha_api_call", return_value={"id": "1"}
+        ):
+            result = await call_tool("get_automation", {"automation_id": "1"})
+
+            assert json.loads(result[0].text) == {"id": "1"}
+
+    @pytest.mark.asyncio
+    async def test_unknown_handle(self):
+        """Test that an expired handle is reported."""
+        result = await call_tool("get_continuation", {"handle": "nope"})
+
+        data = json.loads(result[0].text)
+        assert data["type"] == "ValueError"
+        assert "nope" in data["error"]
+
+
+class TestRateLimit:
+    """Test rate limiting of requests to Home Assistant."""
+
+    @pytest.mark.asyncio
+    async def test_requests_use_lanes(self):
+        """Test that GETs take the read lane and other methods the write lane."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server._send_once", return_value={}
+        ):
+            await ha_api_call("GET", "/automation/1")
+            await ha_api_call("POST", "/automation/1/trigger")
+            await ha_api_call("DELETE", "/automation/1")
+
+        result = await call_tool("get_server_metrics", {})
+        lanes = json.loads(result[0].text)["rate_limit"]["lanes"]
+        assert lanes["read"]["admitted"] == 1
+        assert lanes["write"]["admitted"] == 2
+
+    @pytest.mark.asyncio
+    async def test_rate_is_enforced(self):
+        """Test that requests beyond the burst wait for tokens."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"), patch(
+            "mcp_ha_extended.server.rate_limiter", RateLimiter(rate=100, burst=2)
+        ) as limiter, patch("mcp_ha_extended.server._send_once", return_value={}):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(
+                *(ha_api_call("POST", f"/automation/{n}/trigger") for n in range(6))
+            )
+
+            assert loop.time() - started >= 0.035
+            assert limiter.stats()["lanes"]["write"]["queued_total"] == 4
+
+
+class TestAutomationEvents:
+    """Test cache updates driven by Home Assistant events."""
+
+    @staticmethod
+    def _state_changed(old: str | None, new: str | None, **attributes) -> dict:
+        def state(value):
+            if value is None:
+                return None
+            return {"state": value, "attributes": {"id": "123", **attributes}}
+
+        return {
+            "event_type": "state_changed",
+            "data": {"entity_id": "automation.test", "old_state": state(old), "new_state": state(new)},
+        }
+
+    @pytest.mark.asyncio
+    async def test_attribute_change_keeps_cache(self):
+        """Test that last_triggered updates do not invalidate the config."""
+        automation_cache.set("/automation/123", {"id": "123"})
+
+        await handle_automation_event(self._state_changed("on", "on", last_triggered="now"))
+
+        assert "/automation/123" in automation_cache
+
+    @pytest.mark.asyncio
+    async def test_toggle_updates_enabled_flag(self):
+        """Test that on/off transitions update the cached config and list."""
+        automation_cache.set("/automation/123", {"id": "123", "enabled": True})
+        automation_cache.set("/automation", [{"id": "123", "enabled": True}, {"id": "456"}])
+
+        await handle_automation_event(self._state_changed("on", "off"))
+
+        assert automation_cache.peek("/automation/123")["enabled"] is False
+        assert automation_cache.peek("/automation") == [
+            {"id": "123", "enabled": False},
+            {"id": "456"},
+        ]
+        assert automation_entity_ids["123"] == "automation.test"
+
+    @pytest.mark.asyncio
+    async def test_removal_invalidates(self):
+        """Test that a removed automation entity drops its cache entries."""
+        automation_cache.set("/automation/123", {"id": "123"})
+        automation_cache.set("/automation", [{"id": "123"}])
+
+        await handle_automation_event(self._state_changed("on", None))
+
+        assert "/automation/123" not in automation_cache
+        assert "/automation" not in automation_cache
+
+    @pytest.mark.asyncio
+    async def test_other_entities_ignored(self):
+        """Test that state changes of non-automation entities are ignored."""
+        automation_cache.set("/automation", [{"id": "123"}])
+
+        await handle_automation_event(
+            {"event_type": "state_changed", "data": {"entity_id": "light.kitchen"}}
+        )
+
+        assert "/automation" in automation_cache
+
+    @pytest.mark.asyncio
+    async def test_reload_clears_cache(self):
+        """Test that automation_reloaded drops every cached automation."""
+        automation_cache.set("/automation", [])
+        automation_cache.set("/automation/123", {"id": "123"})
+
+        await handle_automation_event({"event_type": "automation_reloaded", "data": {}})
+
+        assert len(automation_cache) == 0
+
+
 class TestServerConfiguration:
     """Test server configuration and initialization."""
 
@@ -370,6 +2020,14 @@ class TestServerConfiguration:
         assert len(parsed["trigger"]) == 1
         assert len(parsed["action"]) == 1
 
+    @pytest.mark.asyncio
+    async def test_invalid_transport(self):
+        """Test that an unknown HA_TRANSPORT is rejected before anything starts."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.HA_TRANSPORT", "carrier-pigeon"):
+                with pytest.raises(ValueError, match="HA_TRANSPORT"):
+                    await main()
+
     @pytest.mark.asyncio
     async def test_invalid_yaml(self):
         """Test handling of invalid YAML."""
@@ -385,3 +2043,33 @@ class TestServerConfiguration:
                 assert "error" in data
                 # YAML parsing error should be caught
                 mock_call.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_json_configuration(self):
+        """Test that create_automation accepts a JSON object and skips the YAML parser."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "1"}) as mock_call:
+                await call_tool(
+                    "create_automation",
+                    {"automation_yaml": '{"alias": "JSON", "trigger": [], "action": []}'},
+                )
+
+                assert mock_call.call_args[0][2] == {"alias": "JSON", "trigger": [], "action": []}
+                assert metrics.stats("parse", "json").calls == 1
+                assert metrics.stats("parse", "yaml").calls == 0
+
+    @pytest.mark.asyncio
+    async def test_repeated_yaml_is_parsed_once(self):
+        """Test that resending the same YAML reuses the parsed config without sharing it."""
+        automation_yaml = "alias: Repeat\ntrigger: []\naction:\n  - service: light.turn_on\n"
+
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "1"}) as mock_call:
+                arguments = {"automation_id": "1", "automation_yaml": automation_yaml}
+                await call_tool("update_automation", arguments)
+                mock_call.call_args[0][2]["alias"] = "Mutated"
+                await call_tool("update_automation", arguments)
+
+                assert mock_call.call_args[0][2]["alias"] == "Repeat"
+                assert metrics.stats("parse", "yaml").calls == 1
+                assert parse_cache.stats()["hits"] == 1
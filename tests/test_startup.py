@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Startup-time budget for the stdio server."""
+
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from tests.benchmark_server import SRC_DIR, run_benchmark
+
+# Seconds a fresh server may take to answer ``initialize``; override on slow machines
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+# Imported on first use rather than at startup
+DEFERRED_MODULES = ("aiohttp", "yaml", "mcp_ha_extended.websocket")
+
+
+class TestStartup:
+    """Test that the server starts quickly."""
+
+    def test_heavy_modules_are_deferred(self):
+        """Test that importing the server does not import aiohttp, PyYAML or the WebSocket client."""
+        code = (
+            "import json, sys\n"
+            "import mcp_ha_extended.server\n"
+            f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONPATH": str(SRC_DIR)},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        assert json.loads(output) == []
+
+    @pytest.mark.asyncio
+    async def test_initialize_within_budget(self):
+        """Test that a fresh server process answers initialize within the startup budget."""
+        report = await run_benchmark(mode="startup", runs=3)
+
+        assert report["initialize_p50_ms"] / 1000 < STARTUP_BUDGET, report
+
+    def test_console_entry_point_runs_main(self):
+        """Test that the console script entry point is synchronous and runs main()."""
+        from mcp_ha_extended import run
+
+        with patch("mcp_ha_extended.server.asyncio.run") as asyncio_run:
+            run()
+
+        coroutine = asyncio_run.call_args[0][0]
+        assert coroutine.cr_code.co_name == "main"
+        coroutine.close()
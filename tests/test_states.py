@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Tests for the entity state mirror."""
+
+import pytest
+
+from mcp_ha_extended.states import StateStore, domain_of
+
+
+def entity(entity_id: str, state: str = "on", **attributes) -> dict:
+    """Build an entity state object."""
+    return {"entity_id": entity_id, "state": state, "attributes": attributes}
+
+
+STATES = [
+    entity("light.kitchen", friendly_name="Kitchen Ceiling"),
+    entity("light.porch", "off", friendly_name="Porch Light"),
+    entity("binary_sensor.kitchen_motion", "off", device_class="motion"),
+    entity("sensor.outside_temperature", "12.5", unit_of_measurement="°C"),
+]
+
+
+@pytest.fixture
+def store():
+    """A store loaded with STATES and a small registry."""
+    store = StateStore()
+    store.load(STATES)
+    store.load_registry(
+        entities=[
+            {"entity_id": "light.kitchen", "area_id": None, "device_id": "dev1"},
+            {"entity_id": "binary_sensor.kitchen_motion", "area_id": "kitchen"},
+            {"entity_id": "light.porch", "area_id": "outside", "device_id": "dev1"},
+        ],
+        devices=[{"id": "dev1", "area_id": "kitchen"}],
+        areas=[{"area_id": "kitchen", "name": "Kitchen"}, {"area_id": "outside", "name": "Yard"}],
+    )
+    return store
+
+
+class TestStateStore:
+    """Test the StateStore class."""
+
+    def test_domain_of(self):
+        """Test domain extraction."""
+        assert domain_of("binary_sensor.kitchen_motion") == "binary_sensor"
+
+    def test_query_by_domain_and_state(self, store):
+        """Test domain and state filters."""
+        assert store.query(domain="light") == ["light.kitchen", "light.porch"]
+        assert store.query(domain="light", state="off") == ["light.porch"]
+        assert store.query(domain="climate") == []
+
+    def test_query_by_area(self, store):
+        """Test that areas match by ID or name and entities inherit their device's area."""
+        assert store.query(area="kitchen") == ["binary_sensor.kitchen_motion", "light.kitchen"]
+        assert store.query(area="yard") == ["light.porch"]
+        assert store.query(area="attic") == []
+
+    def test_query_by_attributes_and_text(self, store):
+        """Test attribute values, attribute presence and text tokens."""
+        assert store.query(attributes={"device_class": "motion"}) == [
+            "binary_sensor.kitchen_motion"
+        ]
+        assert store.query(attributes={"unit_of_measurement": None}) == [
+            "sensor.outside_temperature"
+        ]
+        assert store.query(text="kitchen ceil") == ["light.kitchen"]
+
+    def test_area_needs_registry(self):
+        """Test that filtering by area without the registry is refused."""
+        store = StateStore()
+        store.load(STATES)
+
+        with pytest.raises(RuntimeError):
+            store.query(area="kitchen")
+
+    def test_summary(self, store):
+        """Test the compact listing form."""
+        assert store.summary("light.kitchen") == {
+            "entity_id": "light.kitchen",
+            "state": "on",
+            "name": "Kitchen Ceiling",
+            "area": "Kitchen",
+        }
+
+    def test_events_update_and_remove(self, store):
+        """Test that state_changed events update, add and remove entities."""
+        store.apply_event({"entity_id": "light.porch", "new_state": entity("light.porch")})
+        store.apply_event({"entity_id": "light.new", "new_state": entity("light.new")})
+        store.apply_event({"entity_id": "light.kitchen", "new_state": None})
+
+        assert store.query(domain="light", state="on") == ["light.new", "light.porch"]
+        assert "light.kitchen" not in store
+        assert store.stats()["events"] == 3
+
+    def test_events_before_load_are_ignored(self):
+        """Test that events are dropped while nothing is loaded."""
+        store = StateStore()
+        store.apply_event({"entity_id": "light.a", "new_state": entity("light.a")})
+
+        assert len(store) == 0
+
+    def test_events_during_load_are_replayed(self):
+        """Test that events racing a load are applied on top of the older snapshot."""
+        store = StateStore()
+        store.begin_load()
+        store.apply_event(
+            {"entity_id": "light.kitchen", "new_state": entity("light.kitchen", "off")}
+        )
+        store.load(STATES)
+
+        assert store.get("light.kitchen")["state"] == "off"
+        assert store.stats()["loads"] == 1
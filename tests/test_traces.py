@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Tests for trace and history summaries."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from mcp_ha_extended.traces import (
+    filter_runs,
+    parse_time,
+    summarize_history,
+    summarize_step,
+    summarize_trace,
+    time_window,
+)
+
+NOW = datetime(2024, 5, 6, 12, 0, tzinfo=timezone.utc)
+
+
+def run(run_id: str, start: str, **fields) -> dict:
+    """Build a trace/list entry."""
+    return {"run_id": run_id, "timestamp": {"start": start, "finish": start}, **fields}
+
+
+class TestTimeWindow:
+    """Test timestamp parsing and window defaults."""
+
+    def test_parse_time(self):
+        """Test that Z suffixes and naive times are read as UTC."""
+        assert parse_time("2024-05-06T10:00:00Z") == datetime(2024, 5, 6, 10, tzinfo=timezone.utc)
+        assert parse_time("2024-05-06T10:00:00") == datetime(2024, 5, 6, 10, tzinfo=timezone.utc)
+        with pytest.raises(ValueError):
+            parse_time("yesterday")
+
+    def test_default_window(self):
+        """Test that the window defaults to the 24 hours before now."""
+        start, end = time_window(None, None, now=NOW)
+        assert (start, end) == (datetime(2024, 5, 5, 12, tzinfo=timezone.utc), NOW)
+
+    def test_reversed_window(self):
+        """Test that a start after the end is refused."""
+        with pytest.raises(ValueError):
+            time_window("2024-05-06T12:00:00Z", "2024-05-06T11:00:00Z")
+
+
+class TestTraceSummaries:
+    """Test trace summarization."""
+
+    def test_filter_runs(self):
+        """Test that runs outside the window are dropped and the rest sorted newest first."""
+        runs = [
+            run("a", "2024-05-06T09:00:00+00:00", state="stopped", script_execution="finished"),
+            run("b", "2024-05-04T09:00:00+00:00"),
+            run("c", "2024-05-06T11:00:00+00:00", error="boom"),
+        ]
+
+        summaries = filter_runs(runs, *time_window(None, None, now=NOW))
+
+        assert [summary["run_id"] for summary in summaries] == ["c", "a"]
+        assert summaries[1]["execution"] == "finished"
+        assert summaries[0]["error"] == "boom"
+
+    def test_summarize_step(self):
+        """Test that a service call step keeps its service and target, not its variables."""
+        step = {
+            "path": "action/0",
+            "timestamp": "2024-05-06T11:00:01+00:00",
+            "changed_variables": {"context": {"id": "x" * 1000}},
+            "result": {
+                "params": {
+                    "domain": "light",
+                    "service": "turn_on",
+                    "service_data": {},
+                    "target": {"entity_id": ["light.kitchen"]},
+                },
+                "running_script": False,
+            },
+        }
+
+        assert summarize_step(step) == {
+            "path": "action/0",
+            "timestamp": "2024-05-06T11:00:01+00:00",
+            "running_script": False,
+            "service": "light.turn_on",
+            "target": {"entity_id": ["light.kitchen"]},
+        }
+
+    def test_summarize_trace(self):
+        """Test that steps from every path form one timeline and the config is dropped."""
+        trace = {
+            **run("c", "2024-05-06T11:00:00+00:00", state="stopped"),
+            "config": {"alias": "Big config"},
+            "trace": {
+                "trigger/0": [{"path": "trigger/0", "timestamp": "2024-05-06T11:00:00+00:00"}],
+                "action/0": [{"timestamp": "2024-05-06T11:00:02+00:00", "error": "Timeout"}],
+                "condition/0": [
+                    {"timestamp": "2024-05-06T11:00:01+00:00", "result": {"result": True}}
+                ],
+            },
+        }
+
+        summary = summarize_trace(trace)
+
+        assert "config" not in summary
+        assert summary["steps"] == [
+            {"path": "trigger/0", "timestamp": "2024-05-06T11:00:00+00:00"},
+            {"path": "condition/0", "timestamp": "2024-05-06T11:00:01+00:00", "result": True},
+            {"path": "action/0", "timestamp": "2024-05-06T11:00:02+00:00", "error": "Timeout"},
+        ]
+
+
+class TestHistorySummary:
+    """Test history summarization."""
+
+    def test_runs_and_state_changes(self):
+        """Test that runs in the window and on/off flips become events."""
+        rows = [
+            {
+                "state": "on",
+                "last_changed": "2024-05-01T00:00:00+00:00",
+                "attributes": {"last_triggered": "2024-05-05T01:00:00+00:00"},
+            },
+            {
+                "state": "on",
+                "last_changed": "2024-05-01T00:00:00+00:00",
+                "attributes": {"last_triggered": "2024-05-06T08:00:00+00:00"},
+            },
+            {
+                "state": "off",
+                "last_changed": "2024-05-06T09:00:00+00:00",
+                "attributes": {"last_triggered": "2024-05-06T08:00:00+00:00"},
+            },
+        ]
+
+        summary = summarize_history(rows, *time_window(None, None, now=NOW))
+
+        assert summary == {
+            "initial_state": "on",
+            "runs": 1,
+            "events": [
+                {"time": "2024-05-06T08:00:00+00:00", "event": "triggered"},
+                {"time": "2024-05-06T09:00:00+00:00", "event": "disabled"},
+            ],
+        }
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Tests for the HTTP transports."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+import uvicorn
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from mcp_ha_extended.server import server
+from mcp_ha_extended.transport import create_http_app
+
+
+async def start_uvicorn(app, port: int) -> tuple[uvicorn.Server, asyncio.Task]:
+    """Serve an app on a local port in the background."""
+    http_server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    )
+    task = asyncio.create_task(http_server.serve())
+    while not http_server.started:
+        await asyncio.sleep(0.01)
+    return http_server, task
+
+
+@pytest.fixture
+async def base_url(unused_tcp_port):
+    """Serve the MCP server over HTTP without authentication."""
+    http_server, task = await start_uvicorn(create_http_app(server), unused_tcp_port)
+    yield f"http://127.0.0.1:{unused_tcp_port}"
+    http_server.should_exit = True
+    await task
+
+
+class TestStreamableHTTP:
+    """Test the Streamable HTTP transport."""
+
+    @pytest.mark.asyncio
+    async def test_list_and_call_tools(self, base_url):
+        """Test a full session over Streamable HTTP."""
+        async with streamablehttp_client(f"{base_url}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                tools = await session.list_tools()
+                result = await session.call_tool("get_cache_stats", {})
+
+        assert "list_automations" in [tool.name for tool in tools.tools]
+        assert "automation_cache" in json.loads(result.content[0].text)
+
+    @pytest.mark.asyncio
+    async def test_clients_share_state(self, base_url):
+        """Test that concurrent sessions are served by the same process and caches."""
+        with patch("mcp_ha_extended.server.HA_TOKEN", "test_token"):
+            with patch("mcp_ha_extended.server.ha_api_call", return_value={"id": "1"}) as mock:
+
+                async def fetch():
+                    async with streamablehttp_client(f"{base_url}/mcp") as (read, write, _):
+                        async with ClientSession(read, write) as session:
+                            await session.initialize()
+                            await session.call_tool("get_automation", {"automation_id": "1"})
+
+                await fetch()
+                await asyncio.gather(fetch(), fetch())
+
+        # The first session fetched from Home Assistant; the others hit the shared cache
+        assert mock.call_count == 1
+
+
+class TestSSE:
+    """Test the legacy HTTP+SSE transport."""
+
+    @pytest.mark.asyncio
+    async def test_list_tools(self, base_url):
+        """Test a session over the SSE endpoint."""
+        async with sse_client(f"{base_url}/sse") as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                tools = await session.list_tools()
+
+        assert "get_automation" in [tool.name for tool in tools.tools]
+
+
+class TestAuthentication:
+    """Test bearer token authentication."""
+
+    @pytest.mark.asyncio
+    async def test_requires_token(self, unused_tcp_port):
+        """Test that requests without the token are rejected but health checks are not."""
+        app = create_http_app(server, auth_token="secret")
+        http_server, task = await start_uvicorn(app, unused_tcp_port)
+        url = f"http://127.0.0.1:{unused_tcp_port}"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{url}/mcp", json={}) as response:
+                    assert response.status == 401
+                async with session.post(
+                    f"{url}/mcp", json={}, headers={"Authorization": "Bearer wrong"}
+                ) as response:
+                    assert response.status == 401
+                async with session.get(f"{url}/health") as response:
+                    assert response.status == 200
+
+            async with streamablehttp_client(
+                f"{url}/mcp", headers={"Authorization": "Bearer secret"}
+            ) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    assert (await session.list_tools()).tools
+        finally:
+            http_server.should_exit = True
+            await task
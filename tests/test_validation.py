@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Tests for offline automation validation."""
+
+import pytest
+
+from mcp_ha_extended.parsing import parse_config
+from mcp_ha_extended.validation import (
+    AutomationValidationError,
+    template_error,
+    validate_automation,
+)
+
+VALID = """
+alias: Kitchen lights
+mode: restart
+triggers:
+  - trigger: state
+    entity_id: binary_sensor.kitchen_motion
+    to: "on"
+  - platform: time_pattern
+    minutes: /5
+conditions:
+  - condition: or
+    conditions:
+      - condition: sun
+        after: sunset
+      - "{{ is_state('input_boolean.guest', 'on') }}"
+actions:
+  - action: light.turn_on
+    target:
+      entity_id: light.kitchen
+    data:
+      brightness: "{{ 50 if now().hour > 22 else 100 }}"
+  - choose:
+      - conditions:
+          - condition: state
+            entity_id: light.hall
+            state: "off"
+        sequence:
+          - delay: 10
+    default:
+      - repeat:
+          count: 2
+          sequence:
+            - service: notify.mobile_app
+              data:
+                message: Done
+  - if:
+      - condition: template
+        value_template: "{% if true %}yes{% endif %}"
+    then:
+      - stop: Finished
+"""
+
+
+# As written by the Home Assistant automation editor
+UI_DEVICE = """
+id: '1712345678901'
+alias: Hallway motion light
+description: ''
+trigger:
+  - type: motion
+    platform: device
+    device_id: 3c4d5e6f708192a3b4c5d6e7f8091a2b
+    entity_id: 5f0a3c1e2b7d4e8f9a0b1c2d3e4f5a6b
+    domain: binary_sensor
+  - platform: zone
+    entity_id: person.alex
+    zone: zone.home
+condition:
+  - condition: device
+    type: is_off
+    device_id: 0a1b2c3d4e5f60718293a4b5c6d7e8f9
+    entity_id: 9b8c7d6e5f4a3b2c1d0e9f8a7b6c5d4e
+    domain: light
+action:
+  - type: turn_on
+    device_id: 0a1b2c3d4e5f60718293a4b5c6d7e8f9
+    entity_id: 9b8c7d6e5f4a3b2c1d0e9f8a7b6c5d4e
+    domain: light
+    brightness_pct: 60
+  - service: light.turn_on
+    target:
+      entity_id:
+        - 9b8c7d6e5f4a3b2c1d0e9f8a7b6c5d4e
+        - light.porch
+mode: single
+"""
+
+UI_NEW_SYNTAX = """
+id: '1723456789012'
+alias: Calendar and geo alerts
+description: ''
+triggers:
+  - trigger: calendar
+    entity_id: calendar.work
+    offset: '-0:15:0'
+  - trigger: geo_location
+    source: nsw_rural_fire_service_feed
+    zone: zone.home
+conditions: []
+actions:
+  - action: notify.notify
+    metadata: {}
+    data:
+      message: '{{ trigger.calendar_event.summary | default("it\\"s on") }} {{ "}}" }}'
+      title: '{% raw %}{{ literal {% endraw %}'
+mode: single
+"""
+
+
+def messages(result, kind="errors"):
+    """Return ``path: message`` strings of a result."""
+    return [f"{issue['path']}: {issue['message']}" for issue in result[kind]]
+
+
+class TestValidateAutomation:
+    """Test validate_automation."""
+
+    def test_valid_config(self):
+        """Test that a config using old and new syntax together passes."""
+        result = validate_automation(parse_config(VALID))
+
+        assert result == {"valid": True, "errors": [], "warnings": [], "entities_checked": False}
+
+    @pytest.mark.parametrize("config", [UI_DEVICE, UI_NEW_SYNTAX])
+    def test_ui_generated_configs(self, config):
+        """Test that configs saved by the automation editor pass, registry IDs included."""
+        result = validate_automation(parse_config(config), entity_exists=lambda e: True)
+
+        assert messages(result) == []
+        assert messages(result, "warnings") == []
+
+    def test_blueprint_automation(self):
+        """Test that a blueprint automation needs no triggers or actions of its own."""
+        config = {
+            "id": "1712345678901",
+            "alias": "Motion light",
+            "use_blueprint": {
+                "path": "homeassistant/motion_light.yaml",
+                "input": {"motion_entity": "binary_sensor.hall", "light_target": {}},
+            },
+        }
+
+        assert validate_automation(config)["valid"] is True
+        assert messages(validate_automation({"use_blueprint": {"input": []}})) == [
+            "use_blueprint.path: Required",
+            "use_blueprint.input: Must be a mapping",
+        ]
+
+    def test_condition_shorthand(self):
+        """Test that `- or:`, `- and:` and `- not:` conditions are checked like their long form."""
+        config = {
+            "trigger": [{"platform": "sun", "event": "sunset"}],
+            "condition": [
+                {"or": [{"condition": "sun", "after": "sunset"}, "{{ is_state('a.b', 'on') }}"]},
+                {"and": [{"not": [{"condition": "state", "entity_id": "light.a"}]}]},
+            ],
+            "action": [{"if": [{"or": ["{{ true }}"]}], "then": [{"delay": 1}]}],
+        }
+
+        assert messages(validate_automation(config)) == [
+            "condition[1].and[0].not[0].state: Required",
+        ]
+
+    def test_structure_errors(self):
+        """Test that missing sections and options are reported with their paths."""
+        result = validate_automation(
+            {
+                "mode": "sometimes",
+                "trigger": [{"platform": "numeric_state", "entity_id": "sensor.t"}, "sunset"],
+                "condition": [{"condition": "state", "entity_id": "light.a"}],
+            }
+        )
+
+        assert messages(result) == [
+            "actions: Required",
+            "mode: Must be one of single, restart, queued, parallel",
+            "trigger[0]: Needs at least one of above, below",
+            "trigger[1]: Trigger must be a mapping",
+            "condition[0].state: Required",
+        ]
+        assert result["valid"] is False
+
+    def test_action_errors(self):
+        """Test nested action checks."""
+        result = validate_automation(
+            {
+                "trigger": [],
+                "action": [
+                    {"service": "turn_on_lights"},
+                    {"repeat": {"count": 1, "while": [], "sequence": [{"bogus": 1}]}},
+                    {"service": "light.turn_on", "target": {"entity_id": "Light Kitchen"}},
+                ],
+            }
+        )
+
+        assert messages(result) == [
+            "action[0].service: Must be a service such as light.turn_on",
+            "action[1].repeat: Needs exactly one of count, while, until or for_each",
+            "action[2].target.entity_id: Invalid entity ID: 'Light Kitchen'",
+        ]
+        assert messages(result, "warnings") == [
+            "action[1].repeat.sequence[0]: Unknown action; expected one of service, action, "
+            "delay, wait_template, wait_for_trigger, event",
+        ]
+
+    def test_warnings_do_not_invalidate(self):
+        """Test that unknown options, platforms and entities are only warnings."""
+        config = {
+            "colour": "blue",
+            "trigger": [{"platform": "custom_thing"}],
+            "action": [{"service": "light.turn_on", "entity_id": "light.attic"}],
+        }
+
+        result = validate_automation(config, entity_exists={"light.kitchen"}.__contains__)
+
+        assert result["valid"] is True
+        assert result["entities_checked"] is True
+        assert messages(result, "warnings") == [
+            "colour: Unknown option",
+            "trigger[0].trigger: Unknown trigger platform 'custom_thing'",
+            "action[0].entity_id: Unknown entity: light.attic",
+        ]
+
+    def test_template_errors(self):
+        """Test that malformed templates are reported where they appear."""
+        result = validate_automation(
+            {
+                "trigger": [{"platform": "template", "value_template": "{{ states('x') "}],
+                "action": [{"service": "notify.x", "data": {"message": "{{ (1 + 2 }}"}}],
+            }
+        )
+
+        assert messages(result) == [
+            "trigger[0].value_template: Invalid template: Unclosed template delimiter",
+            "action[0].data.message: Invalid template: Unclosed '('",
+        ]
+
+    def test_validation_error_message(self):
+        """Test that the exception summarizes every error."""
+        error = AutomationValidationError(validate_automation({"trigger": []}))
+
+        assert isinstance(error, ValueError)
+        assert str(error) == "Invalid automation config: actions: Required"
+
+
+class TestTemplateError:
+    """Test template_error."""
+
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "plain text",
+            "{{ states('sensor.x') | float(0) > 20 }}",
+            "{%- for s in states.light -%}{{ s.name }}{% else %}none{% endfor %}",
+            "{% set x = 1 %}{% if x %}a{% elif y %}b{% else %}c{% endif %}{# note #}",
+            "{{ {'a': [1, 2]}['a'][0] }} and {{ \"it's\" }}",
+            '{{ "it\\"s" }} {{ "}}" }} {{ {\'a\': 1}}}',
+            "{% raw %}{{ x {% endraw %}{%- raw -%}{%{%- endraw -%}",
+        ],
+    )
+    def test_valid_templates(self, template):
+        """Test that well-formed templates pass."""
+        assert template_error(template) is None
+
+    @pytest.mark.parametrize(
+        "template, problem",
+        [
+            ("{{ x }", "Unclosed template delimiter"),
+            ("{% if x %}a", "Missing 'endif'"),
+            ("{% endfor %}", "Unexpected 'endfor'"),
+            ("{% else %}", "'else' outside of a matching block"),
+            ("{{ 'abc }}", "Unterminated string"),
+            ("{{ x] }}", "Unbalanced ']'"),
+            ("{{ x %}", "'{{' closed by '%}'"),
+            ("{% raw %}{{ x", "Missing 'endraw'"),
+            ("{# note", "Unclosed comment"),
+        ],
+    )
+    def test_invalid_templates(self, template, problem):
+        """Test that structural template errors are explained."""
+        assert template_error(template) == problem
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""Tests for the Home Assistant WebSocket client and live cache coherence."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from mcp_ha_extended import server
+from mcp_ha_extended.server import automation_cache, call_tool, start_event_listener
+from mcp_ha_extended.websocket import (
+    HAWebSocketClient,
+    WebSocketAuthError,
+    WebSocketCommandError,
+    websocket_url,
+)
+from tests.fake_home_assistant import FakeHomeAssistant
+
+
+async def wait_until(predicate, timeout: float = 2.0) -> None:
+    """Poll until ``predicate()`` is true or fail after ``timeout`` seconds."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def fake_ha():
+    """Run a stand-in Home Assistant WebSocket server."""
+    fake = FakeHomeAssistant()
+    await fake.start()
+    yield fake
+    await fake.stop()
+
+
+def state(automation_id: str, value: str, **attributes) -> dict:
+    """Build an automation entity state object."""
+    return {
+        "entity_id": f"automation.{automation_id}",
+        "state": value,
+        "attributes": {"id": automation_id, **attributes},
+    }
+
+
+class TestWebSocketURL:
+    """Test the websocket_url helper."""
+
+    def test_http_url(self):
+        """Test that http URLs map to ws."""
+        assert websocket_url("http://ha.local:8123") == "ws://ha.local:8123/api/websocket"
+
+    def test_https_url(self):
+        """Test that https URLs map to wss and trailing slashes are dropped."""
+        assert websocket_url("https://ha.example.com/") == "wss://ha.example.com/api/websocket"
+
+
+class TestHAWebSocketClient:
+    """Test the HAWebSocketClient class against a stand-in server."""
+
+    @pytest.mark.asyncio
+    async def test_events_dispatched_in_order(self, fake_ha):
+        """Test that events reach handlers in the order they were sent."""
+        received = []
+
+        async def handler(event):
+            received.append(event["data"]["n"])
+
+        ws_client = HAWebSocketClient(websocket_url(fake_ha.url), "test_token")
+        ws_client.subscribe("test_event", handler)
+        await ws_client.start()
+        try:
+            await asyncio.wait_for(ws_client.connected.wait(), 2)
+            for n in range(20):
+                await fake_ha.push_event("test_event", {"n": n})
+
+            await wait_until(lambda: len(received) == 20)
+            assert received == list(range(20))
+        finally:
+            await ws_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_call_correlates_results(self, fake_ha):
+        """Test that concurrent commands get their own results back."""
+
+        async def echo(message):
+            await asyncio.sleep(0.05 if message["value"] % 2 else 0)
+            return message["value"]
+
+        fake_ha.command_handlers["echo"] = echo
+        ws_client = HAWebSocketClient(websocket_url(fake_ha.url), "test_token")
+        await ws_client.start()
+        try:
+            await asyncio.wait_for(ws_client.connected.wait(), 2)
+            results = await asyncio.gather(
+                *(ws_client.call({"type": "echo", "value": n}) for n in range(5))
+            )
+            assert results == [0, 1, 2, 3, 4]
+        finally:
+            await ws_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_call_error(self, fake_ha):
+        """Test that unsuccessful results raise WebSocketCommandError."""
+
+        async def fail(message):
+            raise KeyError("nope")
+
+        fake_ha.command_handlers["fail"] = fail
+        ws_client = HAWebSocketClient(websocket_url(fake_ha.url), "test_token")
+        await ws_client.start()
+        try:
+            await asyncio.wait_for(ws_client.connected.wait(), 2)
+            with pytest.raises(WebSocketCommandError, match="KeyError"):
+                await ws_client.call({"type": "fail"})
+        finally:
+            await ws_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_call_when_disconnected(self):
+        """Test that commands fail fast without a connection."""
+        ws_client = HAWebSocketClient("ws://127.0.0.1:1/api/websocket", "test_token")
+        with pytest.raises(ConnectionError):
+            await ws_client.call({"type": "ping"})
+
+    @pytest.mark.asyncio
+    async def test_reconnect_resubscribes(self, fake_ha):
+        """Test that subscriptions are renewed after the connection drops."""
+        received = []
+        connects = []
+
+        async def handler(event):
+            received.append(event["data"]["n"])
+
+        async def on_connect():
+            connects.append(True)
+
+        ws_client = HAWebSocketClient(
+            websocket_url(fake_ha.url), "test_token", reconnect_delay=0.01
+        )
+        ws_client.subscribe("test_event", handler)
+        ws_client.on_connect(on_connect)
+        await ws_client.start()
+        try:
+            await asyncio.wait_for(ws_client.connected.wait(), 2)
+            await fake_ha.push_event("test_event", {"n": 1})
+            await wait_until(lambda: received == [1])
+
+            await fake_ha.drop_connections()
+            await wait_until(lambda: len(connects) == 2 and fake_ha.subscribed("test_event") == 1)
+            await fake_ha.push_event("test_event", {"n": 2})
+
+            await wait_until(lambda: received == [1, 2])
+            assert fake_ha.connections == 2
+        finally:
+            await ws_client.stop()
+
+    @pytest.mark.asyncio
+    async def test_invalid_token(self, fake_ha):
+        """Test that an invalid token stops the client instead of retrying forever."""
+        ws_client = HAWebSocketClient(websocket_url(fake_ha.url), "wrong", reconnect_delay=0.01)
+        await ws_client.start()
+        try:
+            with pytest.raises(WebSocketAuthError):
+                await asyncio.wait_for(ws_client._task, 2)
+            assert not ws_client.connected.is_set()
+        finally:
+            await ws_client.stop()
+
+
+class TestLiveCacheCoherence:
+    """Test that the event listener keeps the automation cache coherent."""
+
+    @pytest.mark.asyncio
+    async def test_listener_keeps_cache_live(self, fake_ha):
+        """Test that cached reads survive TTL while connected and follow remote edits."""
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+        ):
+            listener = await start_event_listener()
+            try:
+                await asyncio.wait_for(listener.connected.wait(), 2)
+                await wait_until(lambda: fake_ha.subscribed("state_changed") == 1)
+                assert automation_cache.ttl is None
+
+                with patch(
+                    "mcp_ha_extended.server.ha_api_call",
+                    return_value={"id": "abc", "alias": "Test", "enabled": True},
+                ) as mock_call:
+                    await call_tool("get_automation", {"automation_id": "abc"})
+
+                    # Someone disables the automation in the HA UI
+                    await fake_ha.push_event(
+                        "state_changed",
+                        {
+                            "entity_id": "automation.abc",
+                            "old_state": state("abc", "on"),
+                            "new_state": state("abc", "off"),
+                        },
+                    )
+                    await wait_until(
+                        lambda: automation_cache.peek("/automation/abc")["enabled"] is False
+                    )
+                    result = await call_tool("get_automation", {"automation_id": "abc"})
+
+                    assert json.loads(result[0].text)["enabled"] is False
+                    mock_call.assert_called_once()
+
+                    await fake_ha.push_event("automation_reloaded", {})
+                    await wait_until(lambda: "/automation/abc" not in automation_cache)
+            finally:
+                await listener.stop()
+
+    @pytest.mark.asyncio
+    async def test_disconnect_restores_ttl(self, fake_ha):
+        """Test that the cache falls back to its TTL and is cleared when events stop."""
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+        ):
+            listener = await start_event_listener()
+            listener.reconnect_delay = 10
+            try:
+                await asyncio.wait_for(listener.connected.wait(), 2)
+                automation_cache.set("/automation/abc", {"id": "abc"})
+
+                await fake_ha.drop_connections()
+                await wait_until(lambda: not listener.connected.is_set())
+
+                assert automation_cache.ttl == server.HA_CACHE_TTL
+                assert "/automation/abc" not in automation_cache
+            finally:
+                await listener.stop()
+
+
+class TestStateMirror:
+    """Test the entity state mirror against a stand-in Home Assistant."""
+
+    @pytest.mark.asyncio
+    async def test_listener_keeps_states_live(self, fake_ha):
+        """Test that state_changed events update the mirror without reloading /api/states."""
+        fake_ha.states["light.kitchen"] = {
+            "entity_id": "light.kitchen",
+            "state": "off",
+            "attributes": {},
+        }
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+            patch("mcp_ha_extended.server.HA_CACHE_TTL", 0),
+        ):
+            listener = await start_event_listener()
+            try:
+                await asyncio.wait_for(listener.connected.wait(), 2)
+                await wait_until(lambda: fake_ha.subscribed("area_registry_updated") == 1)
+                await call_tool("list_entities", {})
+
+                await fake_ha.push_event(
+                    "state_changed",
+                    {
+                        "entity_id": "light.kitchen",
+                        "new_state": {"entity_id": "light.kitchen", "state": "on"},
+                    },
+                )
+                await wait_until(lambda: server.state_store.get("light.kitchen")["state"] == "on")
+                result = await call_tool("search_entities", {"state": "on"})
+
+                assert [e["entity_id"] for e in json.loads(result[0].text)["entities"]] == [
+                    "light.kitchen"
+                ]
+                assert fake_ha.rest_requests.count(("GET", "/api/states")) == 1
+            finally:
+                await listener.stop()
+
+    @pytest.mark.asyncio
+    async def test_area_filter_loads_registry_over_websocket(self, fake_ha):
+        """Test that areas are read from the registries, opening a WebSocket on demand."""
+        fake_ha.states = {
+            e: {"entity_id": e, "state": "on", "attributes": {}}
+            for e in ("light.kitchen", "light.porch")
+        }
+
+        async def entity_registry(message):
+            return [{"entity_id": "light.kitchen", "area_id": None, "device_id": "d1"}]
+
+        async def device_registry(message):
+            return [{"id": "d1", "area_id": "kitchen"}]
+
+        async def area_registry(message):
+            return [{"area_id": "kitchen", "name": "Kitchen"}]
+
+        fake_ha.command_handlers.update(
+            {
+                "config/entity_registry/list": entity_registry,
+                "config/device_registry/list": device_registry,
+                "config/area_registry/list": area_registry,
+            }
+        )
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+        ):
+            try:
+                result = await call_tool("list_entities", {"area": "Kitchen"})
+
+                assert json.loads(result[0].text)["entities"] == [
+                    {"entity_id": "light.kitchen", "state": "on", "name": None, "area": "Kitchen"}
+                ]
+                assert fake_ha.connections == 1
+            finally:
+                await server.websocket_client.stop()
+
+
+class TestCallServices:
+    """Test call_services against a stand-in Home Assistant."""
+
+    @pytest.mark.asyncio
+    async def test_calls_are_pipelined(self, fake_ha):
+        """Test that many service calls share one connection and take about one round trip."""
+
+        async def call_service(message):
+            await asyncio.sleep(0.2)
+            return {"context": {"id": message["id"]}, "response": None}
+
+        fake_ha.command_handlers["call_service"] = call_service
+        calls = [
+            {"service": "light.turn_on", "target": {"entity_id": f"light.l{n}"}} for n in range(30)
+        ]
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+        ):
+            try:
+                started = asyncio.get_running_loop().time()
+                result = await call_tool("call_services", {"calls": calls})
+                elapsed = asyncio.get_running_loop().time() - started
+
+                data = json.loads(result[0].text)
+                assert (data["transport"], data["ok"]) == ("websocket", 30)
+                assert [item["index"] for item in data["results"]] == list(range(30))
+                assert elapsed < 1.5
+                assert fake_ha.connections == 1
+                assert fake_ha.service_calls == []
+            finally:
+                await server.websocket_client.stop()
+
+
+class TestWebSocketBackend:
+    """Test HA_BACKEND=websocket against a stand-in Home Assistant."""
+
+    @pytest.mark.asyncio
+    async def test_requests_share_one_connection(self, fake_ha):
+        """Test that states, reads and service calls use WebSocket commands, writes use REST."""
+        fake_ha.states["automation.kitchen"] = state("kitchen", "on")
+        fake_ha.automations["kitchen"] = {"id": "kitchen", "alias": "Kitchen"}
+
+        async def get_states(message):
+            return list(fake_ha.states.values())
+
+        async def automation_config(message):
+            return {"config": fake_ha.automations[message["entity_id"].split(".", 1)[1]]}
+
+        async def call_service(message):
+            return {"context": {}}
+
+        fake_ha.command_handlers.update(
+            {
+                "get_states": get_states,
+                "automation/config": automation_config,
+                "call_service": call_service,
+            }
+        )
+        with (
+            patch("mcp_ha_extended.server.HA_URL", fake_ha.url),
+            patch("mcp_ha_extended.server.HA_TOKEN", "test_token"),
+            patch("mcp_ha_extended.server.HA_BACKEND", "websocket"),
+        ):
+            try:
+                await call_tool("list_entities", {"domain": "automation"})
+                await call_tool("disable_automation", {"automation_id": "kitchen"})
+                result = await call_tool("get_automation", {"automation_id": "kitchen"})
+                await call_tool("delete_automation", {"automation_id": "kitchen"})
+
+                assert json.loads(result[0].text)["alias"] == "Kitchen"
+                assert [m["type"] for m in fake_ha.received] == [
+                    "get_states",
+                    "call_service",
+                    "automation/config",
+                ]
+                assert fake_ha.rest_requests == [("DELETE", "/api/automation/kitchen")]
+                assert fake_ha.connections == 1
+            finally:
+                await server.websocket_client.stop()